@@ -0,0 +1,251 @@
+"""Per-answer analytics for Supply Chain Strategy Card Game.
+
+``record`` puts every answer (time, card ID, chosen answer, right or wrong,
+seconds taken) on an in-process queue; it is one deque append and never
+waits on I/O. A background thread per worker drains the queue every
+``flush_interval`` seconds, or as soon as ``BATCH_SIZE`` answers wait, and
+appends them to ``answers-<pid>.bin`` in ``ANALYTICS_DIR`` as one columnar
+block: a header with the row count, then each column's values packed back
+to back (17 bytes an answer). If the writer falls ``MAX_QUEUED`` answers
+behind, new answers are dropped and counted instead of growing the queue;
+a failed write drops and counts the answers of that block, logs the error
+and the writer carries on with the next one. Answers whose values do not
+fit their columns are dropped when recorded. With ``ANALYTICS_DIR`` unset
+nothing is queued or written.
+
+Usage:
+    python analytics.py [DIR] [--card ID ...] [--since TIME] [--json]
+
+reads every worker's file in DIR (default ``ANALYTICS_DIR``) and prints,
+per card, how many answers it got, its correct rate, how often each answer
+was chosen and the median and 90th percentile answer time. ``--since``
+takes Unix seconds or an ISO 8601 time.
+"""
+
+import argparse
+import atexit
+import collections
+import glob
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+import metrics
+
+# Block header: magic, number of rows; then one packed array per column
+_BLOCK = struct.Struct("<4sI")
+_MAGIC = b"ANS1"
+# Column name -> array typecode: Unix time, card ID, answer index, 1 if
+# correct, seconds taken (NaN when unknown)
+COLUMNS = (("at", "d"), ("card", "I"), ("answer", "B"), ("correct", "B"), ("seconds", "f"))
+
+BATCH_SIZE = 4096
+MAX_QUEUED = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerLog:
+    """Queue of answers plus the worker's background writer."""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._writer_pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def record(self, card_id: int, answer_index: int, correct: bool, seconds: Optional[float]):
+        """Queue one answer; returns at once."""
+        if self.directory is None:
+            return
+        if self._writer_pid != os.getpid():
+            self._start_writer()
+        queue = self._queue
+        # The card and answer columns are unsigned 32- and 8-bit
+        if len(queue) >= MAX_QUEUED or not (0 <= answer_index < 256 and 0 <= card_id < 1 << 32):
+            self.dropped += 1
+            return
+        queue.append((time.time(), card_id, answer_index, correct,
+                      math.nan if seconds is None else seconds))
+        if len(queue) == BATCH_SIZE:
+            self._wake.set()
+
+    def _start_writer(self):
+        with self._start_lock:
+            if self._writer_pid == os.getpid():
+                return
+            # Threads do not survive a fork, so each worker starts its own
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._run_writer, daemon=True).start()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The answers flush had taken are lost; a dead writer would lose all later ones
+                logger.exception("Analytics writer failed")
+
+    def flush(self):
+        """Write every queued answer to this worker's file as one block."""
+        with self._write_lock:
+            queue = self._queue
+            rows = [queue.popleft() for _ in range(len(queue))]
+            dropped, self.dropped = self.dropped, 0
+            if dropped:
+                metrics.analytics_answers.inc("dropped", amount=dropped)
+            if not rows:
+                return
+            try:
+                columns = [array(code, values) for (_, code), values in zip(COLUMNS, zip(*rows))]
+                if sys.byteorder == "big":
+                    for column in columns:
+                        column.byteswap()
+                path = os.path.join(self.directory, f"answers-{os.getpid()}.bin")
+                with open(path, "ab") as f:
+                    f.write(b"".join([_BLOCK.pack(_MAGIC, len(rows)), *map(bytes, columns)]))
+            except (OSError, TypeError, ValueError, OverflowError):
+                # Only this block is lost; the queue keeps draining
+                metrics.analytics_answers.inc("dropped", amount=len(rows))
+                logger.exception("Analytics write failed; dropped %d answers", len(rows))
+                return
+            metrics.analytics_answers.inc("written", amount=len(rows))
+
+
+def read_blocks(path: str) -> Iterator[Dict[str, array]]:
+    """Yield each block of an answers file as a dict of column arrays.
+
+    A block cut short (a worker killed mid-write) ends the file.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _BLOCK.size <= len(data):
+        magic, rows = _BLOCK.unpack_from(data, offset)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: not an answers file (bad block at byte {offset})")
+        offset += _BLOCK.size
+        block = {}
+        for name, code in COLUMNS:
+            column = array(code)
+            end = offset + column.itemsize * rows
+            if end > len(data):
+                return
+            column.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                column.byteswap()
+            block[name] = column
+            offset = end
+        yield block
+
+
+def answer_stats(directory: str, cards: Optional[set] = None, since: float = 0.0) -> Dict[int, dict]:
+    """Answer counts, correct rate, answer distribution and timing per card ID."""
+    totals: Dict[int, list] = {}  # card -> [answers, correct, Counter of choices, times]
+    for path in sorted(glob.glob(os.path.join(directory, "answers-*.bin"))):
+        for block in read_blocks(path):
+            for at, card, answer, correct, seconds in zip(
+                block["at"], block["card"], block["answer"], block["correct"], block["seconds"]
+            ):
+                if at < since or (cards is not None and card not in cards):
+                    continue
+                entry = totals.get(card)
+                if entry is None:
+                    entry = totals[card] = [0, 0, collections.Counter(), []]
+                entry[0] += 1
+                entry[1] += correct
+                entry[2][answer] += 1
+                if seconds == seconds:  # not NaN
+                    entry[3].append(seconds)
+    report = {}
+    for card, (answers, correct, choices, times) in sorted(totals.items()):
+        times.sort()
+        report[card] = {
+            "answers": answers,
+            "correct_rate": round(correct / answers, 4),
+            "choices": {index: round(count / answers, 4) for index, count in sorted(choices.items())},
+            "median_seconds": _quantile(times, 0.5),
+            "p90_seconds": _quantile(times, 0.9),
+        }
+    return report
+
+
+def _quantile(ordered: list, fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 2)
+
+
+def _since(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _titles(card_ids) -> Dict[int, str]:
+    from card_packs import get_catalog
+
+    catalog = get_catalog()
+    return {card_id: card.title for card_id in card_ids
+            for card in (catalog.get(card_id),) if card is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", nargs="?", default=os.environ.get("ANALYTICS_DIR"))
+    parser.add_argument("--card", type=int, nargs="+", help="only these card IDs")
+    parser.add_argument("--since", type=_since, default=0.0, help="Unix seconds or ISO 8601")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+    if not args.directory:
+        parser.error("pass the analytics directory or set ANALYTICS_DIR")
+
+    report = answer_stats(args.directory, set(args.card) if args.card else None, args.since)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    titles = _titles(report)
+    letters = "ABCDEFGHIJ"
+    print(f"{'card':>6} {'answers':>8} {'correct':>8} {'p50 s':>7} {'p90 s':>7}  choices  title")
+    for card, row in report.items():
+        choices = " ".join(f"{letters[i] if i < len(letters) else i}:{share:.0%}"
+                           for i, share in row["choices"].items())
+        p50, p90 = (f"{v:7.1f}" if v is not None else f"{'-':>7}"
+                    for v in (row["median_seconds"], row["p90_seconds"]))
+        print(f"{card:>6} {row['answers']:>8} {row['correct_rate']:>8.1%} {p50} {p90}  "
+              f"{choices}  {titles.get(card, '')}")
+
+
+# Process-wide log; ANALYTICS_DIR enables it
+answer_log = AnswerLog(os.environ.get("ANALYTICS_DIR") or None)
+
+
+def record(card_id: int, answer_index: int, correct: bool, seconds: Optional[float] = None):
+    """Queue one answer on this worker's log (see ``AnswerLog.record``)."""
+    answer_log.record(card_id, answer_index, correct, seconds)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
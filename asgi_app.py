@@ -0,0 +1,309 @@
+"""ASGI (asyncio) server mode for Supply Chain Strategy Card Game.
+
+Serves the same API as web_app.py from the handlers in game_api.py, but on
+an event loop, so slow or idle clients cost a coroutine instead of a whole
+sync worker. Handlers are CPU-only with the in-process game store and run
+inline; with a shared store or score log they run on the default thread
+pool so the loop never waits on I/O.
+
+Multiplayer rooms (rooms.py) are served only here: players hold a
+Server-Sent Events stream open per room, which a sync worker could not
+afford. Rooms live in one process, so serve them from a single worker.
+
+Run with:
+    uvicorn asgi_app:app --workers 4 --host 0.0.0.0 --port $PORT
+"""
+
+import asyncio
+import io
+import json
+import os
+import re
+import time
+from urllib.parse import parse_qsl
+
+from card_packs import maybe_reload
+import game_api
+import metrics
+import profiling
+import responses
+import rooms
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html")
+MAX_BODY_BYTES = 64 * 1024
+MAX_IMPORT_BYTES = 64 * 1024 * 1024  # about 1.5M CSV rows; larger files go through the command
+IMPORT_PATH = "/api/admin/import-scores"
+
+_GAME_ID = r"(?P<game_id>[^/]+)"
+_ROOM_ID = r"(?P<room_id>[^/]+)"
+_ROOM_EVENTS = re.compile(rf"/api/rooms/{_ROOM_ID}/events")
+
+# (method, path pattern, handler, whether the handler takes the JSON body as ``data``)
+ROUTES = [
+    ("POST", re.compile(r"/api/start-game"), game_api.start_game, True),
+    ("POST", re.compile(rf"/api/draw-card/{_GAME_ID}/(?P<difficulty>[^/]+)"), game_api.draw_card, False),
+    ("POST", re.compile(rf"/api/answer/{_GAME_ID}"), game_api.submit_answer, True),
+    ("POST", re.compile(rf"/api/turn/{_GAME_ID}"), game_api.play_turn, True),
+    ("GET", re.compile(rf"/api/stats/{_GAME_ID}"), game_api.get_stats, False),
+    ("POST", re.compile(rf"/api/end-game/{_GAME_ID}"), game_api.end_game, False),
+    ("GET", re.compile(r"/api/leaderboard"), game_api.get_leaderboard, False),
+    ("GET", re.compile(r"/api/health"), game_api.health, False),
+    ("POST", re.compile(r"/api/rooms"), rooms.create_room, True),
+    ("POST", re.compile(rf"/api/rooms/{_ROOM_ID}/join"), rooms.join_room, True),
+    ("POST", re.compile(rf"/api/rooms/{_ROOM_ID}/deal"), rooms.deal_card, True),
+    ("POST", re.compile(rf"/api/rooms/{_ROOM_ID}/answer"), rooms.answer_card, True),
+    ("POST", re.compile(rf"/api/rooms/{_ROOM_ID}/close"), rooms.close_room, True),
+]
+
+# Handlers that publish to room streams, so they always run on the loop
+ON_LOOP = {rooms.create_room, rooms.join_room, rooms.deal_card, rooms.answer_card, rooms.close_room}
+
+# Request headers some handlers take, as handler -> ((header, keyword argument), ...)
+HEADER_ARGS = {
+    game_api.get_leaderboard: ((b"if-none-match", "if_none_match"),),
+}
+
+# Handlers that take the query string as ``params``
+TAKES_PARAMS = {game_api.get_leaderboard}
+
+_index_html = None
+
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    path = scope["path"]
+    if path == "/" and method == "GET":
+        await _send_index(send)
+        return
+    if path == "/metrics" and method == "GET":
+        await _send_bytes(send, 200, metrics.registry.render(), metrics.CONTENT_TYPE.encode())
+        return
+    if path == IMPORT_PATH:
+        await _import_scores(scope, receive, send)
+        return
+    if profiling.ENABLED and path in profiling.CONTROL_ROUTES:
+        await _start_profile(scope, send)
+        return
+    events = _ROOM_EVENTS.fullmatch(path)
+    if events:
+        await _room_events(scope, receive, send, events["room_id"])
+        return
+
+    for route_method, pattern, handler, takes_body in ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            break
+    else:
+        await _send(send, ({"error": "Not found"}, 404))
+        return
+    if method != route_method:
+        await _send(send, ({"error": "Method not allowed"}, 405))
+        return
+
+    start = time.perf_counter()
+    kwargs = match.groupdict()
+    for header, name in HEADER_ARGS.get(handler, ()):
+        kwargs[name] = _header(scope, header)
+    if handler in TAKES_PARAMS:
+        kwargs["params"] = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+    if takes_body:
+        body = await _read_body(receive)
+        if body is None:
+            await _send(send, ({"error": "Request body too large"}, 413))
+            return
+        try:
+            kwargs["data"] = json.loads(body) if body else None
+        except ValueError:
+            await _send(send, ({"error": "Invalid JSON"}, 400))
+            return
+
+    maybe_reload()
+    headers = ()
+    inline = handler in ON_LOOP
+    if profiling.ENABLED and profiling.authorized(_profile_token(scope)):
+        result, profile_path = await _run(profiling.trace_call, handler, inline=inline, **kwargs)
+        headers = ((b"x-profile-file", profile_path.encode()),)
+    else:
+        result = await _run(handler, inline=inline, **kwargs)
+    await _send(send, result, headers)
+    metrics.request_seconds.observe(time.perf_counter() - start, handler.__name__)
+    metrics.requests_total.inc(handler.__name__, str(result[1]))
+    metrics.registry.ensure_flushing()
+
+
+async def _run(func, *args, inline=False, **kwargs):
+    if game_api.BLOCKING_IO and not inline:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _header(scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _profile_token(scope):
+    token = _header(scope, b"x-profile")
+    if token is None:
+        token = dict(parse_qsl(scope["query_string"].decode("latin-1"))).get("profile")
+    return token
+
+
+async def _start_profile(scope, send):
+    if scope["method"] != "POST":
+        await _send(send, ({"error": "Method not allowed"}, 405))
+        return
+    params = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+    handler = profiling.CONTROL_ROUTES[scope["path"]]
+    await _send(send, handler(_header(scope, b"x-profile-token"), params))
+
+
+async def _import_scores(scope, receive, send):
+    if scope["method"] != "POST":
+        await _send(send, ({"error": "Method not allowed"}, 405))
+        return
+    token = _header(scope, b"x-admin-token")
+    # Check the token before buffering an upload of up to MAX_IMPORT_BYTES
+    if not game_api.admin_authorized(token):
+        await _send(send, ({"error": "Forbidden"}, 403))
+        return
+    body = await _read_body(receive, MAX_IMPORT_BYTES)
+    if body is None:
+        await _send(send, ({"error": "Request body too large"}, 413))
+        return
+    params = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+    # Validating and sorting a large import is seconds of work; keep the loop serving
+    await _send(send, await asyncio.to_thread(
+        game_api.import_scores, token, params, io.BytesIO(body)
+    ))
+
+
+async def _room_events(scope, receive, send, room_id):
+    """Stream a room's events until it closes or the client goes away.
+
+    A new client starts from a snapshot (the card in play and the
+    standings); one reconnecting with ``Last-Event-ID`` gets what it missed
+    if the room still has it. Every subscriber sends the same encoded
+    ``bytes`` that ``Room.publish`` built once.
+    """
+    if scope["method"] != "GET":
+        await _send(send, ({"error": "Method not allowed"}, 405))
+        return
+    room = rooms.get_room(room_id)
+    if room is None:
+        await _send(send, rooms.NOT_FOUND)
+        return
+    try:
+        seq = int(_header(scope, b"last-event-id"))
+    except (TypeError, ValueError):
+        seq = None
+    changed = room.changed()
+    if seq is None:
+        events, seq = room.snapshot(), room.seq
+    else:
+        events, seq = room.events_after(seq)
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ],
+    })
+    # Servers do not fail sends to a closed connection, so watch for the disconnect
+    watcher = asyncio.ensure_future(_cancel_on_disconnect(receive, asyncio.current_task()))
+    room.subscribers += 1
+    try:
+        while True:
+            if events:
+                body = events[0] if len(events) == 1 else b"".join(events)
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+            if room.closed and seq == room.seq:
+                break
+            await changed.wait()
+            changed = room.changed()
+            events, seq = room.events_after(seq)
+            if not events:
+                events = [rooms.HEARTBEAT]
+        await send({"type": "http.response.body", "body": b""})
+    except asyncio.CancelledError:
+        pass  # the client disconnected
+    finally:
+        room.subscribers -= 1
+        watcher.cancel()
+
+
+async def _cancel_on_disconnect(receive, task):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+    task.cancel()
+
+
+async def _read_body(receive, limit=MAX_BODY_BYTES):
+    """Return the request body, or None if it exceeds ``limit`` bytes."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send(send, result, headers=()):
+    body, status, *extra = result
+    if extra:
+        headers = (*headers, *((name.lower().encode(), value.encode()) for name, value in extra[0].items()))
+    if not isinstance(body, bytes):
+        body = responses.dumps(body)
+    await _send_bytes(send, status, body, b"application/json", headers)
+
+
+async def _send_index(send):
+    global _index_html
+    if _index_html is None:
+        try:
+            with open(INDEX_PATH, "rb") as f:
+                _index_html = f.read()
+        except FileNotFoundError:
+            await _send(send, ({"error": "Not found"}, 404))
+            return
+    await _send_bytes(send, 200, _index_html, b"text/html; charset=utf-8")
+
+
+async def _send_bytes(send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
\ No newline at end of file
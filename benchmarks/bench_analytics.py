@@ -0,0 +1,91 @@
+"""Cost of the per-answer analytics log.
+
+Times ``GameEngine.answer_question`` with the analytics log disabled and
+enabled, so the difference is what every answer pays, and the slowest
+``record`` call seen while the background writer is flushing, which shows
+whether request threads ever wait on it. Then times the writer's flush of
+``--events`` answers and a full ``analytics.py`` query over them.
+
+Usage:
+    python benchmarks/bench_analytics.py [--iterations 200000] [--events 1000000]
+        [--output results/analytics.json]
+"""
+
+import argparse
+import atexit
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import analytics  # noqa: E402
+from cards import Difficulty  # noqa: E402
+from common import summarize, write_results  # noqa: E402
+from game_engine import GameEngine  # noqa: E402
+
+
+def answer_us(game: GameEngine, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        game.answer_question(i % 4, 3.5)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    game = GameEngine("bench")
+    game.draw_card(Difficulty.EASY)
+    results = {"answer_question_us_disabled": round(answer_us(game, args.iterations), 3)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = analytics.answer_log = analytics.AnswerLog(tmp)
+        atexit.unregister(log.flush)
+        results["answer_question_us_enabled"] = round(answer_us(game, args.iterations), 3)
+        results["overhead_per_answer_us"] = round(
+            results["answer_question_us_enabled"] - results["answer_question_us_disabled"], 3)
+
+        # Record while the writer thread drains full batches in the background
+        waits = []
+        for i in range(args.iterations):
+            began = time.perf_counter()
+            log.record(i % 1000, i % 4, i % 3 == 0, 2.0)
+            waits.append(time.perf_counter() - began)
+        results["record_while_writing"] = summarize(waits)
+        results["record_max_us"] = round(max(waits) * 1e6, 1)
+        log.flush()
+
+        rng = random.Random(args.seed)
+        for _ in range(args.events):
+            log._queue.append((time.time(), rng.randrange(1000), rng.randrange(4),
+                               rng.random() < 0.6, rng.expovariate(0.1)))
+        start = time.perf_counter()
+        log.flush()
+        flush = time.perf_counter() - start
+        results["flush_events_per_second"] = round(args.events / flush)
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        total = args.events + 2 * args.iterations
+        results["bytes_per_answer"] = round(size / total, 2)
+
+        start = time.perf_counter()
+        report = analytics.answer_stats(tmp)
+        query = time.perf_counter() - start
+        results["query_seconds"] = round(query, 2)
+        results["query_answers_per_second"] = round(total / query)
+        results["cards_reported"] = len(report)
+
+    for name, value in results.items():
+        print(f"{name:30s} {value}")
+    write_results(args.output, "analytics", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
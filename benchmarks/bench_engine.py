@@ -0,0 +1,159 @@
+"""Microbenchmarks for the game engine and the leaderboard.
+
+Engine calls (``draw_card``, ``draw_adaptive``, ``answer_question``,
+``get_game_stats``) are timed against synthetic catalogs of growing size,
+since deck handling and card sampling are the parts that scale with the
+card count. Leaderboard calls
+(``add_player_score``, ``get_leaderboard``, ``get_player_rank``,
+``rank_for_score``) are timed
+against boards of growing player count, and window reads against boards
+whose history spans a year, where they should not grow with the history.
+
+Usage:
+    python benchmarks/bench_engine.py [--decks 12,1000,100000]
+        [--players 1000,100000,1000000] [--output results/engine.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from card_packs import load_catalog  # noqa: E402
+from cards import Difficulty  # noqa: E402
+from common import write_results  # noqa: E402
+from game_engine import MIXES, WINDOWS, GameEngine, RankingSystem  # noqa: E402
+
+
+def write_synthetic_pack(directory: str, cards_per_difficulty: int):
+    """Write a pack with ``cards_per_difficulty`` generated cards of each difficulty."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "synthetic.jsonl"), "w") as f:
+        card_id = 0
+        for difficulty in Difficulty:
+            for n in range(cards_per_difficulty):
+                f.write(json.dumps({
+                    "id": card_id,
+                    "difficulty": difficulty.name.lower(),
+                    "category": "benchmark",
+                    "title": f"Card {card_id}",
+                    "description": f"Synthetic {difficulty.name.lower()} card {n}",
+                    "real_world_impact": "None",
+                    "answers": [
+                        {"text": f"Option {i}", "is_correct": i == 0,
+                         "explanation": "Because", "points_if_correct": 3 if i == 0 else 0}
+                        for i in range(4)
+                    ],
+                }) + "\n")
+                card_id += 1
+
+
+def per_call_us(func, iterations: int) -> float:
+    """Return the mean microseconds per call of ``func(i)`` over ``iterations`` calls."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_engine(catalog, iterations: int) -> dict:
+    game = GameEngine("bench")
+    game.catalog = catalog
+    start = time.perf_counter()
+    game.draw_card(Difficulty.EASY)
+    first_draw = (time.perf_counter() - start) * 1e6
+
+    difficulties = list(Difficulty)
+    return {
+        # The first draw of a difficulty creates its deck
+        "first_draw_us": round(first_draw, 2),
+        "draw_card_us": round(per_call_us(
+            lambda i: game.draw_card(difficulties[i % 3]), iterations), 3),
+        "answer_question_us": round(per_call_us(
+            lambda i: game.answer_question(i % 4), iterations), 3),
+        # The first adaptive draw builds the samplers, which are then rebuilt every 30 s
+        "first_adaptive_draw_us": round(per_call_us(lambda i: game.draw_adaptive(), 1), 2),
+        "draw_adaptive_us": round(per_call_us(
+            lambda i: game.draw_adaptive(), iterations), 3),
+        "get_game_stats_us": round(per_call_us(
+            lambda i: game.get_game_stats(), iterations), 3),
+    }
+
+
+def bench_ranking(players: int, iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    ranking = RankingSystem()
+    start = time.perf_counter()
+    for n in range(players):
+        ranking.add_player_score(f"player{n}", rng.randrange(500), rng.random() * 100,
+                                 rng.randrange(1, 50))
+    build = time.perf_counter() - start
+
+    names = [f"player{rng.randrange(players)}" for _ in range(iterations)]
+    return {
+        "build_seconds": round(build, 3),
+        "add_player_score_us": round(build / players * 1e6, 3),
+        "get_leaderboard_us": round(per_call_us(
+            lambda i: ranking.get_leaderboard(10), iterations), 3),
+        "get_player_rank_us": round(per_call_us(
+            lambda i: ranking.get_player_rank(names[i]), iterations), 3),
+        "rank_for_score_us": round(per_call_us(
+            lambda i: ranking.rank_for_score(i % 500), iterations), 3),
+    }
+
+
+def bench_windows(players: int, iterations: int, seed: int) -> dict:
+    """Window reads on a board whose history is spread evenly over the past year."""
+    rng = random.Random(seed)
+    now = time.time()
+    ranking = RankingSystem()
+    ranking.add_scores([
+        (-rng.randrange(500), -rng.random() * 100, -rng.randrange(1, 50),
+         now - rng.random() * 365 * 86400, f"player{n}", rng.choice(MIXES))
+        for n in range(players)
+    ])
+    row = {"day_board_size": len(ranking.get_leaderboard(players, window="day"))}
+    for window in WINDOWS:
+        row[f"{window}_us"] = round(per_call_us(
+            lambda i: ranking.get_leaderboard(10, window=window), iterations), 3)
+    row["day_hard_us"] = round(per_call_us(
+        lambda i: ranking.get_leaderboard(10, window="day", mix="hard"), iterations), 3)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--decks", default="12,1000,100000",
+                        help="comma-separated cards per difficulty")
+    parser.add_argument("--players", default="1000,100000,1000000",
+                        help="comma-separated leaderboard sizes")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = {"engine": {}, "ranking": {}, "windows": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.decks.split(",")):
+            pack_dir = os.path.join(tmp, f"pack-{size}")
+            write_synthetic_pack(pack_dir, size)
+            catalog = load_catalog(pack_dir, os.path.join(tmp, "cache"))
+            results["engine"][size] = row = bench_engine(catalog, args.iterations)
+            print(f"deck {size:>8}/difficulty  {row}")
+
+    for players in (int(s) for s in args.players.split(",")):
+        results["ranking"][players] = row = bench_ranking(players, args.iterations, args.seed)
+        print(f"board {players:>8} players  {row}")
+        results["windows"][players] = row = bench_windows(players, args.iterations, args.seed)
+        print(f"  windows, one year of history  {row}")
+
+    write_results(args.output, "engine", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""Throughput of bulk score imports.
+
+Writes ``--rows`` synthetic tournament scores to a CSV or JSONL file (with
+``--bad-every`` rows broken so the bad-row fallback is exercised), then
+imports the file into a board that already holds ``--existing`` scores.
+Reports the time and rows per second for reading plus batch validation,
+for the one-sort build and swap, and end to end, plus peak RSS. A reader
+thread polls the leaderboard throughout, which shows how long readers wait
+while an import runs. ``--log`` backs the board with a ``ScoreLog``, so
+the build also covers appending the import to the log, reading it back
+and writing the snapshot, and the reader also polls a second board on the
+same log, as another worker would, until that board has the import too.
+
+Usage:
+    python benchmarks/bench_ingest.py [--rows 10000000] [--format csv|jsonl]
+        [--existing 100000] [--bad-every 100000] [--log]
+        [--output results/ingest.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import summarize, write_results  # noqa: E402
+from game_engine import RankingSystem  # noqa: E402
+from score_log import ScoreLog  # noqa: E402
+import score_import  # noqa: E402
+
+
+def write_rows(path: str, rows: int, fmt: str, bad_every: int, seed: int):
+    """Write ``rows`` scores from ~rows/10 distinct players over one year of events."""
+    rng = random.Random(seed)
+    players = max(rows // 10, 1)
+    start = 1_700_000_000
+    with open(path, "w") as f:
+        if fmt == "csv":
+            f.write("name,score,accuracy,cards_played,submitted_at\n")
+        for n in range(rows):
+            name = f"player{rng.randrange(players)}"
+            score = rng.randrange(400)
+            accuracy = round(rng.random() * 100, 1)
+            cards = rng.randrange(1, 60)
+            submitted = start + rng.randrange(31_536_000)
+            if bad_every and n % bad_every == bad_every - 1:
+                score = -score - 1
+            if fmt == "csv":
+                f.write(f"{name},{score},{accuracy},{cards},{submitted}\n")
+            else:
+                f.write(json.dumps({"name": name, "score": score, "accuracy": accuracy,
+                                    "cards_played": cards, "submitted_at": submitted}) + "\n")
+
+
+def seed_board(existing: int, seed: int, log_dir: str = None) -> RankingSystem:
+    rng = random.Random(seed + 1)
+    ranking = RankingSystem(ScoreLog(log_dir) if log_dir else None)
+    body = "name,score,accuracy,cards_played\n" + "".join(
+        f"live{n},{rng.randrange(400)},{rng.random() * 100:.1f},{rng.randrange(1, 60)}\n"
+        for n in range(existing)
+    )
+    score_import.import_scores(ranking, io.BytesIO(body.encode()), "csv")
+    return ranking
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--format", choices=score_import.FORMATS, default="csv")
+    parser.add_argument("--existing", type=int, default=100_000,
+                        help="scores already on the board before the import")
+    parser.add_argument("--bad-every", type=int, default=100_000,
+                        help="make every Nth row invalid (0 for none)")
+    parser.add_argument("--batch-size", type=int, default=score_import.BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log", action="store_true", help="back the board with a score log")
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = os.path.join(tmp, "log") if args.log else None
+        ranking = seed_board(args.existing, args.seed, log_dir)
+        peer = RankingSystem(ScoreLog(log_dir)) if log_dir else None
+        path = os.path.join(tmp, f"scores.{args.format}")
+        start = time.perf_counter()
+        write_rows(path, args.rows, args.format, args.bad_every, args.seed)
+        generate = time.perf_counter() - start
+        print(f"wrote {args.rows} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {generate:.1f} s")
+
+        waits = []
+        peer_waits = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                began = time.perf_counter()
+                ranking.get_leaderboard(10)
+                waits.append(time.perf_counter() - began)
+                if peer is not None:
+                    began = time.perf_counter()
+                    peer.get_leaderboard(10)
+                    peer_waits.append(time.perf_counter() - began)
+                time.sleep(0.01)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        start = time.perf_counter()
+        # Read as the offline command does, with the collector paused
+        with open(path, "rb") as f, score_import.paused_gc():
+            keys, report = score_import.read_scores(f, args.format, args.batch_size)
+        validated = time.perf_counter()
+        ranking.add_scores(keys)
+        built = time.perf_counter()
+        while peer is not None and len(peer) < len(ranking):
+            time.sleep(0.01)
+        synced = time.perf_counter()
+        done.set()
+        thread.join()
+
+    validate_seconds = validated - start
+    build_seconds = built - validated
+    total = built - start
+    results = {
+        "rows": report["rows"],
+        "accepted": report["accepted"],
+        "rejected": report["rejected"],
+        "board_size": len(ranking),
+        "validate_seconds": round(validate_seconds, 2),
+        "validate_rows_per_second": round(report["rows"] / validate_seconds),
+        "build_seconds": round(build_seconds, 2),
+        "build_rows_per_second": round(report["accepted"] / build_seconds),
+        "total_seconds": round(total, 2),
+        "rows_per_second": round(report["rows"] / total),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        "leaderboard_read_wait": summarize(waits),
+        "leaderboard_read_max_ms": round(max(waits) * 1000, 1) if waits else None,
+    }
+    if peer is not None:
+        results["peer_sync_seconds"] = round(synced - built, 2)
+        results["peer_read_wait"] = summarize(peer_waits)
+        results["peer_read_max_ms"] = round(max(peer_waits) * 1000, 1) if peer_waits else None
+    for name, value in results.items():
+        print(f"{name:26s} {value}")
+    write_results(args.output, "ingest", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
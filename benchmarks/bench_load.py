@@ -0,0 +1,131 @@
+"""Load generator that plays full sessions against the Flask app in-process.
+
+Each simulated player starts a game, plays ``--turns`` cards with the
+draw-card / answer loop (or ``--mode turn`` for the single-request turn
+endpoint), ends the game and reads the leaderboard. Requests go through
+``web_app.app``'s WSGI stack via the test client, so the numbers cover
+routing, handlers and JSON encoding without network noise. Throughput and
+p50/p95/p99 latency are reported per endpoint.
+
+Usage:
+    python benchmarks/bench_load.py [--players 500] [--turns 10] [--concurrency 8]
+        [--mode classic|turn] [--output results/load.json]
+
+``GAME_STORE`` and ``LEADERBOARD_DIR`` are honoured, so the same run can be
+repeated against each backend.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import summarize, write_results  # noqa: E402
+from web_app import app  # noqa: E402
+
+DIFFICULTIES = ["easy", "intermediate", "hard"]
+
+
+def play_session(client, turns: int, mode: str, rng: random.Random, timed):
+    game = timed("start-game", client.post, "/api/start-game",
+                 json={"player_name": f"bench{rng.randrange(10**6)}"})
+    game_id = game["game_id"]
+    if mode == "turn":
+        card = timed("draw-card", client.post, f"/api/draw-card/{game_id}/easy")
+        for turn in range(turns):
+            last = turn == turns - 1
+            result = timed("turn", client.post, f"/api/turn/{game_id}", json={
+                "answer_index": rng.randrange(len(card["answers"])),
+                "next_difficulty": None if last else rng.choice(DIFFICULTIES),
+            })
+            card = result.get("next_card")
+    else:
+        for _ in range(turns):
+            card = timed("draw-card", client.post,
+                         f"/api/draw-card/{game_id}/{rng.choice(DIFFICULTIES)}")
+            timed("answer", client.post, f"/api/answer/{game_id}",
+                  json={"answer_index": rng.randrange(len(card["answers"]))})
+            timed("stats", client.get, f"/api/stats/{game_id}")
+    timed("end-game", client.post, f"/api/end-game/{game_id}")
+    timed("leaderboard", client.get, "/api/leaderboard")
+
+
+def run_load(players: int, turns: int, concurrency: int, mode: str, seed: int) -> dict:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    remaining = iter(range(players))
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + worker_id)
+        local = defaultdict(list)
+
+        def timed(endpoint, method, path, **kwargs):
+            start = time.perf_counter()
+            response = method(path, **kwargs)
+            local[endpoint].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                with lock:
+                    errors[endpoint] += 1
+            return response.get_json()
+
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            play_session(client, turns, mode, rng, timed)
+        with lock:
+            for endpoint, values in local.items():
+                latencies[endpoint].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "seconds": round(elapsed, 3),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "sessions_per_second": round(players / elapsed, 1),
+        "endpoints": {
+            endpoint: {
+                **summarize(values),
+                "requests_per_second": round(len(values) / elapsed, 1),
+                "errors": errors[endpoint],
+            }
+            for endpoint, values in latencies.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["classic", "turn"], default="classic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = run_load(args.players, args.turns, args.concurrency, args.mode, args.seed)
+    print(f"{results['requests_per_second']} req/s, "
+          f"{results['sessions_per_second']} sessions/s over {results['seconds']} s")
+    for endpoint, row in results["endpoints"].items():
+        print(f"  {endpoint:12s} {row}")
+    write_results(args.output, "load", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Measure what the metrics instrumentation costs.
+
+Times the recording primitives (one counter increment, one histogram
+observation), a worker's periodic flush, and a scrape that merges the
+files of ``--workers`` workers. A request records one histogram
+observation and one counter increment, plus one of each per card drawn
+and one counter per answer, so the per-request overhead is a few of the
+primitive costs below.
+
+Usage:
+    python benchmarks/bench_metrics.py [--iterations 200000] [--workers 4]
+        [--output results/metrics.json]
+"""
+
+import argparse
+import atexit
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import write_results  # noqa: E402
+from metrics import Counter, Histogram, Registry  # noqa: E402
+
+
+def per_call_us(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def populate(registry: Registry):
+    requests = Counter(registry, "requests_total", "Requests.", ["route", "status"])
+    latency = Histogram(registry, "request_seconds", "Latency.", ["route"])
+    for route in ("start_game", "draw_card", "submit_answer", "play_turn", "get_stats",
+                  "end_game", "get_leaderboard", "health"):
+        for _ in range(100):
+            requests.inc(route, "200")
+            latency.observe(0.0004, route)
+    return requests, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    registry = Registry()
+    requests, latency = populate(registry)
+    results = {
+        "counter_inc_us": round(per_call_us(
+            lambda: requests.inc("draw_card", "200"), args.iterations), 3),
+        "histogram_observe_us": round(per_call_us(
+            lambda: latency.observe(0.0004, "draw_card"), args.iterations), 3),
+        "timed_observe_us": round(per_call_us(
+            lambda: latency.observe(time.perf_counter() - time.perf_counter(), "draw_card"),
+            args.iterations), 3),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = Registry(tmp)
+        atexit.unregister(shared.flush)
+        populate(shared)
+        results["flush_us"] = round(per_call_us(shared.flush, 1000), 1)
+        # Copies of our own file stand in for the other workers; counters from
+        # pids that are not running are still merged, like an exited worker's
+        with open(os.path.join(tmp, f"metrics-{os.getpid()}.json")) as f:
+            data = f.read()
+        for n in range(args.workers - 1):
+            with open(os.path.join(tmp, f"metrics-{4000000 + n}.json"), "w") as f:
+                f.write(data)
+        results["scrape_us"] = round(per_call_us(shared.render, 200), 1)
+
+    for name, value in results.items():
+        print(f"{name:22s} {value}")
+    write_results(args.output, "metrics", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Cost of the session log and time to recover from it.
+
+First times ``MemoryGameStore.put`` with no log, with the asynchronous log
+and with the synchronous one, from ``--threads`` threads, so the last shows
+how group commit shares each fsync among concurrent requests. Then, for
+each history length in ``--updates``, a forked worker starts ``--games``
+games, applies that many turns to them and dies without cleaning up; the
+parent times adopting its sessions. With checkpoints (every
+``--checkpoint-mb`` of log) recovery time stays flat as the history grows;
+``--checkpoint-mb 0`` disables them for comparison.
+
+Usage:
+    python benchmarks/bench_recovery.py [--games 10000] [--updates 100000,1000000]
+        [--threads 8] [--checkpoint-mb 16] [--output results/recovery.json]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cards import Difficulty  # noqa: E402
+from common import write_results  # noqa: E402
+from game_engine import GameEngine  # noqa: E402
+from session_log import SessionLog  # noqa: E402
+from session_store import MemoryGameStore  # noqa: E402
+
+
+def put_us(store: MemoryGameStore, threads: int, puts: int) -> float:
+    """Mean wall time per put with ``threads`` threads putting concurrently."""
+    game = GameEngine("bench")
+    game.draw_card(Difficulty.EASY)
+
+    def run(n):
+        for i in range(puts):
+            store.put(f"game-{n}-{i % 100}", game)
+
+    workers = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if store.log is not None:
+        store.log.flush()
+    return (time.perf_counter() - start) / (threads * puts) * 1e6
+
+
+def crash_after(directory: str, games: int, updates: int, checkpoint_bytes: int, seed: int):
+    """Fork a worker that plays ``updates`` turns over ``games`` games, then dies abruptly."""
+    pid = os.fork()
+    if pid:
+        os.waitpid(pid, 0)
+        return
+    rng = random.Random(seed)
+    log = SessionLog(directory, checkpoint_bytes=checkpoint_bytes or 1 << 62)
+    store = MemoryGameStore(log=log)
+    players = [GameEngine(f"player{n}") for n in range(games)]
+    for n, game in enumerate(players):
+        store.put(f"game{n}", game)
+    difficulties = list(Difficulty)
+    for _ in range(updates):
+        n = rng.randrange(games)
+        game = players[n]
+        game.draw_card(rng.choice(difficulties))
+        game.answer_question(rng.randrange(4))
+        store.put(f"game{n}", game)
+    log.flush()
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--updates", default="100000,1000000",
+                        help="comma-separated turns played before the crash")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--puts", type=int, default=2000, help="puts per thread")
+    parser.add_argument("--checkpoint-mb", type=float, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = {"put_us": {}, "recovery": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        results["put_us"]["no_log"] = round(put_us(MemoryGameStore(), args.threads, args.puts), 2)
+        for mode, sync in (("async", False), ("sync", True)):
+            log = SessionLog(os.path.join(tmp, mode), sync=sync)
+            results["put_us"][mode] = round(
+                put_us(MemoryGameStore(log=log), args.threads, args.puts), 2)
+        print(f"put, {args.threads} threads  {results['put_us']}")
+
+        checkpoint_bytes = int(args.checkpoint_mb * (1 << 20))
+        for updates in (int(u) for u in args.updates.split(",")):
+            directory = os.path.join(tmp, f"crash-{updates}")
+            crash_after(directory, args.games, updates, checkpoint_bytes, args.seed)
+            log_bytes = sum(os.path.getsize(os.path.join(directory, name))
+                            for name in os.listdir(directory))
+            store = MemoryGameStore(log=SessionLog(directory))
+            start = time.perf_counter()
+            store.log.attach(store)
+            seconds = time.perf_counter() - start
+            results["recovery"][updates] = row = {
+                "log_mb_read": round(log_bytes / (1 << 20), 1),
+                "recovered_games": store.log.recovered,
+                "recovery_seconds": round(seconds, 3),
+            }
+            print(f"recover after {updates:>8} turns  {row}")
+
+    write_results(args.output, "recovery", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""CPU time per API request, by endpoint.
+
+Plays ``--games`` games through ``asgi_app.app`` in-process and times each
+request with the thread's CPU clock, so the figures are what a worker
+spends on one request (routing, handler and body encoding) without
+network or I/O waits. Then plays games through ``web_app.app``'s test
+client for the mean CPU per request under Flask.
+``--stdlib`` hides ``orjson`` so the stdlib JSON fallback is measured.
+
+Usage:
+    python benchmarks/bench_responses.py [--games 2000] [--turns 20] [--stdlib]
+        [--output results/responses.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common import write_results  # noqa: E402
+
+
+def cpu_us(samples: list) -> float:
+    return round(sum(samples) / len(samples) * 1e6, 2)
+
+
+def time_asgi(games: int, turns: int) -> dict:
+    import asgi_app
+
+    samples = {}
+
+    async def request(name, method, path, data=None):
+        messages = [{"type": "http.request", "body": json.dumps(data).encode() if data else b""}]
+        sent = []
+
+        async def receive():
+            return messages.pop()
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+        start = time.thread_time()
+        await asgi_app.app(scope, receive, send)
+        samples.setdefault(name, []).append(time.thread_time() - start)
+        return sent[-1]["body"]
+
+    async def play():
+        for n in range(games):
+            body = await request("start_game", "POST", "/api/start-game", {"player_name": f"player{n}"})
+            game_id = json.loads(body)["game_id"]
+            for turn in range(turns):
+                difficulty = ("easy", "intermediate", "hard")[turn % 3]
+                await request("draw_card", "POST", f"/api/draw-card/{game_id}/{difficulty}")
+                await request("submit_answer", "POST", f"/api/answer/{game_id}", {"answer_index": turn % 4})
+                await request("get_stats", "GET", f"/api/stats/{game_id}")
+                await request("play_turn", "POST", f"/api/turn/{game_id}",
+                              {"answer_index": turn % 4, "next_difficulty": difficulty})
+            await request("end_game", "POST", f"/api/end-game/{game_id}")
+
+    asyncio.run(play())
+    return {name: cpu_us(values) for name, values in samples.items()}
+
+
+def time_flask(games: int, turns: int) -> dict:
+    import web_app
+
+    client = web_app.app.test_client()
+    samples = []
+    for n in range(games):
+        start = time.thread_time()
+        game_id = client.post("/api/start-game", json={"player_name": f"player{n}"}).get_json()["game_id"]
+        client.post(f"/api/draw-card/{game_id}/easy")
+        for turn in range(turns):
+            client.post(f"/api/turn/{game_id}", json={"answer_index": turn % 4, "next_difficulty": "easy"})
+        client.get(f"/api/stats/{game_id}")
+        client.post(f"/api/end-game/{game_id}")
+        samples.append((time.thread_time() - start) / (turns + 4))
+    return {"request": cpu_us(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--stdlib", action="store_true", help="measure without orjson")
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+    if args.stdlib:
+        sys.modules["orjson"] = None  # makes ``import orjson`` fail
+
+    results = {
+        "asgi_cpu_us": time_asgi(args.games, args.turns),
+        "flask_cpu_us": time_flask(max(1, args.games // 10), args.turns),
+    }
+    for name, value in results.items():
+        print(f"{name:16s} {value}")
+    write_results(args.output, "responses", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
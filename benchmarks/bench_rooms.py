@@ -0,0 +1,134 @@
+"""Fan-out cost of multiplayer rooms.
+
+Opens one room in-process with ``--players`` players, each holding an
+event stream through ``asgi_app.app`` (the server's socket writes are
+replaced by a counter, so this measures the app, not the kernel). Reports
+the memory each open stream costs, how long a dealt card takes to reach
+every stream, and the latency of ``/answer`` with the whole room playing,
+including the coalesced standings broadcasts.
+
+Usage:
+    python benchmarks/bench_rooms.py [--players 10000] [--rounds 20]
+        [--output results/rooms.json]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import asgi_app  # noqa: E402
+import rooms  # noqa: E402
+from common import summarize, write_results  # noqa: E402
+
+
+class Streams:
+    """Counts event bytes delivered to every open stream."""
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.delivered = 0
+        self.bytes = 0
+        self.target = None
+        self.done = None
+        self.disconnect = asyncio.Event()
+
+    async def open(self):
+        async def receive():
+            await self.disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                self.bytes += len(message["body"])
+                self.delivered += 1
+                if self.delivered == self.target:
+                    self.done.set_result(time.perf_counter())
+
+        scope = {"type": "http", "method": "GET", "path": f"/api/rooms/{self.room_id}/events",
+                 "query_string": b"", "headers": []}
+        await asgi_app.app(scope, receive, send)
+
+    def expect(self, count: int):
+        self.delivered = 0
+        self.target = count
+        self.done = asyncio.get_running_loop().create_future()
+
+
+async def run(args) -> dict:
+    results = {}
+    created, _ = rooms.create_room({})
+    room_id, host = created["room_id"], created["host_token"]
+    tokens = [rooms.join_room(room_id, {"player_name": f"player{n}"})[0]["player_token"]
+              for n in range(args.players)]
+    streams = Streams(room_id)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(streams.open()) for _ in range(args.players)]
+    while rooms.get_room(room_id).subscribers < args.players:
+        await asyncio.sleep(0)
+    results["memory_per_stream_kb"] = round(
+        (tracemalloc.get_traced_memory()[0] - before) / args.players / 1024, 2)
+    tracemalloc.stop()
+
+    # A dealt card, published once, until the last stream has sent it
+    fan_out = []
+    for _ in range(args.rounds):
+        await asyncio.sleep(rooms.STANDINGS_INTERVAL * 1.5)  # let pending standings go out
+        streams.expect(args.players)
+        start = time.perf_counter()
+        rooms.deal_card(room_id, {"host_token": host, "difficulty": "easy"})
+        fan_out.append(await streams.done - start)
+    results["deal_to_all_streams"] = summarize(fan_out)
+    results["deliveries_per_second"] = round(args.players / (sum(fan_out) / len(fan_out)))
+
+    # Every player answers; standings go out every STANDINGS_INTERVAL meanwhile
+    rooms.deal_card(room_id, {"host_token": host, "difficulty": "easy"})
+    streams.bytes = 0
+    latencies = []
+    start = time.perf_counter()
+    for n, token in enumerate(tokens):
+        began = time.perf_counter()
+        rooms.answer_card(room_id, {"player_token": token, "answer_index": n % 4})
+        latencies.append(time.perf_counter() - began)
+        if n % 100 == 0:
+            await asyncio.sleep(0)  # let the loop run timers and streams, as a server would
+    elapsed = time.perf_counter() - start
+    results["answer"] = summarize(latencies)
+    results["answers_per_second"] = round(len(tokens) / elapsed)
+
+    # What encoding the standings for each stream instead of once would add per broadcast
+    room = rooms.get_room(room_id)
+    start = time.perf_counter()
+    for _ in range(100):
+        standings = room._standings_json()
+    encode = (time.perf_counter() - start) / 100
+    results["standings_event_bytes"] = len(standings)
+    results["standings_encode_us"] = round(encode * 1e6, 1)
+    results["encode_per_stream_ms"] = round(encode * args.players * 1000, 1)
+
+    streams.disconnect.set()
+    await asyncio.gather(*tasks)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for name, value in results.items():
+        print(f"{name:24s} {value}")
+    write_results(args.output, "rooms", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""Compare throughput of the sync (gunicorn) and async (uvicorn) deployments.
+
+Starts each server on a local port with the same number of workers, then
+runs simulated players against it: start a game, play turns with the
+look-ahead buffer, end the game. ``--slow-clients`` additionally opens
+connections that send half a request and then stall, the way slow mobile
+clients do; each one pins a sync worker, but only costs the async server a
+coroutine.
+
+Usage:
+    python benchmarks/bench_servers.py [--workers 4] [--players 200] [--slow-clients 8]
+        [--output results/servers.json]
+
+Requires gunicorn and uvicorn (both in requirements.txt).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import time
+
+from common import ROOT, summarize, write_results
+
+SERVERS = {
+    "sync": ["gunicorn", "-w", "{workers}", "-b", "127.0.0.1:{port}", "web_app:app"],
+    "async": ["uvicorn", "asgi_app:app", "--workers", "{workers}", "--port", "{port}",
+              "--log-level", "warning"],
+}
+
+
+async def request(port: int, method: str, path: str, data=None):
+    """Send one HTTP/1.1 request on a fresh connection and return (status, json body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(data).encode() if data is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), json.loads(payload) if payload else None
+
+
+async def play(port: int, turns: int, latencies: list):
+    async def timed(method, path, data=None):
+        start = time.perf_counter()
+        result = await request(port, method, path, data)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    _, game = await timed("POST", "/api/start-game", {"player_name": "bench", "reserve": 1})
+    game_id = game["game_id"]
+    reserved = game["reserved"]
+    for _ in range(turns):
+        card = reserved["easy"][0]
+        _, result = await timed("POST", f"/api/turn/{game_id}",
+                                {"answer_index": 0, "card_id": card["card_id"], "reserve": 1})
+        reserved = result["reserved"]
+    await timed("POST", f"/api/end-game/{game_id}")
+    await timed("GET", "/api/leaderboard")
+
+
+async def stall(port: int, stop: asyncio.Event):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"POST /api/start-game HTTP/1.1\r\nHost: localhost\r\n"
+                 b"Content-Type: application/json\r\nContent-Length: 100\r\n\r\n{")
+    await writer.drain()
+    await stop.wait()
+    writer.close()
+
+
+async def run_load(port: int, players: int, turns: int, slow_clients: int) -> dict:
+    stop = asyncio.Event()
+    stalls = [asyncio.create_task(stall(port, stop)) for _ in range(slow_clients)]
+    await asyncio.sleep(0.2)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(play(port, turns, latencies) for _ in range(players)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*stalls, return_exceptions=True)
+    return {
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        **summarize(latencies),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--slow-clients", type=int, default=0)
+    parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="bench-servers-")
+    for name, command in SERVERS.items():
+        port = free_port()
+        argv = [part.format(workers=args.workers, port=port) for part in command]
+        # In-process games are per worker, so several workers need a shared store
+        env = dict(os.environ)
+        if args.workers > 1 and "GAME_STORE" not in env:
+            env["GAME_STORE"] = f"sqlite:///{tmp}/{name}-games.db"
+        server = subprocess.Popen(argv, cwd=ROOT, env=env)
+        try:
+            wait_until_up(port)
+            results[name] = asyncio.run(
+                run_load(port, args.players, args.turns, args.slow_clients)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{name:6s} {results[name]}")
+
+    write_results(args.output, "servers", args, results)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
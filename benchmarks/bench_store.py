@@ -0,0 +1,76 @@
+"""Measure the per-request overhead of each game session backend.
+
+Every API call that mutates a game does one ``get`` and one ``put``, so the
+round trip below is the extra cost a request pays for a shared store. For
+the signed-token store the ``get`` alone (verify the signature and unpack
+the game) is also reported.
+
+Usage:
+    python benchmarks/bench_store.py [--iterations N] [--redis-url URL]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cards import Difficulty  # noqa: E402
+from game_engine import GameEngine  # noqa: E402
+from session_store import (  # noqa: E402
+    MemoryGameStore, SignedTokenGameStore, SQLiteGameStore, create_game_store,
+)
+
+
+def bench_round_trip(store, iterations: int) -> float:
+    """Return the mean microseconds for one get + draw + put cycle."""
+    game_id = store.put("bench", GameEngine("bench"))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        game = store.get(game_id)
+        game.draw_card(Difficulty.EASY)
+        game_id = store.put(game_id, game)
+    elapsed = time.perf_counter() - start
+    store.delete(game_id)
+    return elapsed / iterations * 1e6
+
+
+def bench_get(store, iterations: int) -> float:
+    """Return the mean microseconds for one ``get``."""
+    game = GameEngine("bench")
+    for difficulty in Difficulty:
+        game.draw_card(difficulty)
+    game_id = store.put("bench", game)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        store.get(game_id)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--redis-url", help="also benchmark a Redis-protocol server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            "memory": MemoryGameStore(),
+            "sqlite": SQLiteGameStore(os.path.join(tmp, "games.db")),
+            "token": SignedTokenGameStore(os.urandom(32)),
+        }
+        if args.redis_url:
+            stores["redis"] = create_game_store(args.redis_url)
+
+        baseline = None
+        for name, store in stores.items():
+            micros = bench_round_trip(store, args.iterations)
+            baseline = micros if baseline is None else baseline
+            print(f"{name:8s} {micros:9.1f} us/request  (+{micros - baseline:.1f} us vs memory)")
+        print(f"token verify {bench_get(stores['token'], args.iterations):.1f} us/get")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""Helpers shared by the benchmark scripts: latency summaries and JSON results."""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def summarize(latencies: list) -> dict:
+    """Return count and p50/p95/p99 in milliseconds for a list of latencies in seconds."""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, benchmark: str, args, results: dict):
+    """Save ``results`` with enough context (commit, Python, arguments) to compare runs.
+
+    ``path`` of ``-`` prints to stdout instead.
+    """
+    document = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "args": vars(args),
+        "results": results,
+    }
+    if path == "-":
+        json.dump(document, sys.stdout, indent=2)
+        print()
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"results written to {path}")
\ No newline at end of file
@@ -0,0 +1,346 @@
+"""External card packs for Supply Chain Strategy Card Game.
+
+Card content lives in JSONL packs (``packs/*.jsonl``, one card per line)
+instead of Python literals. Packs are validated, then compiled into a
+binary catalog cache named after the SHA-256 of the pack contents, so a
+worker that finds an up-to-date cache just memory-maps it. The mapped file
+is shared through the page cache by every worker on the host.
+
+Cache layout (little-endian):
+
+    header   magic "SCPK", version u16, slot count u32, cards per difficulty 3 x u32
+    entries  one per card ID: difficulty u8, 3 pad bytes,
+             record offset/length u32, payload offset/length u32
+    ids      card IDs of each difficulty as u32, easy then intermediate then hard
+    data     JSON records and pre-encoded public payloads
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from cards import CardCatalog, Difficulty, public_payload
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAGIC = b"SCPK"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sHI3I2x")
+CACHE_ENTRY = struct.Struct("<B3xIIII")
+
+# Card IDs index the cache's entry table, so keep them small enough to allocate
+MAX_CARD_ID = 1 << 20
+
+DEFAULT_PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packs")
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "supply-chain-game", "card-cache")
+
+_DIFFICULTIES = {d.name.lower(): d for d in Difficulty}
+_CARD_FIELDS = {
+    "id": int,
+    "difficulty": str,
+    "category": str,
+    "title": str,
+    "description": str,
+    "real_world_impact": str,
+    "answers": list,
+}
+_ANSWER_FIELDS = {
+    "text": str,
+    "is_correct": bool,
+    "explanation": str,
+    "points_if_correct": int,
+}
+
+
+class PackError(ValueError):
+    """Raised when a card pack does not match the schema."""
+
+
+class CatalogUnavailable(LookupError):
+    """Raised when a stored game needs a catalog version this host no longer has."""
+
+
+def _check_fields(obj, fields: Dict[str, type], where: str):
+    if not isinstance(obj, dict):
+        raise PackError(f"{where}: expected an object")
+    for name, kind in fields.items():
+        value = obj.get(name)
+        # bool is an int subclass, so reject it explicitly for int fields
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise PackError(f"{where}: '{name}' must be {kind.__name__}")
+    extra = set(obj) - set(fields)
+    if extra:
+        raise PackError(f"{where}: unknown fields {sorted(extra)}")
+
+
+def validate_card(record: dict, where: str):
+    """Raise PackError unless ``record`` is a valid card."""
+    _check_fields(record, _CARD_FIELDS, where)
+    if not 0 <= record["id"] < MAX_CARD_ID:
+        raise PackError(f"{where}: 'id' must be >= 0 and < {MAX_CARD_ID}")
+    if record["difficulty"] not in _DIFFICULTIES:
+        raise PackError(f"{where}: 'difficulty' must be one of {sorted(_DIFFICULTIES)}")
+    if not record["answers"]:
+        raise PackError(f"{where}: card has no answers")
+    for i, answer in enumerate(record["answers"]):
+        _check_fields(answer, _ANSWER_FIELDS, f"{where} answer {i}")
+        if answer["points_if_correct"] < 0:
+            raise PackError(f"{where} answer {i}: 'points_if_correct' must be >= 0")
+    if not any(answer["is_correct"] for answer in record["answers"]):
+        raise PackError(f"{where}: card has no correct answer")
+
+
+def pack_files(pack_dir: str) -> List[str]:
+    """Return the pack files in ``pack_dir`` in load order."""
+    return sorted(
+        os.path.join(pack_dir, name) for name in os.listdir(pack_dir)
+        if name.endswith(".jsonl")
+    )
+
+
+def read_packs(paths: List[str]) -> List[dict]:
+    """Parse and validate every card in ``paths``.
+
+    Card IDs must be unique across packs and every difficulty needs at
+    least one card, since games can ask for any of them.
+    """
+    records = []
+    seen = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                where = f"{os.path.basename(path)}:{lineno}"
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    raise PackError(f"{where}: {exc}") from None
+                validate_card(record, where)
+                if record["id"] in seen:
+                    raise PackError(
+                        f"{where}: duplicate card id {record['id']} (first in {seen[record['id']]})"
+                    )
+                seen[record["id"]] = where
+                records.append(record)
+    _check_counts({d: sum(r["difficulty"] == name for r in records)
+                   for name, d in _DIFFICULTIES.items()})
+    return records
+
+
+def _check_counts(counts: Dict[Difficulty, int]):
+    empty = [d.name.lower() for d, count in counts.items() if not count]
+    if empty:
+        raise PackError(f"no cards for difficulty {', '.join(empty)}")
+
+
+def content_hash(paths: List[str]) -> str:
+    """Hash the pack contents (and cache format) that a compiled catalog depends on."""
+    digest = hashlib.sha256(CACHE_MAGIC + struct.pack("<H", CACHE_VERSION))
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + b"\0" + f.read() + b"\0")
+    return digest.hexdigest()
+
+
+def compile_cache(records: List[dict], path: str):
+    """Write the binary catalog for ``records`` to ``path`` atomically."""
+    slots = max((r["id"] for r in records), default=-1) + 1
+    by_difficulty = {d: [] for d in Difficulty}
+    for record in sorted(records, key=lambda r: r["id"]):
+        by_difficulty[_DIFFICULTIES[record["difficulty"]]].append(record)
+
+    ids_size = 4 * len(records)
+    data_start = CACHE_HEADER.size + CACHE_ENTRY.size * slots + ids_size
+    entries = [CACHE_ENTRY.pack(0, 0, 0, 0, 0)] * slots
+    data = bytearray()
+    for difficulty, pile in by_difficulty.items():
+        for record in pile:
+            encoded = json.dumps(
+                [record["title"], record["description"], record["category"],
+                 record["real_world_impact"],
+                 [[a["text"], a["is_correct"], a["explanation"], a["points_if_correct"]]
+                  for a in record["answers"]]],
+                separators=(",", ":"),
+            ).encode()
+            card = CardCatalog.decode_record(record["id"], difficulty, encoded)
+            payload = public_payload(card)
+            record_offset = data_start + len(data)
+            data += encoded
+            entries[record["id"]] = CACHE_ENTRY.pack(
+                difficulty.value, record_offset, len(encoded),
+                record_offset + len(encoded), len(payload),
+            )
+            data += payload
+
+    header = CACHE_HEADER.pack(
+        CACHE_MAGIC, CACHE_VERSION, slots, *(len(by_difficulty[d]) for d in Difficulty)
+    )
+    ids = struct.pack(
+        f"<{len(records)}I", *(r["id"] for d in Difficulty for r in by_difficulty[d])
+    )
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + b"".join(entries) + ids + data)
+    os.replace(tmp_path, path)
+
+
+def open_cache(path: str, version: int = 0) -> CardCatalog:
+    """Memory-map a compiled catalog; ``version`` is its pack content hash, if known."""
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, cache_version, slots, *counts = CACHE_HEADER.unpack_from(buffer, 0)
+    if magic != CACHE_MAGIC or cache_version != CACHE_VERSION:
+        raise PackError(f"{path}: not a version {CACHE_VERSION} card cache")
+    # A cache compiled before empty difficulties were rejected
+    _check_counts(dict(zip(Difficulty, counts)))
+    return CardCatalog(buffer, slots, counts, CACHE_HEADER.size, CACHE_ENTRY, version)
+
+
+def _cache_path(cache_dir: str, version: int) -> str:
+    return os.path.join(cache_dir, f"catalog-{version:016x}.bin")
+
+
+def load_catalog(pack_dir: str = DEFAULT_PACK_DIR,
+                 cache_dir: str = DEFAULT_CACHE_DIR) -> CardCatalog:
+    """Return the catalog for the packs in ``pack_dir``, compiling it if no cache matches."""
+    paths = pack_files(pack_dir)
+    version = int(content_hash(paths)[:16], 16)
+    path = _cache_path(cache_dir, version)
+    if not os.path.exists(path):
+        compile_cache(read_packs(paths), path)
+    return _remember(open_cache(path, version))
+
+
+class CatalogReloader:
+    """Swaps in a new catalog when the pack files change.
+
+    ``maybe_reload`` is cheap enough to call on every request: it stats the
+    pack files at most once per ``interval`` seconds and only re-hashes and
+    recompiles when their size or mtime changed. Sessions keep the catalog
+    they started with, so replacing the current one never breaks a game.
+    """
+
+    def __init__(self, pack_dir: str = DEFAULT_PACK_DIR,
+                 cache_dir: str = DEFAULT_CACHE_DIR, interval: float = 5.0):
+        self.pack_dir = pack_dir
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self._signature = self._stat()
+        self._next_check = time.monotonic() + interval
+        self._lock = threading.Lock()
+        self.catalog = load_catalog(pack_dir, cache_dir)
+
+    def _stat(self) -> tuple:
+        return tuple(
+            (path, st.st_size, st.st_mtime_ns)
+            for path in pack_files(self.pack_dir)
+            for st in (os.stat(path),)
+        )
+
+    def maybe_reload(self) -> Optional[CardCatalog]:
+        """Reload if the packs changed; return the new catalog, or None if nothing changed."""
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._next_check = now + self.interval
+            signature = self._stat()
+            if signature == self._signature:
+                return None
+            self._signature = signature
+            try:
+                self.catalog = load_catalog(self.pack_dir, self.cache_dir)
+            except (OSError, PackError):
+                # Keep serving the last good catalog until the packs are fixed
+                logger.exception("Card pack reload failed")
+                return None
+            return self.catalog
+        finally:
+            self._lock.release()
+
+
+_reloader: Optional[CatalogReloader] = None
+
+# Catalogs this process has loaded, by version, most recently used last.
+# Stores that serialize games (SQLite, Redis, tokens) rebuild each game
+# against the version it started with, so a reload never changes its cards.
+_catalogs: "OrderedDict[int, CardCatalog]" = OrderedDict()
+_catalogs_lock = threading.Lock()
+MAX_CATALOGS = 8
+
+
+def _remember(catalog: CardCatalog) -> CardCatalog:
+    with _catalogs_lock:
+        _catalogs[catalog.version] = catalog
+        _catalogs.move_to_end(catalog.version)
+        while len(_catalogs) > MAX_CATALOGS:
+            _catalogs.popitem(last=False)
+    return catalog
+
+
+def get_catalog() -> CardCatalog:
+    """Return the current card catalog, loading the packs on first use.
+
+    ``CARD_PACK_DIR`` and ``CARD_CACHE_DIR`` override where packs and the
+    compiled cache live; ``CARD_RELOAD_SECONDS`` sets how often
+    ``maybe_reload`` looks for changed packs.
+    """
+    global _reloader
+    if _reloader is None:
+        _reloader = CatalogReloader(
+            os.environ.get("CARD_PACK_DIR", DEFAULT_PACK_DIR),
+            os.environ.get("CARD_CACHE_DIR", DEFAULT_CACHE_DIR),
+            float(os.environ.get("CARD_RELOAD_SECONDS", 5)),
+        )
+    return _reloader.catalog
+
+
+def catalog_for(version: int) -> CardCatalog:
+    """Return the catalog compiled from pack contents ``version``.
+
+    Looks in the catalogs this process has loaded, then for its compiled
+    cache in ``CARD_CACHE_DIR`` (another worker may have loaded it, or it
+    predates this worker). Raises CatalogUnavailable if neither has it.
+    """
+    catalog = _catalogs.get(version)
+    if catalog is not None:
+        return catalog
+    get_catalog()
+    try:
+        return _remember(open_cache(_cache_path(_reloader.cache_dir, version), version))
+    except (OSError, PackError):
+        raise CatalogUnavailable(f"card catalog {version:016x} is not available") from None
+
+
+def get_all_cards():
+    """Return card IDs by difficulty."""
+    return get_catalog().by_difficulty
+
+
+def maybe_reload() -> Optional[CardCatalog]:
+    """Swap in a new catalog if the packs changed (see ``CatalogReloader``)."""
+    get_catalog()
+    return _reloader.maybe_reload()
+
+
+if __name__ == "__main__":
+    # Validate and compile packs ahead of a deploy: python card_packs.py [pack_dir]
+    import sys
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PACK_DIR
+    try:
+        compiled = load_catalog(directory)
+    except PackError as exc:
+        sys.exit(f"Invalid card pack: {exc}")
+    print(f"{len(compiled)} cards OK")
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""Per-card answer statistics and weighted card sampling for adaptive play.
+
+``CardStats`` keeps two counters per card ID, times answered and times
+answered correctly, in one flat array of unsigned 32-bit integers (8 bytes
+a card) that answers update in place. With ``CARD_STATS_DIR`` set the array
+is a memory-mapped file that every worker on the host updates, so each sees
+the others' answers; increments from two workers may race and lose one,
+which is fine for statistics. Unset, each worker counts its own answers.
+
+``CardSampler`` picks a card of one difficulty in O(log n). It orders the
+cards by their smoothed correct rate and keeps a Fenwick tree of sampling
+weights in that order, so a draw limited to a band of correct rates is two
+binary searches, two prefix sums and one descent of the tree. Weights
+favour cards that have been answered less often and follow each answer;
+the order itself is rebuilt from the counts every ``REBUILD_SECONDS``.
+"""
+
+import bisect
+import fcntl
+import math
+import mmap
+import os
+import random
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cards import Card, CardCatalog, Difficulty
+
+# Correct rate assumed for a card nobody has answered yet, by Difficulty.value
+PRIOR_RATE = (0.0, 0.8, 0.6, 0.4)
+
+# How many answers the prior is worth when smoothing a card's correct rate
+PRIOR_WEIGHT = 5
+
+# How often a sampler re-sorts its cards by correct rate
+REBUILD_SECONDS = 30.0
+
+# Samplers kept per worker: the current catalog's three difficulties plus,
+# after a pack reload, those of the catalog that running games started with
+MAX_SAMPLERS = 6
+
+
+def _weight(answered: int) -> float:
+    # Cards answered less often are worth more to sample: their rate is less certain
+    return 1.0 / math.sqrt(1 + answered)
+
+
+class CardSampler:
+    """Weighted sampling over one difficulty's cards, ordered by correct rate.
+
+    ``rates`` and ``cards`` are sorted together; ``tree`` is a Fenwick tree
+    (1-based) over the cards' weights in that order.
+    """
+
+    __slots__ = ("source", "cards", "rates", "rate", "positions", "tree", "built_at")
+
+    def __init__(self, source: Sequence[int], stats: "CardStats", prior: float):
+        self.source = source
+        answered, correct = stats.columns(source)
+        # The difficulty's own rate is the prior for its unanswered cards
+        self.rate = (sum(correct) + prior * PRIOR_WEIGHT) / (sum(answered) + PRIOR_WEIGHT)
+        smoothing = self.rate * PRIOR_WEIGHT
+        rates = [(right + smoothing) / (seen + PRIOR_WEIGHT) for seen, right in zip(answered, correct)]
+        order = sorted(range(len(rates)), key=rates.__getitem__)
+        self.rates = [rates[i] for i in order]
+        self.cards = [source[i] for i in order]
+        self.positions = {card_id: position for position, card_id in enumerate(self.cards)}
+        tree = [0.0]
+        tree.extend(_weight(answered[i]) for i in order)
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def answered(self, card_id: int, seen: int):
+        """Move a card's weight from ``seen - 1`` answers to ``seen``."""
+        position = self.positions.get(card_id)
+        if position is None:
+            return
+        delta = _weight(seen) - _weight(seen - 1)
+        tree = self.tree
+        i = position + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, count: int) -> float:
+        """Total weight of the first ``count`` cards."""
+        total = 0.0
+        tree = self.tree
+        while count:
+            total += tree[count]
+            count &= count - 1
+        return total
+
+    def sample(self, low: float, high: float, rng=random) -> Optional[int]:
+        """Draw a card ID by weight among cards with a correct rate in ``[low, high]``.
+
+        When no card falls in the band the card closest to it is returned;
+        None only for an empty difficulty.
+        """
+        if not self.cards:
+            return None
+        start = bisect.bisect_left(self.rates, low)
+        end = bisect.bisect_right(self.rates, high)
+        if start >= end:
+            if start == len(self.cards) or (start and low - self.rates[start - 1] < self.rates[start] - high):
+                start -= 1
+            return self.cards[start]
+        base = self._prefix(start)
+        target = base + rng.random() * (self._prefix(end) - base)
+        # Descend the tree to the last position whose prefix is at most ``target``
+        tree = self.tree
+        position = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            child = position + step
+            if child < len(tree) and tree[child] <= target:
+                position = child
+                target -= tree[child]
+            step >>= 1
+        return self.cards[min(max(position, start), end - 1)]
+
+
+class CardStats:
+    """Answered and correct counts by card ID, plus the samplers built from them."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.path = os.path.join(directory, "card-stats.bin") if directory else None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._counts = memoryview(array("I"))
+        self._samplers: Dict[Tuple[CardCatalog, Difficulty], CardSampler] = {}
+        self._lock = threading.Lock()
+
+    def _grow(self, cards: int):
+        """Make room for card IDs below ``cards`` (rounded up to a power of two)."""
+        with self._lock:
+            if len(self._counts) >= 2 * cards:
+                return
+            size = 8 << max(cards - 1, 1).bit_length()
+            if self.path is None:
+                counts = array("I", self._counts)
+                counts.frombytes(bytes(size - 4 * len(counts)))
+                self._counts = memoryview(counts)
+                return
+            with open(self.path, "a+b") as f:
+                # Only ever grow the shared file; another worker may have grown it already
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(f.fileno()).st_size < size:
+                        f.truncate(size)
+                    buffer = mmap.mmap(f.fileno(), 0)
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            # The old map stays alive until nothing references its view
+            self._counts = memoryview(buffer)[:len(buffer) // 8 * 8].cast("I")
+
+    def counts(self, card_id: int) -> Tuple[int, int]:
+        """``(answered, correct)`` for a card; zeros for a card never answered."""
+        slot = 2 * card_id
+        if slot >= len(self._counts):
+            if self.path is None or not os.path.exists(self.path):
+                return 0, 0
+            # Another worker may have answered cards beyond our map
+            self._grow(card_id + 1)
+            if slot >= len(self._counts):
+                return 0, 0
+        return self._counts[slot], self._counts[slot + 1]
+
+    def columns(self, card_ids: Sequence[int]) -> Tuple[List[int], List[int]]:
+        """Answered and correct counts for many cards at once."""
+        if card_ids:
+            self.counts(max(card_ids))
+        counts = self._counts
+        answered = counts[0::2].tolist()
+        correct = counts[1::2].tolist()
+        size = len(answered)
+        return ([answered[i] if i < size else 0 for i in card_ids],
+                [correct[i] if i < size else 0 for i in card_ids])
+
+    def record(self, card: Card, correct: bool):
+        """Count one answer to ``card``."""
+        slot = 2 * card.id
+        if slot >= len(self._counts):
+            self._grow(card.id + 1)
+        counts = self._counts
+        seen = counts[slot] = counts[slot] + 1
+        if correct:
+            counts[slot + 1] += 1
+        for (_, difficulty), sampler in list(self._samplers.items()):
+            if difficulty is card.difficulty:
+                sampler.answered(card.id, seen)
+
+    def sampler(self, catalog: CardCatalog, difficulty: Difficulty) -> CardSampler:
+        """Return the sampler for a catalog's difficulty, rebuilding it when it is stale."""
+        key = (catalog, difficulty)
+        sampler = self._samplers.get(key)
+        if sampler is None or time.monotonic() - sampler.built_at > REBUILD_SECONDS:
+            sampler = CardSampler(catalog.by_difficulty[difficulty], self, PRIOR_RATE[difficulty.value])
+            self._samplers.pop(key, None)
+            self._samplers[key] = sampler
+            while len(self._samplers) > MAX_SAMPLERS:
+                self._samplers.pop(next(iter(self._samplers)))
+        return sampler
+
+
+_stats: Optional[CardStats] = None
+
+
+def get_card_stats() -> CardStats:
+    """Return this worker's card statistics (shared through ``CARD_STATS_DIR`` when set)."""
+    global _stats
+    if _stats is None:
+        _stats = CardStats(os.environ.get("CARD_STATS_DIR") or None)
+    return _stats
\ No newline at end of file
@@ -2,6 +2,16 @@
 let currentGameId = null;
 let currentCard = null;
 let isAnswered = false;
+let currentDifficulty = 'easy';
+let chosenDifficulty = 'easy';  // what the player last picked; 'auto' lets the server choose
+let cardsPlayed = 0;
+
+// Look-ahead buffer: the next few cards of each difficulty, reserved on the
+// server but not played until answered
+const RESERVE_COUNT = 2;
+let reservedCards = {};
+let pendingCardId = null;
+let cardShownAt = 0;  // performance.now() when the current card appeared
 
 // API Base URL
 const API_BASE = '/api';
@@ -27,14 +37,17 @@ function startGame() {
     fetch(`${API_BASE}/start-game`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ player_name: playerName })
+        body: JSON.stringify({ player_name: playerName, reserve: RESERVE_COUNT })
     })
     .then(response => response.json())
     .then(data => {
         currentGameId = data.game_id;
+        cardsPlayed = 0;
+        chosenDifficulty = 'easy';
+        reservedCards = data.reserved || {};
         document.getElementById('player-name-display').textContent = `Player: ${data.player_name}`;
         showScreen('game-screen');
-        drawCard('easy');
+        playCard('easy');
     })
     .catch(error => {
         console.error('Error:', error);
@@ -42,6 +55,19 @@ function startGame() {
     });
 }
 
+// Show the next card of a difficulty, from the look-ahead buffer when possible
+function playCard(difficulty) {
+    const pile = reservedCards[difficulty];
+    if (pile && pile.length) {
+        // Counts as played once answered, so show the count it will have then
+        const card = pile.shift();
+        showCard({ ...card, cards_played: cardsPlayed + 1 });
+        pendingCardId = card.card_id;
+    } else {
+        drawCard(difficulty);
+    }
+}
+
 // Draw a card
 function drawCard(difficulty) {
     if (!currentGameId) return;
@@ -52,10 +78,9 @@ function drawCard(difficulty) {
     })
     .then(response => response.json())
     .then(data => {
-        currentCard = data;
-        displayCard(data);
-        isAnswered = false;
-        document.getElementById('result-panel').classList.add('hidden');
+        // With signed-token sessions every update comes back with a new ID
+        currentGameId = data.game_id || currentGameId;
+        showCard(data);
     })
     .catch(error => {
         console.error('Error:', error);
@@ -63,6 +88,17 @@ function drawCard(difficulty) {
     });
 }
 
+// Make a card the current one
+function showCard(card) {
+    currentCard = card;
+    currentDifficulty = card.difficulty.toLowerCase();
+    pendingCardId = null;
+    displayCard(card);
+    cardShownAt = performance.now();
+    isAnswered = false;
+    document.getElementById('result-panel').classList.add('hidden');
+}
+
 // Display card on screen
 function displayCard(card) {
     // Set difficulty badge color
@@ -87,8 +123,7 @@ function displayCard(card) {
         answersContainer.appendChild(btn);
     });
     
-    // Update stats
-    updateStats();
+    document.getElementById('cards-display').textContent = card.cards_played;
 }
 
 // Submit an answer
@@ -102,18 +137,33 @@ function submitAnswer(answerIndex) {
     
     isAnswered = true;
     
-    fetch(`${API_BASE}/answer/${currentGameId}`, {
+    // One request plays a buffered card, answers it, returns stats and refills the buffer
+    fetch(`${API_BASE}/turn/${currentGameId}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ answer_index: answerIndex })
+        body: JSON.stringify({
+            answer_index: answerIndex,
+            card_id: pendingCardId,
+            answer_ms: Math.round(performance.now() - cardShownAt),
+            reserve: RESERVE_COUNT
+        })
     })
     .then(response => response.json())
     .then(data => {
+        if (data.error) throw new Error(data.error);
+        currentGameId = data.game_id || currentGameId;
+        reservedCards = data.reserved || {};
+        pendingCardId = null;
         displayResult(data);
     })
     .catch(error => {
         console.error('Error:', error);
         alert('Failed to submit answer');
+        if (pendingCardId !== null) {
+            // The buffered card went stale (e.g. played in another tab); draw a fresh one
+            reservedCards = {};
+            drawCard(currentDifficulty);
+        }
     });
 }
 
@@ -146,45 +196,36 @@ function displayResult(result) {
     // Update stats display
     document.getElementById('score-display').textContent = result.total_score;
     document.getElementById('accuracy-display').textContent = result.accuracy;
+    cardsPlayed = result.cards_played;
+    document.getElementById('cards-display').textContent = result.cards_played;
 }
 
 // Go to next card
 function nextCard() {
-    const difficulty = prompt(
-        'Choose difficulty for next card:\n1 = Easy\n2 = Intermediate\n3 = Hard',
-        '1'
-    );
-    
-    if (!difficulty) return;
-    
     const diffMap = {
         '1': 'easy',
         '2': 'intermediate',
-        '3': 'hard'
+        '3': 'hard',
+        '4': 'auto'
     };
+    const currentChoice = Object.keys(diffMap).find(key => diffMap[key] === chosenDifficulty);
+    
+    const difficulty = prompt(
+        'Choose difficulty for next card:\n1 = Easy\n2 = Intermediate\n3 = Hard\n4 = Adaptive (matched to how you play)',
+        currentChoice
+    );
+    
+    if (!difficulty) return;
     
     const selectedDifficulty = diffMap[difficulty];
     if (selectedDifficulty) {
-        drawCard(selectedDifficulty);
+        chosenDifficulty = selectedDifficulty;
+        playCard(selectedDifficulty);
     } else {
         alert('Invalid choice');
     }
 }
 
-// Update game stats
-function updateStats() {
-    if (!currentGameId) return;
-    
-    fetch(`${API_BASE}/stats/${currentGameId}`)
-    .then(response => response.json())
-    .then(data => {
-        document.getElementById('score-display').textContent = data.total_score;
-        document.getElementById('accuracy-display').textContent = data.accuracy;
-        document.getElementById('cards-display').textContent = data.cards_played;
-    })
-    .catch(error => console.error('Error updating stats:', error));
-}
-
 // Quit game
 function quitGame() {
     if (!currentGameId) return;
@@ -221,7 +262,8 @@ function displayFinalResults(data) {
     if (data.rank) {
         const medals = ['🥇', '🥈', '🥉'];
         const medal = data.rank <= 3 ? medals[data.rank - 1] : '';
-        rankDisplay.textContent = `${medal} #${data.rank}`;
+        const top = data.top_percent !== undefined ? ` (top ${data.top_percent}%)` : '';
+        rankDisplay.textContent = `${medal} #${data.rank}${top}`;
     } else {
         rankDisplay.textContent = 'Unranked';
     }
@@ -238,7 +280,8 @@ function showLeaderboard() {
 
 // Load leaderboard data
 function loadLeaderboard() {
-    fetch(`${API_BASE}/leaderboard`)
+    // Revalidate with the ETag so a just-finished game shows up; unchanged boards cost a 304
+    fetch(`${API_BASE}/leaderboard`, { cache: 'no-cache' })
     .then(response => response.json())
     .then(data => {
         const tbody = document.getElementById('leaderboard-body');
@@ -279,6 +322,8 @@ function showAbout() {
 function backToMenu() {
     currentGameId = null;
     currentCard = null;
+    reservedCards = {};
+    pendingCardId = null;
     document.getElementById('player-name').value = '';
     showScreen('menu-screen');
 }
@@ -0,0 +1,495 @@
+"""Framework-neutral API handlers for Supply Chain Strategy Card Game.
+
+The Flask app (web_app.py) and the ASGI app (asgi_app.py) both route to
+these functions. Each handler takes plain arguments and returns
+``(body, status)``, where ``body`` is a dict to encode as JSON or bytes
+that are already encoded JSON, or ``(body, status, headers)`` with a dict
+of extra response headers.
+"""
+
+import hashlib
+import hmac
+import os
+import uuid
+
+from game_engine import MIXES, WINDOWS, GameEngine, RankingSystem
+from session_store import MemoryGameStore, SignedTokenGameStore, create_game_store
+from score_log import ScoreLog
+import score_import
+from cards import Difficulty
+from card_packs import MAX_CARD_ID, CatalogUnavailable, get_catalog
+import metrics
+import responses
+from responses import BOOL, INT, JSON, PERCENT, STR, Schema
+
+DIFFICULTY_MAP = {
+    'easy': Difficulty.EASY,
+    'intermediate': Difficulty.INTERMEDIATE,
+    'hard': Difficulty.HARD,
+}
+
+# Difficulty name that lets the scheduler pick the card (GameEngine.draw_adaptive)
+ADAPTIVE = 'auto'
+
+# Most upcoming cards per difficulty a client may reserve for instant display
+MAX_RESERVE = 3
+
+# Load (or compile) the card catalog before workers fork so they share it
+get_catalog()
+
+# Global ranking system (in-memory unless LEADERBOARD_DIR points at a shared directory)
+leaderboard_dir = os.environ.get('LEADERBOARD_DIR')
+ranking_system = RankingSystem(ScoreLog(leaderboard_dir) if leaderboard_dir else None)
+
+# Signs Flask sessions and, with GAME_STORE=token://, game tokens
+SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+
+# Enables POST /api/admin/import-scores for requests that present it
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+
+# Store active games (in-process by default, see session_store.py for shared backends)
+# Idle games expire after GAME_TTL_SECONDS; MAX_LIVE_GAMES caps the registry (0 disables);
+# SESSION_LOG_DIR lets in-process games survive a worker restart (session_log.py)
+active_games = create_game_store(
+    os.environ.get('GAME_STORE', 'memory://'),
+    ttl=float(os.environ.get('GAME_TTL_SECONDS', 3600)) or None,
+    max_games=int(os.environ.get('MAX_LIVE_GAMES', 10000)) or None,
+    secret=SECRET_KEY,
+    log_dir=os.environ.get('SESSION_LOG_DIR') or None,
+    log_sync=os.environ.get('SESSION_LOG_SYNC') == '1',
+)
+
+# Whether handlers may wait on I/O (a database, Redis, a synced session log
+# or the shared score log), so async servers should run them off the event loop
+BLOCKING_IO = (
+    not isinstance(active_games, (MemoryGameStore, SignedTokenGameStore))
+    or ranking_system.log is not None
+    or getattr(active_games, 'log', None) is not None and active_games.log.sync
+)
+
+# Per-worker stores hold a share of the games (sum across workers); shared
+# ones look the same from every worker (max)
+metrics.Gauge(
+    metrics.registry, 'game_live_games', 'Live games in the session store.',
+    lambda: len(active_games),
+    mode='sum' if isinstance(active_games, MemoryGameStore) else 'max',
+)
+metrics.Gauge(
+    metrics.registry, 'leaderboard_players', 'Scores on the leaderboard.',
+    lambda: len(ranking_system),
+    mode='sum' if ranking_system.log is None else 'max',
+)
+
+NOT_FOUND = ({'error': 'Game not found'}, 404)
+NO_CARDS = ({'error': 'No cards for that difficulty'}, 400)
+BAD_ANSWER = ({'error': 'answer_index must be an integer'}, 400)
+BAD_BODY = ({'error': 'Request body must be a JSON object'}, 400)
+
+CARDS_GONE = (
+    {'error': 'This game was started with card packs that are no longer available; start a new game'},
+    410,
+)
+
+# Browsers and CDNs may reuse a leaderboard response for this long; after
+# that they revalidate with If-None-Match and usually get a 304
+LEADERBOARD_MAX_AGE = int(os.environ.get('LEADERBOARD_MAX_AGE', 5))
+
+# (window, mix) -> (RankingSystem.top_version it was built at, encoded body, ETag)
+_leaderboard_cache = {}
+
+# Encoded shapes of the responses every turn produces (see responses.py)
+STATS = Schema(
+    ('player_name', STR),
+    ('total_score', INT),
+    ('cards_played', INT),
+    ('cards_won', INT),
+    ('accuracy', PERCENT),
+    ('easy_streak', INT),
+    ('intermediate_streak', INT),
+    ('hard_streak', INT),
+    ('streak_bonus', INT),
+)
+START = Schema(('game_id', STR), ('player_name', STR), ('message', STR))
+ANSWER = Schema(
+    ('game_id', STR),
+    ('is_correct', BOOL),
+    ('points_earned', INT),
+    ('explanation', STR),
+    ('total_score', INT),
+    ('accuracy', PERCENT),
+    ('cards_won', INT),
+    ('cards_played', INT),
+    ('streak_bonus', INT),
+)
+TURN = Schema(('is_correct', BOOL), ('points_earned', INT), ('explanation', STR)).extend(
+    *STATS.fields, ('game_id', STR)
+)
+END = Schema(
+    ('player_name', STR),
+    ('final_score', INT),
+    ('accuracy', PERCENT),
+    ('cards_played', INT),
+    ('cards_won', INT),
+    ('streak_bonus_applied', INT),
+    ('mix', STR),
+    ('rank', INT),
+    ('top_percent', JSON),
+)
+
+
+def start_game(data):
+    """Start a new game for a player."""
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    player_name = data.get('player_name', 'Anonymous')
+    reserve = _reserve_count(data)
+    
+    if not player_name:
+        return {'error': 'Player name required'}, 400
+    if not isinstance(player_name, str):
+        return {'error': 'Player name must be a string'}, 400
+    
+    # Initialize game
+    game = GameEngine(player_name)
+    # Reserving starts the decks, so it must happen before the game is stored
+    reserved = _reserved_json(game, reserve) if reserve else None
+    
+    # Create a unique game ID (must not collide across workers)
+    game_id = active_games.put(uuid.uuid4().hex, game)
+    body = START.encode(game_id, player_name, f'Welcome, {player_name}!')
+    
+    if reserved is None:
+        return body, 200
+    return _with_fields(body, reserved=reserved), 200
+
+
+def draw_card(game_id, difficulty):
+    """Draw a card for a specific game."""
+    game, error = _load(game_id)
+    if error:
+        return error
+    
+    # Parse difficulty
+    diff = _parse_difficulty(difficulty)
+    if not diff:
+        return {'error': 'Invalid difficulty'}, 400
+    if not _has_cards(game, diff):
+        return NO_CARDS
+    
+    # Draw card
+    card = _draw(game, diff)
+    game_id = active_games.put(game_id, game)
+    
+    return _card_json(game, card)[:-1] + b',"game_id":"%s"}' % game_id.encode(), 200
+
+
+def submit_answer(game_id, data):
+    """Submit an answer to the current card."""
+    game, error = _load(game_id)
+    if error:
+        return error
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    answer_index = data.get('answer_index')
+    
+    if answer_index is None:
+        return {'error': 'Answer required'}, 400
+    if not _is_int(answer_index):
+        return BAD_ANSWER
+    
+    # Process answer
+    is_correct, points, explanation = game.answer_question(answer_index, _answer_seconds(data))
+    game_id = active_games.put(game_id, game)
+    
+    return ANSWER.encode(
+        game_id, is_correct, points, explanation, game.score, game.get_accuracy(),
+        game.cards_won, game.cards_played, game.get_streak_bonus(),
+    ), 200
+
+
+def play_turn(game_id, data):
+    """Answer the current card and return full stats, optionally drawing the next card.
+
+    Replaces the answer -> stats -> draw-card sequence with one round trip.
+    With ``card_id`` the client is answering a card it displayed from its
+    reserved buffer; it is drawn first, so it only counts as played now.
+    ``reserve`` returns the next few cards of every difficulty.
+    """
+    game, error = _load(game_id)
+    if error:
+        return error
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    answer_index = data.get('answer_index')
+    
+    if answer_index is None:
+        return {'error': 'Answer required'}, 400
+    if not _is_int(answer_index):
+        return BAD_ANSWER
+    
+    # Validate the next difficulty before touching game state
+    next_difficulty = data.get('next_difficulty')
+    diff = None
+    if next_difficulty is not None:
+        diff = _parse_difficulty(next_difficulty)
+        if not diff:
+            return {'error': 'Invalid difficulty'}, 400
+        if not _has_cards(game, diff):
+            return NO_CARDS
+    reserve = _reserve_count(data)
+    
+    card_id = data.get('card_id')
+    if card_id is not None and not (_is_int(card_id) and 0 <= card_id < MAX_CARD_ID):
+        return {'error': 'Invalid card_id'}, 400
+    # Check the answer against the card it is for before drawing, so a bad one uses nothing up
+    card = game.current_card if card_id is None else game.catalog.get(card_id)
+    if card is not None and not 0 <= answer_index < len(card.answers):
+        return {'error': 'answer_index is out of range'}, 400
+    if card_id is not None and game.draw_reserved(card_id) is None:
+        return {'error': 'Reserved card is no longer next in its deck'}, 409
+    
+    is_correct, points, explanation = game.answer_question(answer_index, _answer_seconds(data))
+    stats = _stats_values(game)
+    
+    encoded = {}
+    if diff is not None:
+        encoded['next_card'] = _card_json(game, _draw(game, diff))
+    if reserve:
+        encoded['reserved'] = _reserved_json(game, reserve)
+    game_id = active_games.put(game_id, game)
+    
+    body = TURN.encode(is_correct, points, explanation, *stats, game_id)
+    return _with_fields(body, **encoded), 200
+
+
+def get_stats(game_id):
+    """Get current game statistics."""
+    game, error = _load(game_id)
+    if error:
+        return error
+    
+    return STATS.encode(*_stats_values(game)), 200
+
+
+def end_game(game_id):
+    """End a game and record the score."""
+    game, error = _load(game_id)
+    if error:
+        return error
+    final_stats = game.end_game()
+    
+    # Only the request that removes the game records it, so a replay cannot score twice
+    if not active_games.delete(game_id):
+        return NOT_FOUND
+    
+    # Add to leaderboard
+    ranking_system.add_player_score(
+        final_stats['player_name'],
+        final_stats['final_score'],
+        final_stats['accuracy'],
+        final_stats['cards_played'],
+        final_stats['mix'],
+    )
+    
+    # Rank of this game's score (not the player's best), and how near the top it is
+    rank, top_percent = ranking_system.rank_for_score(final_stats['final_score'])
+    
+    return END.encode(
+        final_stats['player_name'],
+        final_stats['final_score'],
+        final_stats['accuracy'],
+        final_stats['cards_played'],
+        final_stats['cards_won'],
+        final_stats['streak_bonus_applied'],
+        final_stats['mix'],
+        rank,
+        top_percent,
+    ), 200
+
+
+def get_leaderboard(params=None, if_none_match=None):
+    """Get the leaderboard.
+
+    ``window`` is ``all`` (default), ``week`` or ``day``; ``mix`` limits the
+    board to games mostly played at one difficulty (``easy``,
+    ``intermediate``, ``hard``) or to ``mixed`` games. The encoded response is cached until a score enters the top of the
+    board. Its ETag is a hash of the body, so every worker gives the same
+    board the same tag and ``If-None-Match`` gets a 304 from any of them.
+    """
+    params = params or {}
+    window = params.get('window', 'all')
+    mix = params.get('mix') or None
+    if window not in WINDOWS:
+        return {'error': f"Invalid window; use one of {', '.join(WINDOWS)}"}, 400
+    if mix is not None and mix not in MIXES:
+        return {'error': f"Invalid mix; use one of {', '.join(MIXES)}"}, 400
+    version = ranking_system.top_version(window, mix)
+    cached = _leaderboard_cache.get((window, mix))
+    if cached is not None and cached[0] == version:
+        result = 'hit'
+    else:
+        leaderboard = ranking_system.get_leaderboard(window=window, mix=mix)
+        body = responses.dumps({'window': window, 'mix': mix, **_leaderboard_json(leaderboard)})
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        cached = _leaderboard_cache[window, mix] = (version, body, etag)
+        result = 'miss'
+    _, body, etag = cached
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={LEADERBOARD_MAX_AGE}'}
+    if if_none_match and _etag_matches(if_none_match, etag):
+        metrics.leaderboard_cache.inc('not_modified')
+        return b'', 304, headers
+    metrics.leaderboard_cache.inc(result)
+    return body, 200, headers
+
+
+def _leaderboard_json(leaderboard):
+    return {
+        'leaderboard': [
+            {
+                'rank': rank,
+                'name': player['name'],
+                'score': player['score'],
+                'accuracy': f"{player['accuracy']:.1f}%",
+                'cards_played': player['cards_played'],
+            }
+            for rank, player in enumerate(leaderboard, 1)
+        ]
+    }
+
+
+def _etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value names ``etag`` (weak tags match too)."""
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def admin_authorized(token):
+    """Whether ``token`` matches ``ADMIN_TOKEN``."""
+    return ADMIN_TOKEN is not None and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def import_scores(token, params, stream, max_rows=None):
+    """Bulk-import CSV or JSONL scores from ``stream`` into the leaderboard.
+
+    ``format`` is ``csv`` or ``jsonl``; ``strict`` rejects the whole upload
+    if any row is bad and ``dry_run`` only validates. An upload of more than
+    ``max_rows`` rows is rejected. Without LEADERBOARD_DIR only the worker
+    that serves the request gets the scores.
+    """
+    if not admin_authorized(token):
+        return {'error': 'Forbidden'}, 403
+    try:
+        report = score_import.import_scores(
+            ranking_system, stream, params.get('format', 'csv'),
+            strict=params.get('strict') in ('1', 'true'),
+            dry_run=params.get('dry_run') in ('1', 'true'),
+            max_rows=max_rows,
+        )
+    except score_import.ScoreImportError as exc:
+        return {'error': str(exc)}, 400
+    return report, 200
+
+
+def health():
+    """Health check endpoint."""
+    return {
+        'status': 'ok',
+        'service': 'supply-chain-game',
+        'games': active_games.stats(),
+    }, 200
+
+
+def _load(game_id):
+    """Return ``(game, None)``, or ``(None, error response)`` if it cannot be served."""
+    try:
+        game = active_games.get(game_id)
+    except CatalogUnavailable:
+        return None, CARDS_GONE
+    if game is None:
+        return None, NOT_FOUND
+    return game, None
+
+
+def _parse_difficulty(name):
+    """Map a requested difficulty to a Difficulty, ADAPTIVE, or None if it is neither."""
+    name = str(name).lower()
+    return ADAPTIVE if name == ADAPTIVE else DIFFICULTY_MAP.get(name)
+
+
+def _has_cards(game, difficulty):
+    """Whether ``game`` can draw at ``difficulty`` (the scheduler skips empty ones)."""
+    return difficulty == ADAPTIVE or len(game.catalog.by_difficulty[difficulty]) > 0
+
+
+def _draw(game, difficulty):
+    if difficulty == ADAPTIVE:
+        return game.draw_adaptive()
+    return game.draw_card(difficulty)
+
+
+def _card_json(game, card):
+    """Encode a drawn card for the client.
+
+    The card's public fields are pre-encoded in the catalog; only the live
+    counter is appended.
+    """
+    return game.catalog.payload(card.id) + b',"cards_played":%d}' % game.cards_played
+
+
+def _reserved_json(game, count):
+    """Encode the next ``count`` cards of each difficulty, keyed by difficulty name.
+
+    Reserved cards have no ``cards_played`` since they are not drawn yet.
+    """
+    piles = []
+    for name, difficulty in DIFFICULTY_MAP.items():
+        cards = b','.join(game.catalog.payload(card.id) + b'}'
+                          for card in game.reserve(difficulty, count))
+        piles.append(b'"%s":[%s]' % (name.encode(), cards))
+    return b'{' + b','.join(piles) + b'}'
+
+
+def _answer_seconds(data):
+    """Seconds the client says the player took (``answer_ms``), or None if absent or implausible."""
+    value = data.get('answer_ms')
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 86_400_000:
+        return value / 1000
+    return None
+
+
+def _is_int(value):
+    """True for a JSON integer (bools are ints in Python but not in JSON)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _reserve_count(data):
+    try:
+        return max(0, min(int(data.get('reserve') or 0), MAX_RESERVE))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _with_fields(body, **encoded):
+    """Append fields that are already encoded JSON bytes to the encoded object ``body``."""
+    if not encoded:
+        return body
+    return body[:-1] + b''.join(
+        b',"%s":%s' % (name.encode(), value) for name, value in encoded.items()
+    ) + b'}'
+
+
+def _stats_values(game):
+    """The values of a STATS response, read straight off the game."""
+    return (
+        game.player_name,
+        game.score,
+        game.cards_played,
+        game.cards_won,
+        game.get_accuracy(),
+        *game.streaks[1:],  # easy, intermediate, hard
+        game.get_streak_bonus(),
+    )
\ No newline at end of file
@@ -1,12 +1,184 @@
 """Game engine for Supply Chain Strategy Card Game."""
 
+import collections
+import itertools
+import math
 import random
-from typing import Optional, Tuple
-from cards import Card, Difficulty, get_all_cards
+import struct
+import threading
+import time
+import uuid
+from typing import List, Optional, Sequence, Tuple
+from sortedcontainers import SortedList
+from cards import Card, Difficulty
+from card_packs import catalog_for, get_catalog
+from card_stats import get_card_stats
+from score_log import ScoreLog
+import analytics
+import metrics
+
+_LABELS = {d: d.name.lower() for d in Difficulty}
+
+# Decks up to this many cards are shuffled exactly, by Fisher-Yates. A
+# Feistel network over a domain of a few bits only reaches some orders and
+# favours others, so it is left to larger decks; 16! is small enough next to
+# one 64-bit hash of the seed that every order is equally likely
+_EXACT_SHUFFLE_CARDS = 16
+
+# Feistel round constants for larger deck shuffles
+_ROUND_KEYS = (0x9E3779B9, 0x7F4A7C15, 0x85EBCA6B, 0xC2B2AE35,
+               0x27D4EB2F, 0x165667B1, 0xD3A2646C, 0xFD7046C5)
+_MASK64 = (1 << 64) - 1
+
+# Streak bonus per streak step beyond 2, indexed by Difficulty.value
+_STREAK_MULTIPLIER = (0, 1, 2, 5)
+_DIFFICULTY_VALUES = tuple(d.value for d in Difficulty)
+
+# Session encoding: version, score, cards played, cards won, current card ID
+# (-1 for none), streaks and cards played by difficulty, bitmask of started
+# decks, number of recent cards, when the current card was drawn (Unix
+# seconds, 0 if unknown), the card catalog version the game started with;
+# then (seed, cursor) per started deck, the recent card IDs and the UTF-8
+# player name. Card IDs are below card_packs.MAX_CARD_ID, so they fit either
+# signed or unsigned 32 bits
+STATE_VERSION = 6
+_STATE = struct.Struct("<BIIIi3H3HBBdQ")
+_DECK_STATE = struct.Struct("<II")
+
+# Adaptive draws skip the last this many cards drawn
+RECENT_CARDS = 8
+
+# Adaptive play aims for cards the player should answer right this often
+TARGET_SUCCESS = 0.7
+
+# Half-width, in log-odds, of the band of card correct rates adaptive draws pick from
+_TARGET_BAND = 0.5
+
+# Log-odds each correct answer in a running streak adds to the player's estimated
+# ability at that difficulty, for up to _STREAK_CAP answers
+_STREAK_STEP = 0.15
+_STREAK_CAP = 5
+
+# Samples an adaptive draw tries before falling back to the difficulty's deck
+_ADAPTIVE_TRIES = 4
+
+
+def _logit(p: float) -> float:
+    p = min(max(p, 0.01), 0.99)
+    return math.log(p / (1 - p))
+
+
+def _expit(x: float) -> float:
+    return 1 / (1 + math.exp(-x))
+
+
+class Deck:
+    """Shuffled draw pile of card IDs for one difficulty.
+
+    The order is a seeded pseudo-random permutation of the difficulty's card
+    IDs, so a pile holds no list of its own: it is fully described by
+    ``(seed, cursor)``, where ``cursor`` counts the cards drawn. Small piles
+    replay a Fisher-Yates shuffle driven by the seed up to the position
+    asked for; larger ones compute each position with a Feistel network.
+    Once every card has been drawn the pile reshuffles with a new seed.
+    """
+
+    __slots__ = ("cards", "seed", "cursor")
+
+    def __init__(self, cards: Sequence[int], seed: Optional[int] = None, cursor: int = 0):
+        self.cards = cards
+        self.shuffle(seed)
+        self.cursor = cursor
+
+    def shuffle(self, seed: Optional[int] = None):
+        """Start a fresh pass over the cards in a new (or the given) order."""
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.cursor = 0
+
+    def _shuffled(self, end: int) -> List[int]:
+        """Return the card IDs at positions ``[0, end)`` of this pass of a small pile."""
+        size = len(self.cards)
+        # SplitMix64 hash of the seed, read as mixed-radix digits for the swaps
+        value = self.seed + 0x9E3779B97F4A7C15
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+        value ^= value >> 31
+        order = list(range(size))
+        for i in range(end):
+            value, j = divmod(value, size - i)
+            order[i], order[i + j] = order[i + j], order[i]
+        return [self.cards[index] for index in order[:end]]
+
+    def _cards_between(self, start: int, end: int) -> List[int]:
+        if len(self.cards) <= _EXACT_SHUFFLE_CARDS:
+            return self._shuffled(end)[start:]
+        return [self._card_at(position) for position in range(start, end)]
+
+    def _card_at(self, position: int) -> int:
+        """Return the card ID at ``position`` of this pass."""
+        size = len(self.cards)
+        if size <= _EXACT_SHUFFLE_CARDS:
+            return self._shuffled(position + 1)[position]
+        # Permute a domain of 2 * half bits covering ``size``, walking the
+        # cycle until the result lands inside it (at most 4x domain overshoot)
+        half = max(1, ((size - 1).bit_length() + 1) // 2)
+        mask = (1 << half) - 1
+        shift = 64 - half
+        seed = self.seed
+        index = position
+        while True:
+            left, right = index >> half, index & mask
+            for key in _ROUND_KEYS:
+                # Round function: top ``half`` bits of a SplitMix64-style hash
+                # of the seed, round key and right half
+                mixed = (((seed << 32 | key) ^ right) * 0xBF58476D1CE4E5B9) & _MASK64
+                mixed = ((mixed ^ (mixed >> 31)) * 0x94D049BB133111EB) & _MASK64
+                left, right = right, left ^ (mixed >> shift)
+            index = (left << half) | right
+            if index < size:
+                return self.cards[index]
+
+    def draw(self) -> int:
+        """Return the next card ID, reshuffling first if the pile is exhausted.
+
+        Raises IndexError if the difficulty has no cards.
+        """
+        if not len(self.cards):
+            raise IndexError("draw from a deck with no cards")
+        if self.cursor >= len(self.cards):
+            self.shuffle()
+        card = self._card_at(self.cursor)
+        self.cursor += 1
+        return card
+
+    def peek(self, count: int) -> List[int]:
+        """Return up to ``count`` upcoming card IDs without drawing them.
+
+        Never looks past the current pass, so every ID returned is still
+        unused. An exhausted pile is reshuffled first, as the next draw would.
+        """
+        if self.cursor >= len(self.cards):
+            self.shuffle()
+        end = min(self.cursor + count, len(self.cards))
+        return self._cards_between(self.cursor, end)
+
+    def drawn(self) -> List[int]:
+        """Card IDs already drawn since the last reshuffle."""
+        return self._cards_between(0, self.cursor)
 
 
 class GameEngine:
-    """Main game logic and state management."""
+    """Main game logic and state management.
+
+    Sessions are slotted and keep per-difficulty state (streaks, decks) in
+    small lists indexed by ``Difficulty.value``, so tens of thousands of live
+    games stay cheap; ``to_bytes`` packs one into a few dozen bytes.
+    """
+
+    __slots__ = (
+        "player_name", "score", "cards_played", "cards_won", "current_card",
+        "streaks", "played", "catalog", "decks", "recent", "drawn_at",
+    )
 
     def __init__(self, player_name: str):
         """Initialize a new game session."""
@@ -15,32 +187,111 @@ class GameEngine:
         self.cards_played = 0
         self.cards_won = 0
         self.current_card: Optional[Card] = None
-        self.difficulty_streak = {Difficulty.EASY: 0, Difficulty.INTERMEDIATE: 0, Difficulty.HARD: 0}
-        self.all_cards = get_all_cards()
-        self.used_cards = set()
+        self.streaks = [0, 0, 0, 0]  # by Difficulty.value; index 0 unused
+        self.played = [0, 0, 0, 0]  # cards drawn, by Difficulty.value
+        self.catalog = get_catalog()  # kept for the whole game, even if the packs reload
+        self.decks: List[Optional[Deck]] = [None, None, None, None]  # created on first draw
+        self.recent: List[int] = []  # last RECENT_CARDS card IDs drawn, oldest first
+        self.drawn_at = 0.0  # time.time() of the current card's draw; 0 if unknown
 
-    def draw_card(self, difficulty: Difficulty) -> Card:
-        """Draw a random card from the specified difficulty level."""
-        available_cards = [
-            card for card in self.all_cards[difficulty]
-            if card.title not in self.used_cards
-        ]
+    @property
+    def used_cards(self) -> set:
+        """IDs of cards drawn since each difficulty last reshuffled."""
+        return {card_id for deck in self.decks if deck for card_id in deck.drawn()}
 
-        if not available_cards:
-            # Reset used cards for that difficulty if we've played them all
-            available_cards = self.all_cards[difficulty]
-            self.used_cards = {c.title for d in self.all_cards for c in self.all_cards[d]} - {
-                c.title for c in available_cards
-            }
+    def _deck(self, difficulty: Difficulty) -> Deck:
+        deck = self.decks[difficulty.value]
+        if deck is None:
+            deck = self.decks[difficulty.value] = Deck(self.catalog.by_difficulty[difficulty])
+        return deck
 
-        self.current_card = random.choice(available_cards)
-        self.used_cards.add(self.current_card.title)
-        self.cards_played += 1
+    def draw_card(self, difficulty: Difficulty) -> Card:
+        """Draw the next card from the specified difficulty's shuffled deck."""
+        start = time.perf_counter()
+        self._play(self.catalog.get(self._deck(difficulty).draw()))
+        metrics.draw_seconds.observe(time.perf_counter() - start)
         return self.current_card
 
-    def answer_question(self, answer_index: int) -> Tuple[bool, int, str]:
+    def _play(self, card: Card):
+        self.current_card = card
+        self.drawn_at = time.time()
+        self.cards_played += 1
+        self.played[card.difficulty.value] += 1
+        self.recent.append(card.id)
+        if len(self.recent) > RECENT_CARDS:
+            del self.recent[0]
+        metrics.cards_drawn.inc(_LABELS[card.difficulty])
+
+    def pick_difficulty(self) -> Tuple[Difficulty, float]:
+        """Choose the difficulty of the next adaptive card.
+
+        Returns it with the card correct rate, in log-odds, that should give
+        the player TARGET_SUCCESS there. The player's ability is how far, in
+        log-odds, their accuracy beats what players in general score on the
+        difficulties they have played, raised at a difficulty by a running
+        streak there. Difficulties whose cards players answer right at about
+        the target rate are the likeliest picks; the others keep some chance
+        so the estimate can move.
+        """
+        stats = get_card_stats()
+        difficulties = [d for d in Difficulty if len(self.catalog.by_difficulty[d])]
+        rates = [stats.sampler(self.catalog, d).rate for d in difficulties]
+        expected = sum(self.played[d.value] * rate for d, rate in zip(difficulties, rates))
+        expected = expected / self.cards_played if self.cards_played else TARGET_SUCCESS
+        # Smooth the player's accuracy toward the expected one over their first few cards
+        accuracy = (self.cards_won + 4 * expected) / (self.cards_played + 4)
+        aim = _logit(TARGET_SUCCESS) - (_logit(accuracy) - _logit(expected))
+        targets = [aim - _STREAK_STEP * min(self.streaks[d.value], _STREAK_CAP) for d in difficulties]
+        weights = [math.exp(-2 * abs(_logit(rate) - target)) for rate, target in zip(rates, targets)]
+        pick = random.choices(range(len(difficulties)), weights)[0]
+        return difficulties[pick], targets[pick]
+
+    def draw_adaptive(self) -> Card:
+        """Draw the card the scheduler picks for this player.
+
+        The difficulty comes from ``pick_difficulty``; within it the card is
+        sampled in O(log n) from those whose historical correct rate is near
+        the player's target (see card_stats.py), skipping recently drawn
+        cards. If the samples keep hitting recent cards (a small deck), the
+        difficulty's shuffled deck deals instead.
+        """
+        start = time.perf_counter()
+        difficulty, target = self.pick_difficulty()
+        sampler = get_card_stats().sampler(self.catalog, difficulty)
+        low, high = _expit(target - _TARGET_BAND), _expit(target + _TARGET_BAND)
+        for _ in range(_ADAPTIVE_TRIES):
+            card_id = sampler.sample(low, high)
+            if card_id not in self.recent:
+                self._play(self.catalog.get(card_id))
+                metrics.draw_seconds.observe(time.perf_counter() - start)
+                return self.current_card
+        return self.draw_card(difficulty)
+
+    def reserve(self, difficulty: Difficulty, count: int) -> List[Card]:
+        """Return the next ``count`` cards of a difficulty without drawing them.
+
+        Reserved cards are not played or used; they are simply the top of the
+        deck, so a card that is never shown stays there for the next draw.
+        """
+        return [self.catalog.get(card_id) for card_id in self._deck(difficulty).peek(count)]
+
+    def draw_reserved(self, card_id: int) -> Optional[Card]:
+        """Draw a previously reserved card, or return None if it is no longer next in its deck."""
+        card = self.catalog.get(card_id)
+        if card is None or self._deck(card.difficulty).peek(1) != [card_id]:
+            return None
+        self.draw_card(card.difficulty)
+        # The client showed it some time before this draw
+        self.drawn_at = 0.0
+        return card
+
+    def answer_question(self, answer_index: int, seconds: Optional[float] = None) -> Tuple[bool, int, str]:
         """Process player's answer to current card.
 
+        ``seconds`` is how long the player took, as the client measured it;
+        without it the time since the draw is used, when known. Every answer
+        goes to the analytics log (see analytics.py).
+
         Returns:
             (is_correct, points_earned, explanation)
         """
@@ -51,30 +302,35 @@ class GameEngine:
             return False, 0, "Invalid answer selection."
 
         answer = self.current_card.answers[answer_index]
+        metrics.answers.inc(
+            _LABELS[self.current_card.difficulty], "correct" if answer.is_correct else "wrong"
+        )
+
+        get_card_stats().record(self.current_card, answer.is_correct)
+        if seconds is None and self.drawn_at:
+            seconds = time.time() - self.drawn_at
+        analytics.record(self.current_card.id, answer_index, answer.is_correct, seconds)
 
         if answer.is_correct:
             self.cards_won += 1
             points = answer.points_if_correct
             self.score += points
-            self.difficulty_streak[self.current_card.difficulty] += 1
+            self.streaks[self.current_card.difficulty.value] += 1
             return True, points, answer.explanation
         else:
             # Reset streak on wrong answer
-            self.difficulty_streak[self.current_card.difficulty] = 0
+            self.streaks[self.current_card.difficulty.value] = 0
             return False, 0, answer.explanation
 
     def get_streak_bonus(self) -> int:
         """Calculate bonus points for consecutive correct answers."""
         bonus = 0
-        for difficulty, streak in self.difficulty_streak.items():
+        streaks = self.streaks
+        for value in _DIFFICULTY_VALUES:
+            streak = streaks[value]
             if streak >= 3:
                 # Bonus increases with difficulty
-                bonus_multiplier = {
-                    Difficulty.EASY: 1,
-                    Difficulty.INTERMEDIATE: 2,
-                    Difficulty.HARD: 5,
-                }
-                bonus += (streak - 2) * bonus_multiplier[difficulty]
+                bonus += (streak - 2) * _STREAK_MULTIPLIER[value]
         return bonus
 
     def apply_streak_bonus(self):
@@ -89,6 +345,13 @@ class GameEngine:
             return 0.0
         return (self.cards_won / self.cards_played) * 100
 
+    def get_mix(self) -> str:
+        """The difficulty of more than half the cards played (lowercase), else ``"mixed"``."""
+        for difficulty in Difficulty:
+            if self.played[difficulty.value] * 2 > self.cards_played:
+                return _LABELS[difficulty]
+        return "mixed"
+
     def get_game_stats(self) -> dict:
         """Get current game statistics."""
         return {
@@ -97,9 +360,9 @@ class GameEngine:
             "cards_played": self.cards_played,
             "cards_won": self.cards_won,
             "accuracy": self.get_accuracy(),
-            "easy_streak": self.difficulty_streak[Difficulty.EASY],
-            "intermediate_streak": self.difficulty_streak[Difficulty.INTERMEDIATE],
-            "hard_streak": self.difficulty_streak[Difficulty.HARD],
+            "easy_streak": self.streaks[Difficulty.EASY.value],
+            "intermediate_streak": self.streaks[Difficulty.INTERMEDIATE.value],
+            "hard_streak": self.streaks[Difficulty.HARD.value],
             "streak_bonus": self.get_streak_bonus(),
         }
 
@@ -110,42 +373,508 @@ class GameEngine:
             **self.get_game_stats(),
             "streak_bonus_applied": bonus,
             "final_score": self.score,
+            "mix": self.get_mix(),
         }
 
+    def to_bytes(self) -> bytes:
+        """Pack the session into a compact, self-contained byte string."""
+        started = [deck for deck in self.decks[1:] if deck is not None]
+        mask = sum(1 << value for value, deck in enumerate(self.decks) if deck is not None)
+        return b"".join([
+            _STATE.pack(
+                STATE_VERSION, self.score, self.cards_played, self.cards_won,
+                self.current_card.id if self.current_card else -1,
+                *self.streaks[1:], *self.played[1:], mask, len(self.recent), self.drawn_at,
+                self.catalog.version,
+            ),
+            *(_DECK_STATE.pack(deck.seed, deck.cursor) for deck in started),
+            struct.pack("<%dI" % len(self.recent), *self.recent),
+            self.player_name.encode("utf-8"),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GameEngine":
+        """Rebuild a session from ``to_bytes`` output. Raises ValueError if it is not one.
+
+        The game gets the catalog it started with, even if the packs have
+        reloaded since; CatalogUnavailable is raised if that catalog is gone.
+        """
+        if len(data) < _STATE.size or data[0] != STATE_VERSION:
+            raise ValueError("not a version %d game session" % STATE_VERSION)
+        (_, score, cards_played, cards_won, current, *counts,
+         mask, recent, drawn_at, catalog_version) = _STATE.unpack_from(data)
+        offset = _STATE.size
+        game = cls.__new__(cls)
+        game.score = score
+        game.cards_played = cards_played
+        game.cards_won = cards_won
+        game.streaks = [0, *counts[:3]]
+        game.played = [0, *counts[3:]]
+        game.drawn_at = drawn_at
+        game.catalog = catalog_for(catalog_version)
+        game.decks = [None, None, None, None]
+        for difficulty in Difficulty:
+            if mask & (1 << difficulty.value):
+                seed, cursor = _DECK_STATE.unpack_from(data, offset)
+                offset += _DECK_STATE.size
+                game.decks[difficulty.value] = Deck(
+                    game.catalog.by_difficulty[difficulty], seed, cursor
+                )
+        game.recent = list(struct.unpack_from("<%dI" % recent, data, offset))
+        offset += 4 * recent
+        game.player_name = data[offset:].decode("utf-8")
+        game.current_card = game.catalog.get(current) if current >= 0 else None
+        return game
+
+
+# ``_refresh`` merges larger batches read from the log in one sort instead of inserting each
+_BULK_MERGE = 1000
+
+# Unread log beyond this many bytes (another worker's import) is merged beside the
+# live boards, as ``add_scores`` does, instead of under the lock
+_BULK_READ_BYTES = 1 << 20
+
+# Scores below this are counted in a Fenwick tree for rank-by-score lookups
+_FENWICK_LIMIT = 1 << 20
+
+# Leaderboard windows: name -> (span, bucket width) in seconds, None for all time.
+# Rolling boards drop whole buckets, so "day" covers the last 24 to 25 hours
+WINDOWS = {
+    "all": None,
+    "week": (7 * 86400, 6 * 3600),
+    "day": (86400, 3600),
+}
+
+# Difficulty mixes a game can be ranked under (see GameEngine.get_mix); "" is unknown
+MIXES = ("easy", "intermediate", "hard", "mixed")
+
+
+def _score_key(record: dict) -> tuple:
+    """Index key of a score record; keys sort in leaderboard order."""
+    return (-record["score"], -record["accuracy"], -record["cards_played"],
+            record["submitted_at"], record["name"], record.get("mix", ""))
+
+
+def _score_record(key: tuple) -> dict:
+    return {"name": key[4], "score": -key[0], "accuracy": -key[1],
+            "cards_played": -key[2], "submitted_at": key[3], "mix": key[5]}
+
+
+def _keep_best(best_by_name: dict, key: tuple):
+    name = key[4].lower()
+    best = best_by_name.get(name)
+    if best is None or key < best:
+        best_by_name[name] = key
+
+
+class _Board:
+    """One leaderboard view: an index of keys, plus time buckets when it is a rolling window.
+
+    A rolling board expires old entries a bucket at a time, so its size, and
+    the cost of reading it, depends on the window and not on the history.
+    ``version`` changes whenever the first ``top_n`` entries may have changed.
+    """
+
+    __slots__ = ("index", "top_n", "version", "mix", "span", "width", "buckets")
+
+    def __init__(self, top_n: int, mix: str = "", window: Optional[Tuple[int, int]] = None):
+        self.index = SortedList()
+        self.top_n = top_n
+        self.version = 0
+        self.mix = mix
+        self.span, self.width = window or (None, None)
+        self.buckets = {}  # bucket number -> keys submitted during it
+
+    def detached(self) -> "_Board":
+        """A copy to build on outside the lock; call ``add_many`` before using it.
+
+        The copy's index is a plain sorted list, which is cheap to take under
+        the lock; ``add_many`` turns it back into a SortedList.
+        """
+        board = _Board(self.top_n, self.mix)
+        board.index = list(self.index)
+        board.version = self.version
+        board.span, board.width = self.span, self.width
+        board.buckets = {number: list(keys) for number, keys in self.buckets.items()}
+        return board
+
+    def _oldest_bucket(self, now: float) -> int:
+        return int((now - self.span) // self.width)
+
+    def add(self, key: tuple, now: float):
+        if self.span is not None:
+            number = int(key[3] // self.width)
+            if number < self._oldest_bucket(now):
+                return
+            self.buckets.setdefault(number, []).append(key)
+        if len(self.index) < self.top_n or key < self.index[self.top_n - 1]:
+            self.version += 1
+        self.index.add(key)
+
+    def add_many(self, keys: Sequence[tuple], now: float):
+        """Add keys (already filtered to this board's mix) with one sort."""
+        if self.span is not None:
+            oldest = self._oldest_bucket(now)
+            live = []
+            for key in keys:
+                number = int(key[3] // self.width)
+                if number >= oldest:
+                    self.buckets.setdefault(number, []).append(key)
+                    live.append(key)
+            keys = live
+        if keys or not isinstance(self.index, SortedList):
+            # The index is already sorted, so the sort is mostly a merge of two runs
+            self.index = SortedList(itertools.chain(self.index, keys))
+            self.version += bool(keys)
+
+    def expire(self, now: float):
+        if self.span is None:
+            return
+        oldest = self._oldest_bucket(now)
+        expired = [number for number in self.buckets if number < oldest]
+        if not expired:
+            return
+        keys = [key for number in expired for key in self.buckets.pop(number)]
+        if len(self.index) <= self.top_n or min(keys) <= self.index[self.top_n - 1]:
+            self.version += 1
+        if len(keys) * 2 > len(self.index):
+            self.index = SortedList(key for bucket in self.buckets.values() for key in bucket)
+        else:
+            for key in keys:
+                self.index.remove(key)
+
+
+class _ScoreCounts:
+    """How many entries have each score, as a Fenwick tree.
+
+    Counting the entries above a score costs O(log S), where S is the highest
+    score seen (rounded up to a power of two), however many entries there
+    are. The tree doubles when a higher score arrives; scores of
+    ``_FENWICK_LIMIT`` or more, which no real game reaches, are kept sorted
+    beside it.
+    """
+
+    __slots__ = ("tree", "total", "high")
+
+    def __init__(self, size: int = 1024):
+        self.tree = [0] * (size + 1)  # 1-based; tree[i] covers scores (i - (i & -i), i - 1]
+        self.total = 0
+        self.high = SortedList()
+
+    def copy(self) -> "_ScoreCounts":
+        counts = _ScoreCounts(0)
+        counts.tree = list(self.tree)
+        counts.total = self.total
+        counts.high = SortedList(self.high)
+        return counts
+
+    def add(self, score: int, count: int = 1):
+        self.total += count
+        if score >= _FENWICK_LIMIT:
+            self.high.update([score] * count)
+            return
+        if score >= len(self.tree) - 1:
+            self._grow(score)
+        tree = self.tree
+        i = score + 1
+        while i < len(tree):
+            tree[i] += count
+            i += i & -i
+
+    def add_keys(self, keys: Sequence[tuple]):
+        for score, count in collections.Counter(-key[0] for key in keys).items():
+            self.add(score, count)
+
+    def _grow(self, score: int):
+        counts = [self.count_at_most(s) - self.count_at_most(s - 1) for s in range(len(self.tree) - 1)]
+        size = 1 << score.bit_length()
+        counts.extend([0] * (size - len(counts)))
+        tree = [0, *counts]
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def count_at_most(self, score: int) -> int:
+        """Entries scoring ``score`` or less (not counting the sorted high scores)."""
+        total = 0
+        i = min(score + 1, len(self.tree) - 1)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def count_above(self, score: int) -> int:
+        """Entries scoring more than ``score``."""
+        if score >= _FENWICK_LIMIT:
+            return len(self.high) - self.high.bisect_right(score)
+        return self.total - self.count_at_most(score)
+
 
 class RankingSystem:
-    """Manages player rankings and leaderboard."""
+    """Manages player rankings and leaderboards.
+
+    Scores are kept in order-maintaining indexes so inserts, top-N reads and
+    rank lookups are O(log n) instead of a full sort per call. Each entry is
+    its own index key, ``(-score, -accuracy, -cards_played, submitted_at,
+    name, mix)``, so entries are ordered by score, then accuracy, then cards
+    played (all descending), with earlier submissions first and the name
+    breaking a full tie, and every worker agrees on the order. Records are
+    rebuilt from keys only for the few entries a read returns, which keeps a
+    board of ten million scores in a few gigabytes.
+
+    Besides the all-time board there is one per window in ``WINDOWS`` and
+    per difficulty mix in ``MIXES``, and each combination of the two, all
+    updated on every insert.
+
+    With a ``ScoreLog`` the boards are durable and shared: new scores are
+    appended to the log, reads first pick up scores other workers appended,
+    and a compacted snapshot is written every ``log.snapshot_every`` records.
+
+    ``add_scores`` imports many scores at once (see score_import.py): the new
+    boards are built with one sort each beside the live ones and swapped in
+    under the lock, so readers see the old boards or the whole new ones.
 
-    def __init__(self):
-        """Initialize ranking system."""
-        self.players = []
+    ``top_version`` changes only when the first ``top_n`` entries of a board
+    may have changed, so callers can cache what they build from the top.
+    """
 
-    def add_player_score(self, player_name: str, score: int, accuracy: float, cards_played: int):
+    def __init__(self, log: Optional[ScoreLog] = None, top_n: int = 10):
+        """Initialize ranking system, warm-starting from ``log`` if given."""
+        self.top_n = top_n
+        self._boards = self._empty_boards()
+        self._best_by_name = {}  # lowercased name -> index key of that name's best entry
+        self._scores = _ScoreCounts()  # all-time entries per score, for rank_for_score
+        self._lock = threading.Lock()
+        self._import_lock = threading.Lock()  # one bulk import at a time
+        self._added = None  # keys inserted while an import builds its boards, replayed at the swap
+        self.log = log
+        self._log_offset = 0
+        self._unseen = {}  # record id -> key, for local scores not yet read back from the log
+        self._since_snapshot = 0
+        self._catching_up = False
+        if log is not None:
+            records, self._log_offset = log.load()
+            self._load_sorted([_score_key(r) for r in records])
+            self._merge([])
+
+    def _empty_boards(self) -> dict:
+        return {
+            (window, mix): _Board(self.top_n, mix, WINDOWS[window])
+            for window in WINDOWS for mix in ("",) + MIXES
+        }
+
+    @property
+    def _index(self) -> SortedList:
+        return self._boards["all", ""].index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load_sorted(self, keys: list):
+        """Replace the boards with keys already in leaderboard order."""
+        self._boards = self._empty_boards()
+        self._add_to_boards(self._boards, keys)
+        self._best_by_name = {}
+        for key in keys:
+            self._best_by_name.setdefault(key[4].lower(), key)
+        self._scores = _ScoreCounts()
+        self._scores.add_keys(keys)
+
+    def _views(self, boards: dict, key: tuple):
+        """The boards a key belongs on: every window, overall and for its mix."""
+        for window in WINDOWS:
+            yield boards[window, ""]
+            if key[5] in MIXES:
+                yield boards[window, key[5]]
+
+    def _add_to_boards(self, boards: dict, keys: Sequence[tuple]):
+        now = time.time()
+        for (_, mix), board in boards.items():
+            board.add_many(keys if not mix else [key for key in keys if key[5] == mix], now)
+
+    def _insert(self, key: tuple):
+        now = time.time()
+        for board in self._views(self._boards, key):
+            board.add(key, now)
+        _keep_best(self._best_by_name, key)
+        self._scores.add(-key[0])
+        if self._added is not None:
+            self._added.append(key)
+
+    def _refresh(self):
+        """Apply scores other workers appended to the log since the last read.
+
+        A large backlog is handed to a thread that merges it like an import,
+        and reads keep the current boards meanwhile. Skipped while an import
+        builds its boards: the import reads the log itself.
+        """
+        if self.log is None or self._added is not None:
+            return
+        if self.log.size() - self._log_offset > _BULK_READ_BYTES:
+            if not self._catching_up:
+                self._catching_up = True
+                threading.Thread(target=self._catch_up, daemon=True).start()
+            return
+        records, self._log_offset = self.log.read_from(self._log_offset)
+        keys = [
+            _score_key(record) for record in records
+            if self._unseen.pop(record.pop("id", None), None) is None
+        ]
+        if len(keys) > _BULK_MERGE:
+            self._add_to_boards(self._boards, keys)
+            for key in keys:
+                _keep_best(self._best_by_name, key)
+            self._scores.add_keys(keys)
+        else:
+            for key in keys:
+                self._insert(key)
+        self._since_snapshot += len(records)
+        if self._since_snapshot >= self.log.snapshot_every:
+            threading.Thread(target=self._write_snapshot, args=self._snapshot_args(),
+                             daemon=True).start()
+
+    def _catch_up(self):
+        try:
+            self._merge([])
+        finally:
+            self._catching_up = False
+
+    def _snapshot_args(self) -> tuple:
+        self._since_snapshot = 0
+        return list(self._index), set(self._unseen.values()), self._log_offset
+
+    def _write_snapshot(self, keys: list, excluded: set, offset: int):
+        # Local scores not yet read back sit after ``offset`` in the log, so leave them out
+        records = (_score_record(key) for key in keys if key not in excluded)
+        self.log.write_snapshot(records, offset, len(keys) - len(excluded))
+
+    def _board(self, window: str, mix: Optional[str]) -> _Board:
+        """The board for a window and mix, with expired buckets dropped. Raises KeyError."""
+        board = self._boards[window, mix or ""]
+        board.expire(time.time())
+        return board
+
+    def add_player_score(self, player_name: str, score: int, accuracy: float, cards_played: int,
+                         mix: str = ""):
         """Add a player score to the rankings."""
-        self.players.append({
-            "name": player_name,
-            "score": score,
-            "accuracy": accuracy,
-            "cards_played": cards_played,
-        })
-
-    def get_leaderboard(self, top_n: int = 10) -> list:
-        """Get top N players by score."""
-        sorted_players = sorted(
-            self.players,
-            key=lambda x: (x["score"], x["accuracy"], x["cards_played"]),
-            reverse=True
-        )
-        return sorted_players[:top_n]
+        key = (-score, -accuracy, -cards_played, time.time(), player_name, mix)
+        start = time.perf_counter()
+        with self._lock:
+            self._insert(key)
+            if self.log is not None:
+                record_id = uuid.uuid4().hex
+                self._unseen[record_id] = key
+                self.log.append({**_score_record(key), "id": record_id})
+        metrics.ranking_seconds.observe(time.perf_counter() - start, "add_player_score")
+
+    def add_scores(self, keys: list):
+        """Add many validated scores, given as index keys, with one sort per board.
+
+        The new boards are built outside the lock while requests keep using
+        the old ones (see ``_merge``). With a log the keys are appended to it
+        for every worker and a snapshot is written before returning, so
+        restarts do not replay the import.
+        """
+        start = time.perf_counter()
+        self._merge(keys)
+        metrics.ranking_seconds.observe(time.perf_counter() - start, "add_scores")
+
+    def _merge(self, keys: list):
+        """Build boards with ``keys`` and any unread log beside the live ones, then swap them in.
+
+        Scores added while the boards are built are replayed onto them
+        before the swap.
+        """
+        with self._import_lock:
+            with self._lock:
+                boards = {view: board.detached() for view, board in self._boards.items()}
+                best_by_name = dict(self._best_by_name)
+                scores = self._scores.copy()
+                offset = self._log_offset
+                self._added = []
+            importing = bool(keys)
+            built = False
+            snapshot = None
+            try:
+                if self.log is not None:
+                    if keys:
+                        self.log.append_many(_score_record(key) for key in keys)
+                    records, offset = self.log.read_from(offset)
+                    # This worker's own scores among them are already on the boards or in ``_added``
+                    record_ids = [record.pop("id", None) for record in records]
+                    local = {record_id for record_id in record_ids if record_id in self._unseen}
+                    keys = [
+                        _score_key(record) for record, record_id in zip(records, record_ids)
+                        if record_id not in local
+                    ]
+                self._add_to_boards(boards, keys)
+                for key in keys:
+                    _keep_best(best_by_name, key)
+                scores.add_keys(keys)
+                built = True
+            finally:
+                with self._lock:
+                    added, self._added = self._added, None
+                    if built:
+                        now = time.time()
+                        for key in added:
+                            for board in self._views(boards, key):
+                                board.add(key, now)
+                            _keep_best(best_by_name, key)
+                            scores.add(-key[0])
+                        self._boards, self._best_by_name = boards, best_by_name
+                        self._scores = scores
+                        if self.log is not None:
+                            self._log_offset = offset
+                            for record_id in local:
+                                del self._unseen[record_id]
+                            self._since_snapshot += len(records)
+                            if importing or self._since_snapshot >= self.log.snapshot_every:
+                                snapshot = self._snapshot_args()
+            if snapshot is not None:
+                self._write_snapshot(*snapshot)
+
+    def top_version(self, window: str = "all", mix: Optional[str] = None) -> int:
+        """Counter that changes whenever the first ``top_n`` entries of a board may have changed."""
+        with self._lock:
+            self._refresh()
+            return self._board(window, mix).version
+
+    def get_leaderboard(self, top_n: Optional[int] = None, window: str = "all",
+                        mix: Optional[str] = None) -> list:
+        """Get top N players by score in a window (see ``WINDOWS``), optionally for one mix."""
+        start = time.perf_counter()
+        with self._lock:
+            self._refresh()
+            board = self._board(window, mix)
+            leaderboard = [_score_record(key) for key in board.index.islice(0, top_n or self.top_n)]
+        metrics.ranking_seconds.observe(time.perf_counter() - start, "get_leaderboard")
+        return leaderboard
+
+    def rank_for_score(self, score: int) -> Tuple[int, float]:
+        """Return the all-time rank a score holds and the top percentage it is in.
+
+        The rank is one more than the number of entries with a higher score,
+        so equal scores share a rank. Both come from score counts, so the
+        cost does not grow with the number of entries.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._refresh()
+            rank = self._scores.count_above(score) + 1
+            total = max(self._scores.total, rank)
+        metrics.ranking_seconds.observe(time.perf_counter() - start, "rank_for_score")
+        # Round up, so the best score of many is "top 0.1%" rather than "top 0%"
+        return rank, math.ceil(1000 * rank / total) / 10
 
     def get_player_rank(self, player_name: str) -> Optional[int]:
-        """Get a player's rank."""
-        sorted_players = sorted(
-            self.players,
-            key=lambda x: (x["score"], x["accuracy"]),
-            reverse=True
-        )
-        for rank, player in enumerate(sorted_players, 1):
-            if player["name"].lower() == player_name.lower():
-                return rank
-        return None
\ No newline at end of file
+        """Get the all-time rank of a player's best entry (case-insensitive)."""
+        start = time.perf_counter()
+        with self._lock:
+            self._refresh()
+            key = self._best_by_name.get(player_name.lower())
+            rank = None if key is None else self._index.index(key) + 1
+        metrics.ranking_seconds.observe(time.perf_counter() - start, "get_player_rank")
+        return rank
\ No newline at end of file
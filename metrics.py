@@ -0,0 +1,282 @@
+"""Low-overhead metrics for Supply Chain Strategy Card Game, in Prometheus text format.
+
+Counters and histograms are plain in-process dicts updated under one lock,
+so recording costs about a microsecond. Gauges are callables read when
+metrics are collected.
+
+Gunicorn runs several worker processes, so with ``METRICS_DIR`` set every
+worker also dumps its values to ``metrics-<pid>.json`` in that directory
+every ``flush_interval`` seconds from a background thread. Rendering
+merges the serving worker's values with every other worker's file: counters and histograms are summed (including
+workers that have exited, so totals never go backwards), gauges are summed
+or maxed across live workers depending on whether each worker holds its own
+share or a view of shared state.
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Request latencies are sub-millisecond in-process, so the low end is fine-grained
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = registry.lock
+        registry.register(self)
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram:
+    """Bucketed observations (typically seconds) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, registry: "Registry", name: str, help: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Tuple[str, ...], list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = registry.lock
+        registry.register(self)
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+
+class Gauge:
+    """Current value read from ``function`` at collection time.
+
+    ``mode`` says how to combine workers: ``"sum"`` when each worker holds its
+    own share (in-process games), ``"max"`` when every worker sees the same
+    shared state (a SQLite store, the shared score log).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, registry: "Registry", name: str, help: str,
+                 function: Callable[[], float], mode: str = "sum"):
+        self.name = name
+        self.help = help
+        self.labelnames = ()
+        self.function = function
+        self.mode = mode
+        registry.register(self)
+
+    @property
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        return {(): self.function()}
+
+
+class Registry:
+    """All metrics of this process, optionally shared through per-worker files."""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._flusher_pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._remove_stale()
+            atexit.register(self.flush)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def _remove_stale(self):
+        # Files left by an earlier deploy would otherwise be counted forever
+        for path, pid in self._files():
+            if not _alive(pid):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _files(self):
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                yield path, int(os.path.basename(path)[8:-5])
+            except ValueError:
+                continue
+
+    def collect(self) -> dict:
+        """Return a JSON-serializable snapshot of every metric in this process."""
+        snapshot = {}
+        for metric in list(self.metrics.values()):
+            values = metric.values
+            if metric.kind != "gauge":
+                with self.lock:
+                    values = {labels: list(v) if isinstance(v, list) else v
+                              for labels, v in values.items()}
+            snapshot[metric.name] = [[list(labels), value] for labels, value in values.items()]
+        return snapshot
+
+    def ensure_flushing(self):
+        """Start this worker's flush thread if it is not running; cheap to call per request."""
+        if self.directory and self._flusher_pid != os.getpid():
+            with self.lock:
+                if self._flusher_pid == os.getpid():
+                    return
+                # Threads do not survive a fork, so each worker starts its own
+                self._flusher_pid = os.getpid()
+            threading.Thread(target=self._run_flusher, daemon=True).start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # Other workers see stale values until a flush succeeds; a dead thread would never
+                logger.exception("Metrics flush failed")
+
+    def flush(self):
+        """Write this worker's values to its file in ``directory``."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.collect(), f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _merged(self) -> dict:
+        own = self.collect()
+        if not self.directory:
+            return {name: {tuple(labels): value for labels, value in values}
+                    for name, values in own.items()}
+        merged = {name: {} for name in self.metrics}
+        # This worker's values come from memory, so a failing directory cannot fail the scrape
+        snapshots = [(own, True)]
+        for path, pid in self._files():
+            if pid == os.getpid():
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append((json.load(f), _alive(pid)))
+            except (OSError, ValueError):
+                continue
+        for snapshot, live in snapshots:
+            for name, values in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not live):
+                    continue
+                into = merged[name]
+                for labels, value in values:
+                    key = tuple(labels)
+                    current = into.get(key)
+                    if current is None:
+                        into[key] = value
+                    elif metric.kind == "histogram":
+                        into[key] = [a + b for a, b in zip(current, value)]
+                    elif metric.kind == "gauge" and metric.mode == "max":
+                        into[key] = max(current, value)
+                    else:
+                        into[key] = current + value
+        return merged
+
+    def render(self) -> bytes:
+        """Return every metric, merged across workers, in Prometheus text format."""
+        merged = self._merged()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(merged.get(name, {}).items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(pairs)} {cumulative}")
+        return ("\n".join(lines) + "\n").encode()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Process-wide registry; METRICS_DIR shares it across gunicorn workers
+registry = Registry(os.environ.get("METRICS_DIR") or None)
+
+request_seconds = Histogram(
+    registry, "http_request_duration_seconds", "API request latency by route.", ["route"]
+)
+requests_total = Counter(
+    registry, "http_requests_total", "API requests by route and status.", ["route", "status"]
+)
+cards_drawn = Counter(registry, "game_cards_drawn_total", "Cards drawn by difficulty.", ["difficulty"])
+answers = Counter(
+    registry, "game_answers_total", "Answers by difficulty and result.", ["difficulty", "result"]
+)
+draw_seconds = Histogram(registry, "game_draw_card_seconds", "Time spent in GameEngine.draw_card.")
+leaderboard_cache = Counter(
+    registry, "leaderboard_responses_total",
+    "Leaderboard responses by cache result (hit, miss, not_modified).", ["result"]
+)
+analytics_answers = Counter(
+    registry, "analytics_answers_total",
+    "Answers written to the analytics log, or dropped (queue full, failed write or bad values).",
+    ["result"]
+)
+ranking_seconds = Histogram(
+    registry, "leaderboard_operation_seconds", "Time spent in RankingSystem calls.", ["operation"]
+)
\ No newline at end of file
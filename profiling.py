@@ -0,0 +1,234 @@
+"""Opt-in runtime profiling for Supply Chain Strategy Card Game workers.
+
+Set ``PROFILE_TOKEN`` to enable it; when unset nothing is hooked in and
+profiling costs nothing. Three modes, all started without a restart:
+
+- Per request: send ``X-Profile: <token>`` (or ``?profile=<token>``) and the
+  request is traced call by call. The stacks are written in folded format
+  (``frame;frame;frame microseconds``), which flamegraph.pl and speedscope
+  read directly, and the file name is returned in ``X-Profile-File``.
+- Sampling window: ``POST /api/debug/profile/sample?seconds=10`` samples
+  every thread of the worker that receives it every ``interval_ms`` and
+  writes folded stacks with sample counts when the window closes.
+- Memory: ``POST /api/debug/profile/memory?seconds=30`` runs tracemalloc for
+  the window and writes the top allocation sites in the game's modules plus
+  a census of live ``GameEngine`` and ``RankingSystem`` objects.
+
+Control requests carry the token in ``X-Profile-Token``. Output goes to
+``PROFILE_DIR``.
+"""
+
+import gc
+import hmac
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN") or None
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "supply-chain-game", "profiles")
+)
+ENABLED = PROFILE_TOKEN is not None
+
+MAX_WINDOW_SECONDS = 300
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_window_lock = threading.Lock()  # one sampling or memory window per worker at a time
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Whether ``token`` matches ``PROFILE_TOKEN``."""
+    return ENABLED and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def _output_path(kind: str, extension: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{kind}-{os.getpid()}-{time.time_ns()}.{extension}")
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _write_folded(kind: str, stacks: Dict[tuple, float]) -> str:
+    path = _output_path(kind, "folded")
+    with open(path, "w") as f:
+        for stack, value in sorted(stacks.items()):
+            f.write(f"{';'.join(stack)} {int(value)}\n")
+    return path
+
+
+class RequestTracer:
+    """Deterministic tracer for one request on the current thread.
+
+    Time between profiler events is charged to the call stack that was
+    active, so each folded line carries self time in microseconds. Calls
+    that were already running when tracing started are not on the stack;
+    their returns are ignored.
+    """
+
+    def __init__(self):
+        self.stacks: Dict[tuple, float] = {}
+        self._stack = []
+        self._last = 0.0
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        if self._stack:
+            key = tuple(self._stack)
+            self.stacks[key] = self.stacks.get(key, 0.0) + (now - self._last) * 1e6
+        if event == "call":
+            self._stack.append(_label(frame.f_code))
+        elif event == "c_call":
+            self._stack.append(getattr(arg, "__qualname__", repr(arg)))
+        elif self._stack:
+            self._stack.pop()
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+        sys.setprofile(self._event)
+
+    def stop(self) -> str:
+        """Stop tracing and return the path of the folded-stack file."""
+        sys.setprofile(None)
+        return _write_folded("request", self.stacks)
+
+
+def trace_call(func, *args, **kwargs):
+    """Run ``func`` under a ``RequestTracer``; return ``(result, profile path)``."""
+    tracer = RequestTracer()
+    tracer.start()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        path = tracer.stop()
+    return result, path
+
+
+def _sample(seconds: float, interval: float, path: str):
+    stacks: Dict[tuple, float] = {}
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    try:
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                key = tuple(reversed(stack))
+                stacks[key] = stacks.get(key, 0) + 1
+            time.sleep(interval)
+        with open(path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{';'.join(stack)} {count}\n")
+    finally:
+        _window_lock.release()
+
+
+def _census() -> list:
+    from game_engine import GameEngine, RankingSystem
+
+    engines = 0
+    rankings = []
+    for obj in gc.get_objects():
+        if isinstance(obj, GameEngine):
+            engines += 1
+        elif isinstance(obj, RankingSystem):
+            rankings.append(obj)
+    # gc.freeze() hides objects built at import, the app's own board among them
+    api = sys.modules.get("game_api")
+    if api is not None and not any(r is api.ranking_system for r in rankings):
+        rankings.append(api.ranking_system)
+    return [
+        f"live GameEngine objects: {engines}",
+        f"live RankingSystem objects: {len(rankings)} "
+        f"({sum(len(r) for r in rankings)} leaderboard entries)",
+    ]
+
+
+def _trace_memory(seconds: float, path: str):
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(10)
+        time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, os.path.join(SOURCE_DIR, "*.py"))]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"window: {seconds:.1f}s, traced now {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB",
+            *_census(),
+            "",
+            "top allocation sites in the game's modules (still allocated at the end of the window):",
+        ]
+        for stat in snapshot.statistics("lineno")[:25]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  "
+                f"{os.path.basename(frame.filename)}:{frame.lineno}"
+            )
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _window_lock.release()
+
+
+def _window_seconds(params) -> float:
+    return min(max(float(params.get("seconds", 10)), 0.1), MAX_WINDOW_SECONDS)
+
+
+def _start_window(kind: str, extension: str, target, seconds: float, *args):
+    """Run ``target(seconds, *args, path)`` on a thread; it releases the window lock when done."""
+    # Before taking the lock, so a PROFILE_DIR that cannot be created does not leave it held
+    try:
+        path = _output_path(kind, extension)
+    except OSError as exc:
+        return {"error": f"Cannot write to PROFILE_DIR: {exc.strerror}"}, 500
+    if not _window_lock.acquire(blocking=False):
+        return {"error": "A profiling window is already running on this worker"}, 409
+    try:
+        threading.Thread(target=target, args=(seconds, *args, path), daemon=True).start()
+    except BaseException:
+        _window_lock.release()
+        raise
+    return {"pid": os.getpid(), "seconds": seconds, "file": path}, 202
+
+
+def start_sampling(token, params):
+    """Start a sampling window on this worker; returns immediately with the output path."""
+    if not authorized(token):
+        return {"error": "Forbidden"}, 403
+    try:
+        seconds = _window_seconds(params)
+        interval = max(float(params.get("interval_ms", 5)), 1.0) / 1000
+    except ValueError:
+        return {"error": "seconds and interval_ms must be numbers"}, 400
+    return _start_window("sample", "folded", _sample, seconds, interval)
+
+
+def start_memory_trace(token, params):
+    """Start a tracemalloc window on this worker; returns immediately with the report path."""
+    if not authorized(token):
+        return {"error": "Forbidden"}, 403
+    try:
+        seconds = _window_seconds(params)
+    except ValueError:
+        return {"error": "seconds must be a number"}, 400
+    return _start_window("memory", "txt", _trace_memory, seconds)
+
+
+CONTROL_ROUTES = {
+    "/api/debug/profile/sample": start_sampling,
+    "/api/debug/profile/memory": start_memory_trace,
+}
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""JSON encoding of API responses.
+
+``dumps`` turns any response body into compact JSON bytes, with ``orjson``
+when it is installed and the stdlib ``json`` module otherwise. The
+responses every turn produces (answer, turn, stats, end of game) use a
+``Schema`` instead: its keys and punctuation are encoded once into a
+``%``-format template, so a response is one bytes formatting of its values,
+with no dict built and no per-key work. Card payloads are already stored
+encoded in the catalog (see cards.py) and go in as ``RAW`` fields.
+"""
+
+import json
+from json.encoder import encode_basestring_ascii
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        """Encode ``obj`` as compact JSON."""
+        return orjson.dumps(obj, option=_OPTIONS)
+
+    def _string(value: str) -> bytes:
+        return orjson.dumps(value)
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def dumps(obj) -> bytes:
+        """Encode ``obj`` as compact JSON."""
+        return _encoder.encode(obj).encode()
+
+    def _string(value: str) -> bytes:
+        if not isinstance(value, str):
+            return dumps(value)
+        return encode_basestring_ascii(value).encode()
+
+
+def _bool(value) -> bytes:
+    return b"true" if value else b"false"
+
+
+# Field kinds: (format in the template, converter applied to the value first)
+INT = (b"%d", None)
+STR = (b"%s", _string)
+BOOL = (b"%s", _bool)
+# A float percentage, sent as a string with one decimal ("87.5%")
+PERCENT = (b'"%.1f%%"', None)
+# Bytes that are already encoded JSON
+RAW = (b"%s", None)
+# Anything else, through ``dumps``
+JSON = (b"%s", dumps)
+
+
+class Schema:
+    """A JSON object with fixed keys, encoded by filling a precomputed template.
+
+    ``Schema(("game_id", STR), ("total_score", INT), ...)`` and then
+    ``schema.encode(game_id, score, ...)`` with the values in field order.
+    ``extend`` makes a schema with more fields after these.
+    """
+
+    __slots__ = ("fields", "_template", "_converters")
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self._template = b"{" + b",".join(
+            _string(name) + b":" + spec for name, (spec, _) in fields
+        ) + b"}"
+        self._converters = tuple(
+            (index, convert) for index, (_, (_, convert)) in enumerate(fields) if convert is not None
+        )
+
+    def extend(self, *fields) -> "Schema":
+        return Schema(*self.fields, *fields)
+
+    def encode(self, *values) -> bytes:
+        if self._converters:
+            values = list(values)
+            for index, convert in self._converters:
+                values[index] = convert(values[index])
+            values = tuple(values)
+        return self._template % values
\ No newline at end of file
@@ -0,0 +1,357 @@
+"""Multiplayer rooms: one host deals cards from a shared deck to many players.
+
+A room keeps a shared ``Deck`` per difficulty (the same pile logic as
+``GameEngine``), the card in play and each player's score and streak. The
+host deals a card to everyone at once; each player answers it at most once
+and gets their own result in the response. What every player sees, the
+dealt cards and the live standings, is pushed over one Server-Sent Events
+stream per room (``GET /api/rooms/<room_id>/events`` in the ASGI app)
+instead of being polled.
+
+Fan-out encodes each event once: ``Room.publish`` adds the encoded
+``bytes`` to the room's ring of recent events and wakes every subscriber,
+which sends that same object on its connection. Standings change with
+every answer, so they are published at most every ``STANDINGS_INTERVAL``
+seconds. A subscriber that falls more than ``HISTORY`` events behind (a
+slow connection) skips to a snapshot of the card in play and the standings
+instead of replaying what it missed.
+
+Rooms live in the process that created them and publish from its event
+loop, so the handlers here must run on the loop (the ASGI app calls them
+inline) and rooms should be served by one ASGI worker, which holds tens of
+thousands of idle streams.
+"""
+
+import asyncio
+import collections
+import hmac
+import secrets
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+import analytics
+import metrics
+import responses
+from card_packs import get_catalog
+from cards import Card, Difficulty
+from game_engine import Deck
+
+DIFFICULTIES = {d.name.lower(): d for d in Difficulty}
+
+# Recent events kept per room for subscribers that fall behind or reconnect
+HISTORY = 64
+
+# Most often standings are published while answers come in, in seconds
+STANDINGS_INTERVAL = 0.5
+
+# Comment line sent on idle streams so proxies keep them open, in seconds
+HEARTBEAT_SECONDS = 15.0
+
+# Players listed in each standings event
+STANDINGS_TOP = 10
+
+MAX_ROOMS = 1000
+MAX_PLAYERS = 50_000
+MAX_NAME_LENGTH = 100
+# Rooms nobody has dealt to or answered in for this long are removed
+ROOM_TTL_SECONDS = 4 * 3600
+
+HEARTBEAT = b": ping\n\n"
+
+
+def _event(name: str, data: bytes, seq: int) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, name.encode(), data)
+
+
+class Player:
+    __slots__ = ("id", "name", "score", "correct", "streak", "answered_round")
+
+    def __init__(self, player_id: int, name: str):
+        self.id = player_id
+        self.name = name
+        self.score = 0
+        self.correct = 0
+        self.streak = 0
+        self.answered_round = 0
+
+    def key(self) -> tuple:
+        """Standings order: score, then correct answers, then who joined first."""
+        return (-self.score, -self.correct, self.id)
+
+
+class Room:
+    """One room's players, shared decks and event stream."""
+
+    def __init__(self, room_id: str, host_token: str):
+        self.id = room_id
+        self.host_token = host_token
+        self.catalog = get_catalog()
+        self.decks = {d: Deck(self.catalog.by_difficulty[d]) for d in Difficulty}
+        self.round = 0
+        self.card: Optional[Card] = None
+        self.answered = 0  # answers to the card in play
+        self.closed = False
+        self.players: Dict[str, Player] = {}  # token -> player
+        self.names = set()
+        self.standings = SortedList()  # Player.key() of every player
+        self.by_id: Dict[int, Player] = {}
+        self.subscribers = 0
+        self.last_activity = time.monotonic()
+        self.seq = 0
+        self.events = collections.deque(maxlen=HISTORY)  # (seq, encoded event)
+        self._card_event = b""
+        self._standings_event = b""
+        self._standings_due = False
+        self._published = asyncio.Event()
+        self._heartbeat = None
+
+    # Publishing (on the event loop)
+
+    def publish(self, name: str, data: bytes) -> bytes:
+        """Encode an event once, keep it for late readers and wake every subscriber."""
+        self.seq += 1
+        event = _event(name, data, self.seq)
+        self.events.append((self.seq, event))
+        self._wake()
+        return event
+
+    def _wake(self):
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def _publish_standings(self):
+        self._standings_due = False
+        if self.closed:
+            return
+        self._standings_event = self.publish("standings", self._standings_json())
+
+    def standings_changed(self):
+        """Publish standings soon, coalescing the changes of the next STANDINGS_INTERVAL."""
+        if not self._standings_due:
+            self._standings_due = True
+            asyncio.get_running_loop().call_later(STANDINGS_INTERVAL, self._publish_standings)
+
+    def _beat(self):
+        if self.closed:
+            return
+        if self.subscribers:
+            # Subscribers woken with nothing new send HEARTBEAT
+            self._wake()
+        self._heartbeat = asyncio.get_running_loop().call_later(HEARTBEAT_SECONDS, self._beat)
+
+    def start_heartbeat(self):
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.get_running_loop().call_later(HEARTBEAT_SECONDS, self._beat)
+
+    # Reading (subscribers)
+
+    def snapshot(self) -> List[bytes]:
+        """Events that bring a new or lagging subscriber up to date."""
+        return [event for event in (self._card_event, self._standings_event) if event]
+
+    def events_after(self, seq: int) -> Tuple[List[bytes], int]:
+        """Events since ``seq`` and the sequence number to continue from.
+
+        Returns the snapshot instead when the ring no longer reaches back to ``seq``.
+        """
+        behind = self.seq - seq
+        if behind <= 0:
+            return [], self.seq
+        if behind > len(self.events):
+            return self.snapshot(), self.seq
+        events = self.events
+        return [events[i][1] for i in range(-behind, 0)], self.seq
+
+    def changed(self) -> asyncio.Event:
+        """Set at the next event or heartbeat; take it before calling ``events_after``."""
+        return self._published
+
+    # Encoding
+
+    def _standings_json(self) -> bytes:
+        top = []
+        previous, rank = None, 0
+        for position, key in enumerate(self.standings[:STANDINGS_TOP]):
+            if key[0] != previous:
+                previous, rank = key[0], position + 1
+            player = self.by_id[key[2]]
+            top.append({"rank": rank, "name": player.name, "score": player.score,
+                        "correct": player.correct})
+        return responses.dumps({"round": self.round, "players": len(self.players),
+                                "answered": self.answered, "top": top})
+
+    def rank(self, player: Player) -> int:
+        """1-based rank of ``player``'s score; equal scores share a rank."""
+        return self.standings.bisect_left((-player.score,)) + 1
+
+
+_rooms: Dict[str, Room] = {}
+
+metrics.Gauge(metrics.registry, "room_open", "Open multiplayer rooms.", lambda: len(_rooms))
+metrics.Gauge(
+    metrics.registry, "room_subscribers", "Open room event streams.",
+    lambda: sum(room.subscribers for room in _rooms.values()),
+)
+
+
+def _room(room_id: str) -> Optional[Room]:
+    room = _rooms.get(room_id)
+    return room if room is not None and not room.closed else None
+
+
+def _sweep(now: float):
+    for room_id, room in list(_rooms.items()):
+        if room.closed or now - room.last_activity > ROOM_TTL_SECONDS:
+            _close(room)
+            del _rooms[room_id]
+
+
+def _close(room: Room):
+    if not room.closed:
+        room.closed = True
+        room.publish("closed", room._standings_json())
+        if room._heartbeat is not None:
+            room._heartbeat.cancel()
+
+
+def _host(room: Room, data: dict) -> bool:
+    token = data.get("host_token")
+    return isinstance(token, str) and hmac.compare_digest(token, room.host_token)
+
+
+NOT_FOUND = ({"error": "Room not found"}, 404)
+FORBIDDEN = ({"error": "Only the host can do that"}, 403)
+BAD_BODY = ({"error": "Request body must be a JSON object"}, 400)
+
+
+def create_room(data):
+    """Open a room; the host keeps ``host_token`` to deal and close it."""
+    now = time.monotonic()
+    _sweep(now)
+    if len(_rooms) >= MAX_ROOMS:
+        return {"error": "Too many open rooms"}, 503
+    room = Room(secrets.token_urlsafe(6), secrets.token_urlsafe(16))
+    room.start_heartbeat()
+    _rooms[room.id] = room
+    return {"room_id": room.id, "host_token": room.host_token}, 200
+
+
+def join_room(room_id, data):
+    """Add a player; they answer with the returned ``player_token``."""
+    room = _room(room_id)
+    if room is None:
+        return NOT_FOUND
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    name = data.get("player_name")
+    name = name.strip() if isinstance(name, str) else ""
+    if not name or len(name) > MAX_NAME_LENGTH:
+        return {"error": f"Player name must be 1 to {MAX_NAME_LENGTH} characters"}, 400
+    if name.lower() in room.names:
+        return {"error": "That name is taken in this room"}, 409
+    if len(room.players) >= MAX_PLAYERS:
+        return {"error": "Room is full"}, 503
+    player = Player(len(room.by_id) + 1, name)
+    token = secrets.token_urlsafe(16)
+    room.players[token] = player
+    room.by_id[player.id] = player
+    room.names.add(name.lower())
+    room.standings.add(player.key())
+    room.standings_changed()
+    return {"room_id": room.id, "player_id": player.id, "player_token": token}, 200
+
+
+def deal_card(room_id, data):
+    """Deal the next card of a difficulty from the room's shared deck to every player."""
+    room = _room(room_id)
+    if room is None:
+        return NOT_FOUND
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    if not _host(room, data):
+        return FORBIDDEN
+    difficulty = DIFFICULTIES.get(str(data.get("difficulty", "easy")).lower())
+    if difficulty is None or not len(room.catalog.by_difficulty[difficulty]):
+        return {"error": "Invalid difficulty"}, 400
+    room.card = room.catalog.get(room.decks[difficulty].draw())
+    room.round += 1
+    room.answered = 0
+    room.last_activity = time.monotonic()
+    # The catalog's public payload has no correct flags, so the stream can carry it as is
+    payload = room.catalog.payload(room.card.id) + b"}"
+    room._card_event = room.publish("card", b'{"round":%d,"card":%s}' % (room.round, payload))
+    room.standings_changed()
+    return {"room_id": room.id, "round": room.round, "card_id": room.card.id}, 200
+
+
+def answer_card(room_id, data):
+    """Answer the card in play; the result is the player's own, standings go to the stream."""
+    room = _room(room_id)
+    if room is None:
+        return NOT_FOUND
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    token = data.get("player_token")
+    player = room.players.get(token) if isinstance(token, str) else None
+    if player is None:
+        return {"error": "Unknown player"}, 403
+    if room.card is None:
+        return {"error": "No card dealt yet"}, 409
+    if player.answered_round == room.round:
+        return {"error": "Already answered this card"}, 409
+    index = data.get("answer_index")
+    if (not isinstance(index, int) or isinstance(index, bool)
+            or not 0 <= index < len(room.card.answers)):
+        return {"error": "Invalid answer selection"}, 400
+
+    answer = room.card.answers[index]
+    room.standings.remove(player.key())
+    player.answered_round = room.round
+    if answer.is_correct:
+        points = answer.points_if_correct
+        player.score += points
+        player.correct += 1
+        player.streak += 1
+    else:
+        points = 0
+        player.streak = 0
+    room.standings.add(player.key())
+    room.answered += 1
+    room.last_activity = time.monotonic()
+    room.standings_changed()
+    analytics.record(room.card.id, index, answer.is_correct)
+    return {
+        "round": room.round,
+        "is_correct": answer.is_correct,
+        "points_earned": points,
+        "explanation": answer.explanation,
+        "score": player.score,
+        "streak": player.streak,
+        "rank": room.rank(player),
+        "players": len(room.players),
+    }, 200
+
+
+def close_room(room_id, data):
+    """End the room: subscribers get the final standings and their streams end."""
+    room = _room(room_id)
+    if room is None:
+        return NOT_FOUND
+    data = data or {}
+    if not isinstance(data, dict):
+        return BAD_BODY
+    if not _host(room, data):
+        return FORBIDDEN
+    _close(room)
+    _rooms.pop(room.id, None)
+    return {"room_id": room.id, "closed": True}, 200
+
+
+def get_room(room_id: str) -> Optional[Room]:
+    """The open room ``room_id`` for a new subscriber, or None."""
+    return _room(room_id)
\ No newline at end of file
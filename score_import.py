@@ -0,0 +1,302 @@
+"""Bulk import of historical scores into the Supply Chain Strategy Card Game leaderboard.
+
+Scores from offline events arrive as CSV (with a header row) or JSONL (one
+object per line) records with ``name``, ``score``, ``accuracy`` and
+``cards_played``, plus an optional ``submitted_at`` (Unix seconds or an ISO
+8601 date; the import time when missing) and ``mix`` (the game's difficulty
+mix, see ``game_engine.MIXES``; unknown when missing). Other columns are
+ignored.
+
+Rows are validated a batch at a time: each column of a batch is converted
+and range-checked with one ``map`` call, and only a batch that fails is
+split down to its bad rows to report which rows are bad and why. Bad rows are
+skipped (or, with ``strict``, abort the import). Accepted rows become
+leaderboard index keys and ``RankingSystem.add_scores`` sorts them into the
+board at once.
+
+Usage:
+    python score_import.py FILE [FILE ...] [--format csv|jsonl] [--strict] [--dry-run]
+
+The command imports into the board in ``LEADERBOARD_DIR``, which running
+workers pick up on their next read. ``POST /api/admin/import-scores`` does
+the same over HTTP when ``ADMIN_TOKEN`` is set; the sync Flask app runs it
+inside the request, so it takes at most ``SYNC_MAX_ROWS`` rows.
+"""
+
+import argparse
+import contextlib
+import csv
+import gc
+import io
+import itertools
+import json
+import math
+import operator
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import BinaryIO, List, Optional, Tuple
+
+from game_engine import MIXES, RankingSystem
+from score_log import ScoreLog
+
+FIELDS = ("name", "score", "accuracy", "cards_played", "submitted_at", "mix")
+REQUIRED = FIELDS[:4]
+FORMATS = ("csv", "jsonl")
+
+MAX_NAME_LENGTH = 100
+BATCH_SIZE = 10_000
+MAX_REPORTED_ERRORS = 100
+# Largest upload the sync Flask app imports within a request, which must finish
+# well inside gunicorn's 30 second worker timeout (about 7 s with a score log)
+SYNC_MAX_ROWS = 200_000
+
+
+class ScoreImportError(ValueError):
+    """Raised when an import stream cannot be read at all (unknown format, bad header)."""
+
+
+def detect_format(filename: str) -> str:
+    """Guess the format from a file name's extension."""
+    if filename.lower().endswith(".csv"):
+        return "csv"
+    if filename.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ScoreImportError(f"Cannot tell the format of {filename!r}; pass csv or jsonl")
+
+
+def _open_csv(stream: BinaryIO):
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    try:
+        header = [column.strip().lower() for column in next(reader, [])]
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ScoreImportError(f"Unreadable CSV header: {exc}") from exc
+    missing = [field for field in REQUIRED if field not in header]
+    if missing:
+        raise ScoreImportError(f"CSV header is missing {', '.join(missing)}")
+    layout = [field for field in FIELDS if field in header]
+    return reader, (operator.itemgetter(*map(header.index, layout)), layout, int)
+
+
+def _jsonl_row(line: bytes) -> tuple:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise ValueError("invalid JSON") from None
+    return (record["name"], record["score"], record["accuracy"],
+            record["cards_played"], record.get("submitted_at"), record.get("mix"))
+
+
+def _open_jsonl(stream: BinaryIO):
+    # Lines are parsed when their batch is validated, so a bad line is just a bad row;
+    # JSON integers must already be integers, where CSV holds text
+    return (line for line in stream if line.strip()), (_jsonl_row, FIELDS, operator.index)
+
+
+def _percent(value) -> float:
+    # Exported boards show accuracy as "85.0%"
+    if isinstance(value, str) and value.endswith("%"):
+        value = value[:-1]
+    return float(value)
+
+
+def _timestamp(value, now: float) -> float:
+    if value is None or value == "":
+        return now
+    try:
+        return float(value)
+    except ValueError:
+        # fromisoformat only takes a "Z" suffix from Python 3.11
+        if value.endswith(("Z", "z")):
+            value = value[:-1] + "+00:00"
+        moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _column(values, convert, field: str, fallback=None) -> list:
+    """Convert a column with one ``map``; retry with ``fallback`` when a value needs it."""
+    try:
+        return list(map(convert, values))
+    except (TypeError, ValueError):
+        if fallback is None:
+            raise ValueError(f"invalid {field}") from None
+    return _column(values, fallback, field)
+
+
+def _mix(value) -> str:
+    if value is None or value == "":
+        return ""
+    if value not in MIXES:
+        raise ValueError(value)
+    return value
+
+
+def _keys(rows: list, reader: tuple, now: float) -> List[tuple]:
+    """Convert and check a batch column by column; raises on the first bad value.
+
+    ``reader`` is ``(parse, layout, integer)``: what turns a row into a
+    tuple of fields, which fields it holds, and the integer conversion.
+    """
+    parse, layout, integer = reader
+    columns = dict(zip(layout, zip(*map(parse, rows))))
+    names, scores, accuracies, cards_played = map(columns.get, REQUIRED)
+    names = _column(names, str.strip, "name")
+    if not all(names) or max(map(len, names)) > MAX_NAME_LENGTH:
+        raise ValueError(f"name must be 1 to {MAX_NAME_LENGTH} characters")
+    scores = _column(scores, integer, "score")
+    if min(scores) < 0:
+        raise ValueError("score must not be negative")
+    accuracies = _column(accuracies, float, "accuracy", _percent)
+    if not all(0.0 <= accuracy <= 100.0 for accuracy in accuracies):
+        raise ValueError("accuracy must be between 0 and 100")
+    cards_played = _column(cards_played, integer, "cards_played")
+    if min(cards_played) < 0:
+        raise ValueError("cards_played must not be negative")
+    if "submitted_at" in columns:
+        submitted = _column(columns["submitted_at"], float, "submitted_at",
+                            lambda value: _timestamp(value, now))
+    else:
+        submitted = [now] * len(names)
+    if not all(map(math.isfinite, submitted)):
+        raise ValueError("submitted_at must be a finite time")
+    mixes = _column(columns["mix"], _mix, "mix") if "mix" in columns else [""] * len(names)
+    return list(zip(map(operator.neg, scores), map(operator.neg, accuracies),
+                    map(operator.neg, cards_played), submitted, names, mixes))
+
+
+_ROW_ERRORS = (ValueError, TypeError, KeyError, IndexError)
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, KeyError):
+        return f"missing field {exc.args[0]}"
+    if isinstance(exc, IndexError):
+        return "row has fewer columns than the header"
+    if isinstance(exc, TypeError):
+        return "record must be a JSON object"
+    return str(exc)
+
+
+def validate_batch(rows: list, reader: tuple, now: float) -> Tuple[List[tuple], List[Tuple[int, str]]]:
+    """Return the index keys of a batch's good rows and ``(position, message)`` per bad row.
+
+    A failing batch is split in halves until the bad rows are isolated, so a
+    few bad rows cost a few re-checks of their neighbours, not of every row.
+    """
+    try:
+        return _keys(rows, reader, now), []
+    except _ROW_ERRORS as exc:
+        if len(rows) == 1:
+            return [], [(0, _error_message(exc))]
+    middle = len(rows) // 2
+    keys, errors = validate_batch(rows[:middle], reader, now)
+    right_keys, right_errors = validate_batch(rows[middle:], reader, now)
+    keys.extend(right_keys)
+    errors.extend((middle + position, message) for position, message in right_errors)
+    return keys, errors
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """Turn off the cyclic garbage collector for a whole-process import.
+
+    Millions of new key tuples trigger full collections that rescan all of
+    them, which adds about half to the time of reading a large file. This
+    affects every thread, so only the offline command uses it, never a
+    server worker.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def read_scores(stream: BinaryIO, fmt: str, batch_size: int = BATCH_SIZE,
+                strict: bool = False, max_rows: Optional[int] = None) -> Tuple[List[tuple], dict]:
+    """Read and validate every record in ``stream``; return the good rows' keys and a report.
+
+    With ``strict`` any bad row rejects the whole stream (no keys are
+    returned). A stream of more than ``max_rows`` records raises
+    ScoreImportError as soon as the limit is passed.
+    """
+    if fmt not in FORMATS:
+        raise ScoreImportError(f"Unknown format {fmt!r}; use csv or jsonl")
+    rows, reader = _open_csv(stream) if fmt == "csv" else _open_jsonl(stream)
+    now = time.time()
+    keys = []
+    errors = []
+    rejected = 0
+    count = 0
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            if max_rows is not None and count + len(batch) > max_rows:
+                raise ScoreImportError(f"More than {max_rows} rows; import larger files with score_import.py")
+            good, bad = validate_batch(batch, reader, now)
+            keys.extend(good)
+            rejected += len(bad)
+            for position, message in bad[:MAX_REPORTED_ERRORS - len(errors)]:
+                errors.append({"row": count + position + 1, "error": message})
+            count += len(batch)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ScoreImportError(f"Unreadable input after row {count}: {exc}") from exc
+    if strict and rejected:
+        keys = []
+    return keys, {"format": fmt, "rows": count, "accepted": len(keys), "rejected": rejected,
+                  "errors": errors}
+
+
+def import_scores(ranking, stream: BinaryIO, fmt: str, batch_size: int = BATCH_SIZE,
+                  strict: bool = False, dry_run: bool = False,
+                  max_rows: Optional[int] = None) -> dict:
+    """Validate ``stream`` and add its good rows to ``ranking`` in one sort; return a report."""
+    start = time.perf_counter()
+    keys, report = read_scores(stream, fmt, batch_size, strict, max_rows)
+    report["validate_seconds"] = round(time.perf_counter() - start, 3)
+    if keys and not dry_run:
+        ranking.add_scores(keys)
+    report["imported"] = 0 if dry_run else len(keys)
+    report["leaderboard_size"] = len(ranking)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", metavar="FILE")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--strict", action="store_true", help="import nothing from a file with bad rows")
+    parser.add_argument("--dry-run", action="store_true", help="only validate")
+    args = parser.parse_args()
+
+    directory = os.environ.get("LEADERBOARD_DIR")
+    if not directory and not args.dry_run:
+        parser.error("set LEADERBOARD_DIR to the board to import into (or use --dry-run)")
+    ranking = RankingSystem(ScoreLog(directory) if directory else None)
+    failed = False
+    for path in args.files:
+        try:
+            with open(path, "rb") as f, paused_gc():
+                report = import_scores(ranking, f, args.format or detect_format(path),
+                                       args.batch_size, args.strict, args.dry_run)
+        except (OSError, ScoreImportError) as exc:
+            print(f"{path}: {exc}", file=sys.stderr)
+            failed = True
+            continue
+        json.dump({"file": path, **report}, sys.stdout, indent=2)
+        print()
+        failed = failed or bool(report["rejected"])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Durable, append-only leaderboard storage for Supply Chain Strategy Card Game.
+
+Every finished game is appended as one JSON line to ``scores.log``. Writes
+are group-committed: a background thread collects the lines queued during a
+short window and appends them with a single write and fsync, so request
+threads never wait on the disk. All workers append to the same file with
+``O_APPEND`` and read each other's scores by tailing it from the last byte
+offset they saw.
+
+A compacted snapshot of the whole board (sorted, one line per score, plus
+the log offset it covers) is rewritten periodically. Startup loads the
+snapshot and replays only the log written after it.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds the writer waits before retrying after a failed write
+_RETRY_SECONDS = 1.0
+
+
+class WriteFailed(OSError):
+    """A write to the log failed; ``unwritten`` are the lines to write again."""
+
+    def __init__(self, unwritten: List[bytes]):
+        super().__init__(f"{len(unwritten)} score log lines not written")
+        self.unwritten = unwritten
+
+
+def _unwritten(batch: List[bytes], missing: int) -> List[bytes]:
+    """The lines of ``batch`` whose last ``missing`` bytes did not reach the file.
+
+    A line cut short gets a newline in front, so its retry starts a line of
+    its own and the torn part is skipped by readers.
+    """
+    lines = []
+    for line in reversed(batch):
+        if missing <= 0:
+            break
+        lines.append(line if missing >= len(line) else b"\n" + line)
+        missing -= len(line)
+    lines.reverse()
+    return lines
+
+
+class ScoreLog:
+    """Append-only score log plus periodic snapshot in ``directory``."""
+
+    def __init__(self, directory: str, flush_interval: float = 0.05,
+                 snapshot_every: int = 10000):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, "scores.log")
+        self.snapshot_path = os.path.join(directory, "scores.snapshot")
+        self.lock_path = os.path.join(directory, "snapshot.lock")
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._queue = []
+        self._cond = threading.Condition()
+        self._writer_pid = None
+        atexit.register(self.flush)
+
+    def append(self, record: dict):
+        """Queue a record for the next group commit."""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self._cond:
+            self._queue.append(line)
+            if self._writer_pid != os.getpid():
+                # Threads do not survive a fork, so each worker starts its own writer
+                self._writer_pid = os.getpid()
+                threading.Thread(target=self._run_writer, daemon=True).start()
+            self._cond.notify()
+
+    def append_many(self, records: Iterable[dict], chunk_bytes: int = 4 << 20):
+        """Append records now, in writes of about ``chunk_bytes``, for bulk imports.
+
+        Bypasses the group-commit queue and returns once the records are fsynced.
+        """
+        self.flush()
+        batch = []
+        size = 0
+        for record in records:
+            line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+            batch.append(line)
+            size += len(line)
+            if size >= chunk_bytes:
+                self._write(batch)
+                batch = []
+                size = 0
+        self._write(batch)
+
+    def flush(self):
+        """Write every queued record now; on failure they stay queued for the next commit."""
+        with self._cond:
+            batch, self._queue = self._queue, []
+        try:
+            self._write(batch)
+        except WriteFailed as exc:
+            with self._cond:
+                self._queue[:0] = exc.unwritten
+            raise
+
+    def _run_writer(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # Let concurrent requests join this commit
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # The batch is queued again; a dead writer would lose every later score
+                logger.exception("Score log write failed; retrying")
+                time.sleep(_RETRY_SECONDS)
+
+    def _write(self, batch: List[bytes]):
+        if not batch:
+            return
+        data = memoryview(b"".join(batch))
+        try:
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as exc:
+            raise WriteFailed(_unwritten(batch, len(data))) from exc
+
+    def size(self) -> int:
+        """Bytes in the log, complete records or not."""
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+
+    def read_from(self, offset: int) -> Tuple[List[dict], int]:
+        """Return complete records appended after ``offset`` and the new offset."""
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        # A concurrent writer may have left a partial last line
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Left by a write that failed part way; the line was written again after it
+                logger.warning("Skipping a torn score log line")
+        return records, offset + end
+
+    def load(self) -> Tuple[List[dict], int]:
+        """Return the snapshot records (in leaderboard order) and the log offset after them."""
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                header = json.loads(f.readline())
+                records = [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return [], 0
+        return records, header["offset"]
+
+    def _snapshot_offset(self) -> int:
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                return json.loads(f.readline())["offset"]
+        except FileNotFoundError:
+            return 0
+
+    def write_snapshot(self, records: Iterable[dict], offset: int, count: int) -> bool:
+        """Atomically replace the snapshot with ``count`` records.
+
+        Returns False if another worker is writing one or a newer one exists;
+        ``records`` is only consumed when the snapshot is written.
+        """
+        with open(self.lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                if self._snapshot_offset() >= offset:
+                    return False
+                tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(json.dumps({"offset": offset, "count": count}) + "\n")
+                    for record in records:
+                        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.snapshot_path)
+                return True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""Write-ahead log of live game sessions, for recovering them after a worker dies.
+
+With ``SESSION_LOG_DIR`` set, the in-process game store (``memory://``)
+logs every session update in that directory: the game's compact
+``GameEngine.to_bytes`` state when it is stored (start, draw, answer) and a
+tombstone when it ends, expires or is evicted. Each record carries a CRC,
+so a write torn by a crash is detected and replay stops there.
+
+Writes use group commit. Request threads add encoded records to a pending
+list; one committer thread per worker writes everything pending with one
+``write`` and one ``fdatasync``. With ``sync`` (``SESSION_LOG_SYNC=1``)
+request threads wait until their record is on disk, and requests that
+arrive during a sync share the next one. Without it they return at once
+and the committer waits ``commit_interval`` between groups, so a crash can
+lose that long of updates.
+
+Each worker owns the files named after it (``sessions-<pid>-<tag>``) and
+holds an exclusive ``flock`` on its ``.lock`` file for as long as it runs.
+When its current segment passes ``checkpoint_bytes`` the committer starts
+a new segment, writes a checkpoint of every live session and deletes the
+older files, so recovery reads one checkpoint and at most
+``checkpoint_bytes`` of log however long games have been running. A
+starting worker tries the lock of every owner in the directory; one it can
+take belongs to a worker that has exited or crashed, and it replays that
+owner's latest checkpoint and later segments into its own store and log
+before deleting them.
+"""
+
+import atexit
+import fcntl
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from card_packs import CatalogUnavailable
+from game_engine import GameEngine
+
+logger = logging.getLogger(__name__)
+
+# Record: CRC32 of the rest, kind, game ID length, state length; then the ID and state
+_CRC = struct.Struct("<I")
+_HEAD = struct.Struct("<BHI")
+_PUT = 1
+_DELETE = 2
+
+CHECKPOINT_BYTES = 16 << 20
+COMMIT_INTERVAL = 0.005
+
+
+def _record(kind: int, game_id: str, state: bytes = b"") -> bytes:
+    key = game_id.encode()
+    body = _HEAD.pack(kind, len(key), len(state)) + key + state
+    return _CRC.pack(zlib.crc32(body)) + body
+
+
+def read_records(path: str) -> List[Tuple[int, str, bytes]]:
+    """Return ``(kind, game_id, state)`` for every intact record, up to the first bad one.
+
+    A file that no longer exists (another worker adopted and deleted it) has none.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    records = []
+    offset = 0
+    header = _CRC.size + _HEAD.size
+    while offset + header <= len(data):
+        crc, = _CRC.unpack_from(data, offset)
+        kind, key_length, state_length = _HEAD.unpack_from(data, offset + _CRC.size)
+        end = offset + header + key_length + state_length
+        if end > len(data) or zlib.crc32(data[offset + _CRC.size:end]) != crc:
+            break
+        key_end = offset + header + key_length
+        records.append((kind, data[offset + header:key_end].decode(), data[key_end:end]))
+        offset = end
+    return records
+
+
+def _seq(path: str) -> int:
+    return int(path.rsplit("-", 1)[1].split(".", 1)[0])
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _same_file(f, path: str) -> bool:
+    """Whether ``path`` still names the open file ``f`` (it is not deleted or replaced)."""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+class SessionLog:
+    """One worker's session log plus the recovery of logs left by other workers.
+
+    The store calls ``attach`` before using the log; the first call in each
+    process (gunicorn forks workers after the app is imported) opens the
+    worker's files, starts its committer and adopts orphaned sessions.
+    """
+
+    def __init__(self, directory: str, sync: bool = False,
+                 commit_interval: float = COMMIT_INTERVAL,
+                 checkpoint_bytes: int = CHECKPOINT_BYTES):
+        self.directory = directory
+        self.sync = sync
+        self.commit_interval = commit_interval
+        self.checkpoint_bytes = checkpoint_bytes
+        self.recovered = 0
+        self.recovery_seconds: Optional[float] = None
+        self.checkpoints = 0
+        self._store = None
+        self._pid = None
+        self._attach_lock = threading.Lock()
+        self._cond = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, owner: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"sessions-{owner}{suffix}")
+
+    def attach(self, store):
+        """Open this worker's log and recover orphaned sessions into ``store``; cheap once done."""
+        if self._pid == os.getpid():
+            return
+        with self._attach_lock:
+            if self._pid != os.getpid():
+                self._open(store)
+                self._pid = os.getpid()
+
+    def _open(self, store):
+        self._store = store
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Locked before it gets the name other workers look for, so none can adopt it
+        lock_path = self._path(self._owner, ".lock")
+        self._lock_file = open(lock_path + ".new", "wb")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        os.rename(lock_path + ".new", lock_path)
+        self._seq = 0
+        self._segment = open(self._path(self._owner, "-0.wal"), "ab", buffering=0)
+        self._segment_bytes = 0
+        # A forked worker must not inherit its parent's pending records
+        self._pending: List[bytes] = []
+        # The latest logged state of each live session, which checkpoints write
+        self._states: Dict[str, bytes] = {}
+        self._appended = 0
+        self._committed = 0
+        threading.Thread(target=self._run_committer, daemon=True).start()
+        atexit.register(self.flush)
+        self._recover()
+
+    def _recover(self):
+        start = time.perf_counter()
+        adopted = []
+        for lock_path in glob.glob(os.path.join(self.directory, "sessions-*.lock")):
+            owner = os.path.basename(lock_path)[len("sessions-"):-len(".lock")]
+            if owner == self._owner:
+                continue
+            try:
+                lock_file = open(lock_path, "rb")
+            except FileNotFoundError:
+                continue  # adopted by another worker since the glob
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()  # its worker is alive
+                continue
+            if not _same_file(lock_file, lock_path):
+                lock_file.close()  # another worker adopted it while we waited for the lock
+                continue
+            adopted.append((owner, lock_file))
+            for game_id, state in self._replay(owner).items():
+                game = _decode(state)
+                if game is not None:
+                    self._store._restore(game_id, game)
+                    self._append(_record(_PUT, game_id, state), game_id, state)
+                    self.recovered += 1
+        if not adopted:
+            return
+        # The adopted sessions must be in our log before theirs is deleted
+        self.flush()
+        for owner, lock_file in adopted:
+            for path in glob.glob(self._path(owner, "-*")):
+                _remove(path)
+            _remove(self._path(owner, ".lock"))
+            lock_file.close()
+        self.recovery_seconds = round(time.perf_counter() - start, 4)
+        logger.info("Recovered %d sessions from %d exited workers in %.3fs",
+                    self.recovered, len(adopted), self.recovery_seconds)
+
+    def _replay(self, owner: str) -> Dict[str, bytes]:
+        """Latest state of each live session in ``owner``'s files."""
+        checkpoints = sorted(glob.glob(self._path(owner, "-*.ckpt")), key=_seq)
+        first = _seq(checkpoints[-1]) if checkpoints else 0
+        paths = checkpoints[-1:] + [
+            path for path in sorted(glob.glob(self._path(owner, "-*.wal")), key=_seq)
+            if _seq(path) >= first
+        ]
+        games = {}
+        for path in paths:
+            for kind, game_id, state in read_records(path):
+                if kind == _PUT:
+                    games[game_id] = state
+                else:
+                    games.pop(game_id, None)
+        return games
+
+    def _append(self, record: bytes, game_id: str, state: Optional[bytes] = None) -> int:
+        with self._cond:
+            if state is None:
+                self._states.pop(game_id, None)
+            else:
+                self._states[game_id] = state
+            self._pending.append(record)
+            self._appended += 1
+            self._cond.notify()
+            return self._appended
+
+    def _wait(self, ticket: int):
+        with self._cond:
+            while self._committed < ticket:
+                self._cond.wait()
+
+    def put(self, game_id: str, game: GameEngine):
+        """Log a session's new state."""
+        state = game.to_bytes()
+        ticket = self._append(_record(_PUT, game_id, state), game_id, state)
+        if self.sync:
+            self._wait(ticket)
+
+    def delete(self, game_ids):
+        """Log that sessions are gone."""
+        ticket = None
+        for game_id in game_ids:
+            ticket = self._append(_record(_DELETE, game_id), game_id)
+        if self.sync and ticket is not None:
+            self._wait(ticket)
+
+    def flush(self):
+        """Wait until everything logged so far is on disk."""
+        if self._store is not None:
+            self._wait(self._appended)
+
+    def _run_committer(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch, self._pending = self._pending, []
+                ticket = self._appended
+            try:
+                data = b"".join(batch)
+                self._segment.write(data)
+                os.fdatasync(self._segment.fileno())
+                self._segment_bytes += len(data)
+            except Exception:
+                # Keep serving; waiters are released, these updates are not durable
+                logger.exception("Session log write failed")
+            with self._cond:
+                self._committed = ticket
+                self._cond.notify_all()
+            if self._segment_bytes >= self.checkpoint_bytes:
+                try:
+                    self._checkpoint()
+                except Exception:
+                    # A dead committer would leave every synced request waiting
+                    logger.exception("Session log checkpoint failed")
+            if not self.sync and self.commit_interval:
+                time.sleep(self.commit_interval)
+
+    def _checkpoint(self):
+        """Start a new segment and write every live session next to it; drop older files.
+
+        Runs on the committer thread, which is the only writer. The
+        checkpoint holds the states as last logged, not live games that
+        requests may be changing; every record logged after the snapshot is
+        in the new segment, which replays after the checkpoint.
+        """
+        self._seq += 1
+        old = self._segment
+        self._segment = open(self._path(self._owner, f"-{self._seq}.wal"), "ab", buffering=0)
+        self._segment_bytes = 0
+        old.close()
+        with self._cond:
+            states = list(self._states.items())
+        path = self._path(self._owner, f"-{self._seq}.ckpt")
+        with open(path + ".tmp", "wb") as f:
+            f.write(b"".join(_record(_PUT, game_id, state) for game_id, state in states))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        for stale in glob.glob(self._path(self._owner, "-*")):
+            if _seq(stale) < self._seq:
+                os.remove(stale)
+        self.checkpoints += 1
+
+    def stats(self) -> dict:
+        return {
+            "sync": self.sync,
+            "recovered_games": self.recovered,
+            "recovery_seconds": self.recovery_seconds,
+            "checkpoints": self.checkpoints,
+        }
+
+
+def _decode(state: bytes) -> Optional[GameEngine]:
+    try:
+        return GameEngine.from_bytes(state)
+    except ValueError:
+        # Logged by an older release in another format
+        return None
+    except CatalogUnavailable:
+        logger.warning("Dropping a recovered game whose card catalog is gone")
+        return None
\ No newline at end of file
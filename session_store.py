@@ -0,0 +1,474 @@
+"""Game session storage backends for Supply Chain Strategy Card Game.
+
+The web app keeps every live ``GameEngine`` in a ``GameStore``. The in-process
+store is the fastest but only works when one worker serves a game from start
+to finish. The SQLite and Redis stores keep serialized session state outside
+the worker, so any worker (or node, for Redis) can serve any request. The
+signed-token store keeps nothing at all: the game travels with the client.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+from game_engine import GameEngine
+from session_log import SessionLog
+
+
+def _encode(game: GameEngine) -> bytes:
+    return game.to_bytes()
+
+
+def _decode(data: bytes) -> Optional[GameEngine]:
+    try:
+        return GameEngine.from_bytes(bytes(data))
+    except ValueError:
+        # Written by an older release in another format; treat it as expired
+        return None
+
+
+class GameStore:
+    """Interface shared by all session backends."""
+
+    def get(self, game_id: str) -> Optional[GameEngine]:
+        """Return the game for ``game_id`` or None if it does not exist."""
+        raise NotImplementedError
+
+    def put(self, game_id: str, game: GameEngine) -> str:
+        """Create or update the stored state for ``game_id``.
+
+        Returns the ID the client must use for the game from now on, which
+        is ``game_id`` for every store that keeps state on the server.
+        """
+        raise NotImplementedError
+
+    def delete(self, game_id: str) -> bool:
+        """Remove ``game_id`` from the store.
+
+        Returns True only for the call that removed it, so a game ended by
+        two requests at once is scored once.
+        """
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Return counters for health reporting."""
+        return {"backend": type(self).__name__, "live_games": len(self)}
+
+
+class MemoryGameStore(GameStore):
+    """Keeps live GameEngine objects in this process.
+
+    Games idle for longer than ``ttl`` seconds are dropped, and once more than
+    ``max_games`` are live the least recently used one is evicted. Entries are
+    kept in access order, so expired games always sit at the front and each
+    sweep only touches what it removes.
+
+    With a ``SessionLog`` every change is also logged, so the games survive
+    the worker (see session_log.py).
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_games: Optional[int] = None,
+                 log: Optional[SessionLog] = None):
+        self.ttl = ttl
+        self.max_games = max_games
+        self.log = log
+        self.expired = 0
+        self.evicted = 0
+        self._games = OrderedDict()  # game_id -> (last_access, game)
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> list:
+        """Drop expired and over-capacity games; return their IDs when they must be logged."""
+        removed = []
+        if self.ttl is not None:
+            cutoff = now - self.ttl
+            while self._games:
+                game_id, (last_access, _) = next(iter(self._games.items()))
+                if last_access >= cutoff:
+                    break
+                del self._games[game_id]
+                self.expired += 1
+                removed.append(game_id)
+        if self.max_games is not None:
+            while len(self._games) > self.max_games:
+                removed.append(self._games.popitem(last=False)[0])
+                self.evicted += 1
+        return removed if self.log is not None else []
+
+    def get(self, game_id: str) -> Optional[GameEngine]:
+        if self.log is not None:
+            self.log.attach(self)
+        now = time.monotonic()
+        with self._lock:
+            removed = self._sweep(now)
+            entry = self._games.get(game_id)
+            if entry is not None:
+                self._games[game_id] = (now, entry[1])
+                self._games.move_to_end(game_id)
+        if removed:
+            self.log.delete(removed)
+        return entry[1] if entry is not None else None
+
+    def put(self, game_id: str, game: GameEngine) -> str:
+        if self.log is not None:
+            self.log.attach(self)
+        now = time.monotonic()
+        with self._lock:
+            self._games[game_id] = (now, game)
+            self._games.move_to_end(game_id)
+            removed = self._sweep(now)
+        if self.log is not None:
+            # Logged after the update, so the log ends at the stored state
+            self.log.put(game_id, game)
+            if removed:
+                self.log.delete(removed)
+        return game_id
+
+    def delete(self, game_id: str) -> bool:
+        if self.log is not None:
+            self.log.attach(self)
+        with self._lock:
+            found = self._games.pop(game_id, None) is not None
+        if found and self.log is not None:
+            self.log.delete([game_id])
+        return found
+
+    def _restore(self, game_id: str, game: GameEngine):
+        """Add a recovered game without logging it."""
+        with self._lock:
+            self._games[game_id] = (time.monotonic(), game)
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def stats(self) -> dict:
+        stats = {
+            **super().stats(),
+            "expired_games": self.expired,
+            "evicted_games": self.evicted,
+            "max_games": self.max_games,
+            "ttl_seconds": self.ttl,
+        }
+        if self.log is not None:
+            stats["session_log"] = self.log.stats()
+        return stats
+
+
+class SQLiteGameStore(GameStore):
+    """Stores serialized sessions in a SQLite database shared by all workers on a host.
+
+    Point ``path`` at a tmpfs location (for example ``/dev/shm``) to keep the
+    database in shared memory. Idle and over-capacity games are deleted by a
+    sweep that runs at most every ``sweep_interval`` seconds from ``put``;
+    the eviction counters cover the sweeps run by this worker.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None,
+                 max_games: Optional[int] = None, sweep_interval: float = 30.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_games = max_games
+        self.sweep_interval = sweep_interval
+        self.expired = 0
+        self.evicted = 0
+        self._next_sweep = 0.0
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork or a thread boundary
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                "id TEXT PRIMARY KEY, state BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS games_updated_at ON games (updated_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _sweep(self, conn: sqlite3.Connection, now: float):
+        if self.ttl is not None:
+            self.expired += conn.execute(
+                "DELETE FROM games WHERE updated_at < ?", (now - self.ttl,)
+            ).rowcount
+        if self.max_games is not None:
+            self.evicted += conn.execute(
+                "DELETE FROM games WHERE id IN (SELECT id FROM games "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)", (self.max_games,)
+            ).rowcount
+
+    def get(self, game_id: str) -> Optional[GameEngine]:
+        cutoff = time.time() - self.ttl if self.ttl is not None else 0.0
+        row = self._connection().execute(
+            "SELECT state FROM games WHERE id = ? AND updated_at >= ?", (game_id, cutoff)
+        ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def put(self, game_id: str, game: GameEngine) -> str:
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO games (id, state, updated_at) VALUES (?, ?, ?)",
+            (game_id, _encode(game), now),
+        )
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self._sweep(conn, now)
+        return game_id
+
+    def delete(self, game_id: str) -> bool:
+        return self._connection().execute(
+            "DELETE FROM games WHERE id = ?", (game_id,)
+        ).rowcount > 0
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "expired_games": self.expired,
+            "evicted_games": self.evicted,
+            "max_games": self.max_games,
+            "ttl_seconds": self.ttl,
+        }
+
+
+class RedisGameStore(GameStore):
+    """Stores serialized sessions in any server that speaks the Redis protocol.
+
+    ``client`` only needs ``get``, ``set``, ``delete`` and ``scan_iter`` with
+    redis-py semantics, so a local stand-in can replace a real server. Idle
+    games expire through the server's key TTL; cap memory with the server's
+    ``maxmemory`` and an LRU eviction policy.
+    """
+
+    def __init__(self, client, prefix: str = "game:", ttl: Optional[float] = None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, game_id: str) -> Optional[GameEngine]:
+        data = self.client.get(self.prefix + game_id)
+        return _decode(data) if data is not None else None
+
+    def put(self, game_id: str, game: GameEngine) -> str:
+        ex = int(self.ttl) if self.ttl is not None else None
+        self.client.set(self.prefix + game_id, _encode(game), ex=ex)
+        return game_id
+
+    def delete(self, game_id: str) -> bool:
+        return bool(self.client.delete(self.prefix + game_id))
+
+    def __len__(self) -> int:
+        # Only used for health reporting, so a key scan is acceptable here
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+    def stats(self) -> dict:
+        return {**super().stats(), "ttl_seconds": self.ttl}
+
+
+class EndedGames:
+    """IDs of ended token games, each kept until its last token has expired.
+
+    In memory by default, which covers one worker. With ``path`` the IDs go
+    in a SQLite table instead, shared by every worker that opens the same
+    file, and ``add`` is an atomic claim across them.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._ids = {}  # game id -> expiry
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ended_games ("
+                "id BLOB PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, game_id: bytes, expires_at: float) -> bool:
+        """Mark ``game_id`` ended; False if it already was."""
+        now = time.time()
+        if self.path is not None:
+            conn = self._connection()
+            if now >= self._next_sweep:
+                self._next_sweep = now + 60.0
+                conn.execute("DELETE FROM ended_games WHERE expires_at < ?", (now,))
+            return conn.execute(
+                "INSERT OR IGNORE INTO ended_games (id, expires_at) VALUES (?, ?)",
+                (game_id, expires_at),
+            ).rowcount > 0
+        with self._lock:
+            if now >= self._next_sweep:
+                self._next_sweep = now + 60.0
+                self._ids = {key: when for key, when in self._ids.items() if when >= now}
+            if game_id in self._ids:
+                return False
+            self._ids[game_id] = expires_at
+            return True
+
+    def __contains__(self, game_id: bytes) -> bool:
+        if self.path is not None:
+            return self._connection().execute(
+                "SELECT 1 FROM ended_games WHERE id = ?", (game_id,)
+            ).fetchone() is not None
+        return game_id in self._ids
+
+    def __len__(self) -> int:
+        if self.path is not None:
+            return self._connection().execute("SELECT COUNT(*) FROM ended_games").fetchone()[0]
+        return len(self._ids)
+
+
+class SignedTokenGameStore(GameStore):
+    """Keeps no game state on the server: the packed game is the game ID.
+
+    ``put`` returns a URL-safe token holding the ``GameEngine.to_bytes``
+    state, the time it was issued and a random ID that stays the same for
+    the whole game, signed with HMAC-SHA256. ``get`` rebuilds the game from
+    a token only if the signature checks out, it is younger than ``ttl``
+    and its game has not ended. Any worker can serve any turn.
+
+    Ending a game (``delete``) records its ID in ``ended`` until the newest
+    token could still be valid, so an old token cannot be replayed to score
+    the game twice. Pass an ``EndedGames`` with a path to share that record
+    between workers; without ``ttl`` the IDs are kept for good.
+    """
+
+    _HEAD = struct.Struct("<I8s")  # issued, game id
+    MAC_BYTES = 16
+
+    def __init__(self, secret: bytes, ttl: Optional[float] = None,
+                 ended: Optional[EndedGames] = None):
+        self.ttl = ttl
+        self.ended = ended if ended is not None else EndedGames()
+        self._last = threading.local()  # (token, game id) of this thread's last get
+        # Keyed once; each signature copies the keyed state instead of re-deriving it
+        self._mac = hmac.new(secret, digestmod=hashlib.sha256)
+
+    def _sign(self, payload: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(payload)
+        return mac.digest()[:self.MAC_BYTES]
+
+    def _open(self, token: str) -> Optional[tuple]:
+        """``(issued, game id, state)`` from a valid, unexpired token, or None."""
+        try:
+            data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except ValueError:
+            return None
+        payload, mac = data[:-self.MAC_BYTES], data[-self.MAC_BYTES:]
+        if len(payload) <= self._HEAD.size or not hmac.compare_digest(mac, self._sign(payload)):
+            return None
+        issued, game_key = self._HEAD.unpack_from(payload)
+        if self.ttl is not None and time.time() - issued > self.ttl:
+            return None
+        return issued, game_key, payload[self._HEAD.size:]
+
+    def get(self, game_id: str) -> Optional[GameEngine]:
+        opened = self._open(game_id)
+        if opened is None or opened[1] in self.ended:
+            return None
+        self._last.token = (game_id, opened[1])
+        return _decode(opened[2])
+
+    def _game_key(self, game_id: str) -> bytes:
+        # A handler puts the token it just got, so that check is usually done already
+        last = getattr(self._last, "token", None)
+        if last is not None and last[0] == game_id:
+            return last[1]
+        opened = self._open(game_id)
+        return opened[1] if opened is not None else os.urandom(self._HEAD.size - 4)
+
+    def put(self, game_id: str, game: GameEngine) -> str:
+        game_key = self._game_key(game_id)
+        payload = self._HEAD.pack(int(time.time()), game_key) + _encode(game)
+        return base64.urlsafe_b64encode(payload + self._sign(payload)).rstrip(b"=").decode()
+
+    def delete(self, game_id: str) -> bool:
+        opened = self._open(game_id)
+        if opened is None:
+            return False
+        # Every token of this game was issued by now, so all are expired after ttl
+        expires_at = time.time() + self.ttl if self.ttl is not None else float("inf")
+        return self.ended.add(opened[1], expires_at)
+
+    def __len__(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {**super().stats(), "ttl_seconds": self.ttl, "ended_games": len(self.ended)}
+
+
+def create_game_store(url: str, ttl: Optional[float] = None,
+                      max_games: Optional[int] = None,
+                      secret: Optional[str] = None,
+                      log_dir: Optional[str] = None, log_sync: bool = False) -> GameStore:
+    """Build a store from a URL such as ``memory://``, ``sqlite:///path/games.db``,
+    ``redis://localhost:6379/0``, ``token://`` or ``token:///path/ended.db``.
+
+    ``ttl`` is the idle timeout in seconds and ``max_games`` caps live games;
+    None disables either limit. ``secret`` signs ``token://`` sessions; a
+    path after it keeps the IDs of ended games in a SQLite file that all
+    workers on the host share, instead of per worker.
+    ``log_dir`` gives ``memory://`` a session log there, synced on every
+    update with ``log_sync``; the other stores keep their state outside the
+    worker already and ignore it.
+    """
+    parsed = urlparse(url)
+
+    if parsed.scheme in ("", "memory"):
+        log = SessionLog(log_dir, sync=log_sync) if log_dir else None
+        return MemoryGameStore(ttl=ttl, max_games=max_games, log=log)
+
+    if parsed.scheme == "sqlite":
+        path = parsed.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SQLiteGameStore(path, ttl=ttl, max_games=max_games)
+
+    if parsed.scheme in ("redis", "rediss"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("GAME_STORE=redis:// requires the 'redis' package") from exc
+        return RedisGameStore(redis.Redis.from_url(url), ttl=ttl)
+
+    if parsed.scheme == "token":
+        if not secret:
+            raise ValueError("GAME_STORE=token:// requires a signing secret")
+        ended = None
+        if parsed.path:
+            directory = os.path.dirname(parsed.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            ended = EndedGames(parsed.path)
+        return SignedTokenGameStore(secret.encode(), ttl=ttl, ended=ended)
+
+    raise ValueError(f"Unsupported game store URL: {url}")
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""Headless batch simulator for scoring and balance analysis.
+
+Plays synthetic games with the same rules as ``GameEngine``: each turn a
+player picks a difficulty, draws the next card of that difficulty's
+shuffled deck (reshuffled once every card has been drawn), answers it right
+with a probability given by the skill model, scores the card's
+``points_if_correct`` when right, and keeps a per-difficulty streak that
+resets on a wrong answer. Ending the game adds the streak bonus.
+
+Games are played in NumPy batches (one row per game, one column per turn)
+and batches are spread over a process pool, so millions of games take
+seconds. NumPy is only needed here, not by the web app.
+
+Usage:
+    python simulate.py [--games 1000000] [--turns 20] [--mix 0.5,0.3,0.2]
+        [--skill fixed --accuracy 0.85,0.65,0.45 | --skill beta --beta 4,2]
+        [--points 3,5,10] [--multipliers 1,2,5] [--verify 2000] [--output report.json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise RuntimeError("simulate.py requires the 'numpy' package") from exc
+
+from card_packs import get_catalog
+from cards import Difficulty
+from game_engine import _STREAK_MULTIPLIER, GameEngine
+
+DIFFICULTIES = list(Difficulty)
+
+# Decks up to this size are shuffled exactly per game; see simulate_batch
+EXACT_DECK_SIZE = 256
+
+
+def card_points(points_override: Optional[Sequence[int]] = None) -> List[np.ndarray]:
+    """Points a correct answer scores for each card, per difficulty in deck order.
+
+    Correct players pick a card's first correct answer. ``points_override``
+    replaces every card's points with one value per difficulty.
+    """
+    catalog = get_catalog()
+    piles = []
+    for index, difficulty in enumerate(DIFFICULTIES):
+        points = []
+        for card_id in catalog.by_difficulty[difficulty]:
+            answer = next(a for a in catalog.get(card_id).answers if a.is_correct)
+            points.append(answer.points_if_correct)
+        if points_override is not None:
+            points = [points_override[index]] * len(points)
+        piles.append(np.array(points, dtype=np.int64))
+    return piles
+
+
+def player_accuracy(config: dict, rng: np.random.Generator, games: int) -> np.ndarray:
+    """Per-game, per-difficulty probability of answering right, shape (games, 3).
+
+    ``fixed``: every player has ``accuracy`` per difficulty. ``beta``: each
+    player's skill s ~ Beta(a, b), and accuracy on difficulty level k
+    (1 = easy) is s ** k, so harder cards separate strong and weak players.
+    """
+    if config["skill"] == "fixed":
+        return np.broadcast_to(np.array(config["accuracy"], dtype=float), (games, 3))
+    a, b = config["beta"]
+    skill = rng.beta(a, b, size=games)
+    return skill[:, None] ** np.arange(1, 4)[None, :]
+
+
+def simulate_batch(config: dict, seed, games: int) -> dict:
+    """Play ``games`` games and return additive summary counters."""
+    rng = np.random.default_rng(seed)
+    turns = config["turns"]
+    piles = [np.asarray(p) for p in config["piles"]]
+    multipliers = np.array(config["multipliers"], dtype=np.int64)
+    positions = np.arange(turns)
+
+    choice = rng.choice(3, size=(games, turns), p=config["mix"])
+    accuracy = player_accuracy(config, rng, games)
+    correct = rng.random((games, turns)) < np.take_along_axis(accuracy, choice, axis=1)
+
+    score = np.zeros(games, dtype=np.int64)
+    bonus = np.zeros(games, dtype=np.int64)
+    out = {
+        "streak_bonus_games": [0, 0, 0],
+        "resets": [0, 0, 0],
+        "reset_games": [0, 0, 0],
+        "first_reset_turn_sum": [0, 0, 0],
+    }
+    for d, points in enumerate(piles):
+        size = len(points)
+        mask = choice == d
+        draws = mask.sum(axis=1)
+        if size and draws.max() > 0:
+            if size <= EXACT_DECK_SIZE:
+                # The k-th draw of this difficulty takes position k of the
+                # concatenated passes, each pass an independent shuffle
+                passes = -(-turns // size)
+                order = np.argsort(rng.random((games, passes, size)), axis=2).reshape(games, -1)
+                k = np.cumsum(mask, axis=1) - 1
+                drawn = np.take_along_axis(order, np.clip(k, 0, None), axis=1)
+            else:
+                # Shuffling a big deck per game costs O(size); a game sees so
+                # few of its cards that drawing with replacement is close enough
+                drawn = rng.integers(0, size, size=(games, turns))
+            score += np.where(mask & correct, points[drawn], 0).sum(axis=1)
+
+            resets = np.maximum(draws - 1, 0) // size
+            out["resets"][d] = int(resets.sum())
+            reset = resets > 0
+            out["reset_games"][d] = int(reset.sum())
+            # Turn (1-based) of the draw that triggered the first reshuffle
+            first = np.argmax(np.cumsum(mask, axis=1) > size, axis=1) + 1
+            out["first_reset_turn_sum"][d] = int(first[reset].sum())
+
+        # The streak at the end is the run of right answers after the last wrong one
+        last_wrong = np.where(mask & ~correct, positions, -1).max(axis=1)
+        streak = (mask & correct & (positions > last_wrong[:, None])).sum(axis=1)
+        streak_bonus = np.where(streak >= 3, (streak - 2) * multipliers[d], 0)
+        out["streak_bonus_games"][d] = int((streak_bonus > 0).sum())
+        bonus += streak_bonus
+
+    final = score + bonus
+    out.update(
+        games=games,
+        cards_won=int(correct.sum()),
+        score_sum=int(final.sum()),
+        score_sq_sum=int((final * final).sum()),
+        score_histogram=np.bincount(final).tolist(),
+        bonus_games=int((bonus > 0).sum()),
+        bonus_sum=int(bonus.sum()),
+    )
+    return out
+
+
+def merge(totals: dict, part: dict):
+    for key, value in part.items():
+        if key == "score_histogram":
+            hist = totals.setdefault(key, [])
+            hist.extend([0] * (len(value) - len(hist)))
+            for score, count in enumerate(value):
+                hist[score] += count
+        elif isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(totals.get(key, [0] * len(value)), value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def run(config: dict, games: int, batch: int, seed: int, workers: Optional[int]) -> dict:
+    """Play ``games`` games in batches across a process pool and merge the counters."""
+    sizes = [batch] * (games // batch) + ([games % batch] if games % batch else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    totals = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(simulate_batch, [config] * len(sizes), seeds, sizes):
+            merge(totals, part)
+    return totals
+
+
+def percentile(histogram: List[int], fraction: float) -> int:
+    target = fraction * sum(histogram)
+    seen = 0
+    for score, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return score
+    return len(histogram) - 1
+
+
+def report(totals: dict, turns: int) -> dict:
+    games = totals["games"]
+    mean = totals["score_sum"] / games
+    names = [d.name.lower() for d in DIFFICULTIES]
+    hist = totals["score_histogram"]
+    return {
+        "games": games,
+        "accuracy": round(totals["cards_won"] / (games * turns), 4),
+        "score": {
+            "mean": round(mean, 3),
+            "std": round(max(totals["score_sq_sum"] / games - mean * mean, 0) ** 0.5, 3),
+            **{f"p{p}": percentile(hist, p / 100) for p in (1, 10, 50, 90, 99)},
+            "max": len(hist) - 1,
+        },
+        "streak_bonus": {
+            "games_with_bonus": round(totals["bonus_games"] / games, 4),
+            "mean_bonus": round(totals["bonus_sum"] / games, 3),
+            "by_difficulty": {
+                name: round(count / games, 4)
+                for name, count in zip(names, totals["streak_bonus_games"])
+            },
+        },
+        "deck_resets": {
+            name: {
+                "per_game": round(totals["resets"][d] / games, 4),
+                "games_with_reset": round(totals["reset_games"][d] / games, 4),
+                "mean_first_reset_turn": (
+                    round(totals["first_reset_turn_sum"][d] / totals["reset_games"][d], 2)
+                    if totals["reset_games"][d] else None
+                ),
+            }
+            for d, name in enumerate(names)
+        },
+    }
+
+
+def play_engine_games(config: dict, games: int, seed: int) -> float:
+    """Mean final score of ``games`` played through the real GameEngine, for cross-checking.
+
+    Only valid without ``--points``/``--multipliers`` overrides, which the
+    engine does not know about.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    accuracy = player_accuracy(config, np_rng, games)
+    total = 0
+    for g in range(games):
+        game = GameEngine("sim")
+        for _ in range(config["turns"]):
+            d = rng.choices(range(3), weights=config["mix"])[0]
+            card = game.draw_card(DIFFICULTIES[d])
+            right = rng.random() < accuracy[g][d]
+            pick = [i for i, a in enumerate(card.answers) if a.is_correct == right]
+            game.answer_question(pick[0] if pick else 0)
+        total += game.end_game()["final_score"]
+    return total / games
+
+
+def main():
+    def floats(text):
+        return [float(x) for x in text.split(",")]
+
+    def ints(text):
+        return [int(x) for x in text.split(",")]
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--turns", type=int, default=20, help="cards played per game")
+    parser.add_argument("--mix", type=floats, default=[0.5, 0.3, 0.2],
+                        help="probability of picking easy,intermediate,hard")
+    parser.add_argument("--skill", choices=["fixed", "beta"], default="beta")
+    parser.add_argument("--accuracy", type=floats, default=[0.85, 0.65, 0.45],
+                        help="fixed skill: accuracy per difficulty")
+    parser.add_argument("--beta", type=floats, default=[4.0, 2.0],
+                        help="beta skill: Beta(a, b) parameters of player skill")
+    parser.add_argument("--points", type=ints, help="override points per difficulty")
+    parser.add_argument("--multipliers", type=ints, default=list(_STREAK_MULTIPLIER[1:]),
+                        help="streak bonus multipliers per difficulty")
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify", type=int, default=0,
+                        help="also play this many games through GameEngine and compare mean scores")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    mix = np.array(args.mix, dtype=float)
+    config = {
+        "turns": args.turns,
+        "mix": (mix / mix.sum()).tolist(),
+        "skill": args.skill,
+        "accuracy": args.accuracy,
+        "beta": args.beta,
+        "piles": [p.tolist() for p in card_points(args.points)],
+        "multipliers": args.multipliers,
+    }
+
+    start = time.perf_counter()
+    result = report(run(config, args.games, args.batch, args.seed, args.workers), args.turns)
+    result["seconds"] = round(time.perf_counter() - start, 2)
+    if args.verify:
+        result["engine_mean_score"] = round(play_engine_games(config, args.verify, args.seed), 3)
+
+    json.dump({"config": {k: v for k, v in config.items() if k != "piles"}, **result},
+              sys.stdout, indent=2)
+    print()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": config, **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""Shared fixtures: the repo root on sys.path and small compiled card catalogs."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import card_packs  # noqa: E402
+
+
+def card(card_id, difficulty="easy", correct=0, points=10):
+    """A valid pack record with four answers, ``correct`` being the right one."""
+    return {
+        "id": card_id,
+        "difficulty": difficulty,
+        "category": "supply_chain",
+        "title": f"Card {card_id}",
+        "description": "What do you do?",
+        "real_world_impact": "Some.",
+        "answers": [
+            {"text": f"Answer {i}", "is_correct": i == correct,
+             "explanation": f"Because {i}", "points_if_correct": points}
+            for i in range(4)
+        ],
+    }
+
+
+@pytest.fixture
+def make_catalog(tmp_path):
+    """Compile records into a catalog: ``make_catalog([card(1), ...])``."""
+    def make(records, name="catalog.bin"):
+        path = str(tmp_path / name)
+        card_packs.compile_cache(records, path)
+        return card_packs.open_cache(path)
+    return make
\ No newline at end of file
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import analytics
+from analytics import AnswerLog
+
+
+def written(directory):
+    path = os.path.join(directory, f"answers-{os.getpid()}.bin")
+    return list(analytics.read_blocks(path)) if os.path.exists(path) else []
+
+
+def test_answers_round_trip(tmp_path):
+    log = AnswerLog(str(tmp_path))
+    log.record(7, 2, True, 1.5)
+    log.record(8, 0, False, None)
+    log.flush()
+    stats = analytics.answer_stats(str(tmp_path))
+    assert stats[7]["answers"] == 1 and stats[7]["correct_rate"] == 1.0
+    assert stats[7]["median_seconds"] == 1.5
+    assert stats[8]["choices"] == {0: 1.0} and stats[8]["median_seconds"] is None
+
+
+@pytest.mark.parametrize("card_id, answer_index", [(1, 256), (1, -1), (-1, 0), (1 << 32, 0)])
+def test_out_of_range_answers_are_dropped(tmp_path, card_id, answer_index):
+    log = AnswerLog(str(tmp_path))
+    log.record(card_id, answer_index, True, None)
+    log.record(1, 255, True, None)
+    assert log.dropped == 1
+    log.flush()
+    assert [list(block["answer"]) for block in written(str(tmp_path))] == [[255]]
+
+
+def test_failed_write_drops_one_block_and_the_writer_carries_on(tmp_path, monkeypatch):
+    log = AnswerLog(str(tmp_path / "answers"), flush_interval=0.01)
+    log.record(1, 0, True, None)  # starts the writer
+    real_open = open
+    failing = [True]
+
+    def flaky_open(path, mode="r", *args, **kwargs):
+        if failing and path.endswith(".bin"):
+            failing.pop()
+            raise OSError("disk full")
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", flaky_open)
+    deadline = analytics.time.time() + 5
+    while failing and analytics.time.time() < deadline:
+        analytics.time.sleep(0.01)
+    assert not failing and len(log._queue) == 0
+
+    log.record(2, 1, False, None)
+    while not written(log.directory) and analytics.time.time() < deadline:
+        analytics.time.sleep(0.01)
+    assert [list(block["card"]) for block in written(log.directory)] == [[2]]
\ No newline at end of file
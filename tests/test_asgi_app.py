@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi_app
+import game_api
+from game_engine import RankingSystem
+
+
+def post_import(token, chunks):
+    """POST ``chunks`` to the import route; return (status, body, chunks read)."""
+    received = []
+    sent = []
+
+    async def receive():
+        chunk = chunks[len(received)]
+        received.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(received) < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [] if token is None else [(b"x-admin-token", token.encode())]
+    scope = {"type": "http", "method": "POST", "path": asgi_app.IMPORT_PATH,
+             "headers": headers, "query_string": b"format=csv"}
+    asyncio.run(asgi_app.app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"]), len(received)
+
+
+@pytest.fixture
+def ranking(monkeypatch):
+    monkeypatch.setattr(game_api, "ADMIN_TOKEN", "secret")
+    ranking = RankingSystem()
+    monkeypatch.setattr(game_api, "ranking_system", ranking)
+    return ranking
+
+
+@pytest.mark.parametrize("token", [None, "wrong", "secre"])
+def test_import_rejects_a_bad_token_before_reading_the_body(ranking, token):
+    status, _, read = post_import(token, [b"x" * 1024] * 100)
+    assert status == 403 and read == 0
+
+
+def test_import_reads_the_body_for_the_admin(ranking):
+    status, report, read = post_import("secret", [b"name,score,accuracy,cards_played\n", b"ann,10,50,5\n"])
+    assert status == 200 and read == 2
+    assert report["imported"] == 1 and len(ranking) == 1
+
+
+def test_import_body_is_capped(ranking, monkeypatch):
+    monkeypatch.setattr(asgi_app, "MAX_IMPORT_BYTES", 1000)
+    status, _, read = post_import("secret", [b"x" * 600] * 10)
+    assert status == 413 and read == 2
\ No newline at end of file
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+import card_packs
+from card_packs import CatalogReloader, PackError, read_packs, validate_card
+from cards import Difficulty
+from conftest import card
+
+
+def write_pack(directory, records, name="core.jsonl"):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    return path
+
+
+FULL = [card(0, "easy"), card(1, "intermediate"), card(2, "hard", correct=2)]
+
+
+def test_valid_packs_compile_to_a_catalog(tmp_path):
+    write_pack(str(tmp_path), FULL)
+    catalog = card_packs.load_catalog(str(tmp_path), str(tmp_path / "cache"))
+    assert len(catalog) == 3
+    assert list(catalog.by_difficulty[Difficulty.HARD]) == [2]
+    hard = catalog.get(2)
+    assert hard.answers[2].is_correct and not hard.answers[0].is_correct
+    assert b"is_correct" not in catalog.payload(2)
+    assert catalog.get(99) is None
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda r: r.pop("title"), "'title' must be str"),
+    (lambda r: r.update(difficulty="extreme"), "'difficulty' must be one of"),
+    (lambda r: r.update(id=True), "'id' must be int"),
+    (lambda r: r.update(id=-1), "'id' must be >= 0"),
+    (lambda r: r.update(id=card_packs.MAX_CARD_ID), "'id' must be >= 0 and < 1048576"),
+    (lambda r: r.update(id=2 ** 31), "'id' must be >= 0 and <"),
+    (lambda r: r.update(answers=[]), "no answers"),
+    (lambda r: [a.update(is_correct=False) for a in r["answers"]], "no correct answer"),
+    (lambda r: r.update(extra=1), "unknown fields"),
+])
+def test_validate_card_rejects_bad_records(change, message):
+    record = card(5)
+    change(record)
+    with pytest.raises(PackError, match=message):
+        validate_card(record, "pack.jsonl:1")
+
+
+def test_duplicate_ids_are_rejected(tmp_path):
+    write_pack(str(tmp_path), FULL, "a.jsonl")
+    write_pack(str(tmp_path), [card(1, "hard")], "b.jsonl")
+    with pytest.raises(PackError, match="duplicate card id 1"):
+        read_packs(card_packs.pack_files(str(tmp_path)))
+
+
+def test_packs_leaving_a_difficulty_empty_are_rejected(tmp_path):
+    path = write_pack(str(tmp_path), FULL[:2])
+    with pytest.raises(PackError, match="no cards for difficulty hard"):
+        read_packs([path])
+
+
+def test_reloader_keeps_last_good_catalog_on_bad_packs(tmp_path):
+    packs = tmp_path / "packs"
+    packs.mkdir()
+    write_pack(str(packs), FULL)
+    reloader = CatalogReloader(str(packs), str(tmp_path / "cache"), interval=0)
+    good = reloader.catalog
+
+    write_pack(str(packs), FULL[:2] + [card(30, "easy")])
+    assert reloader.maybe_reload() is None
+    assert reloader.catalog is good
+
+    write_pack(str(packs), FULL + [card(3, "hard")])
+    reloaded = reloader.maybe_reload()
+    assert reloaded is not None and reloader.catalog is reloaded
+    assert len(reloaded) == 4
\ No newline at end of file
@@ -0,0 +1,125 @@
+import collections
+import math
+import random
+
+import pytest
+
+import card_stats
+import game_engine
+from card_stats import CardStats
+from cards import Difficulty
+from conftest import card
+from game_engine import GameEngine
+
+EASY = list(range(40))
+
+
+@pytest.fixture
+def catalog(make_catalog):
+    return make_catalog([card(i, "easy") for i in EASY] + [card(100, "intermediate"), card(101, "hard")])
+
+
+@pytest.fixture
+def stats(catalog, monkeypatch):
+    """Fresh in-process stats where easy card ``i`` is answered right about ``i / 40`` of the time."""
+    stats = CardStats()
+    monkeypatch.setattr(card_stats, "_stats", stats)
+    for i in EASY:
+        for n in range(20):
+            stats.record(catalog.get(i), n < i // 2)
+    return stats
+
+
+def test_samples_stay_in_the_band_and_favour_less_answered_cards(catalog, stats):
+    sampler = stats.sampler(catalog, Difficulty.EASY)
+    assert sampler.rates == sorted(sampler.rates)
+    in_band = {card_id for card_id, rate in zip(sampler.cards, sampler.rates) if 0.4 <= rate <= 0.6}
+    assert 5 < len(in_band) < 15
+
+    rng = random.Random(3)
+    drawn = collections.Counter(sampler.sample(0.4, 0.6, rng) for _ in range(4000))
+    assert set(drawn) == in_band
+    # Evenly answered cards in the band come up about equally often
+    assert max(drawn.values()) < 1.5 * min(drawn.values())
+
+    # A card answered four times as often as the others gets sampled about half as often
+    favourite = min(in_band)
+    for _ in range(60):
+        stats.record(catalog.get(favourite), True)
+    drawn = collections.Counter(sampler.sample(0.4, 0.6, rng) for _ in range(4000))
+    others = (4000 - drawn[favourite]) / (len(in_band) - 1)
+    assert 0.35 < drawn[favourite] / others < 0.65
+
+
+def test_an_empty_band_gives_the_closest_card(catalog, stats):
+    sampler = stats.sampler(catalog, Difficulty.EASY)
+    assert sampler.sample(0.99, 1.0) == sampler.cards[-1]
+    assert sampler.sample(0.0, 0.01) == sampler.cards[0]
+
+
+def test_samplers_re_sort_after_rebuild_seconds(catalog, stats, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(card_stats.time, "monotonic", lambda: now[0])
+    sampler = stats.sampler(catalog, Difficulty.EASY)
+    hardest = sampler.cards[0]
+    for _ in range(200):
+        stats.record(catalog.get(hardest), True)
+
+    now[0] += card_stats.REBUILD_SECONDS - 1
+    assert stats.sampler(catalog, Difficulty.EASY) is sampler
+    assert sampler.cards[0] == hardest
+    now[0] += 2
+    rebuilt = stats.sampler(catalog, Difficulty.EASY)
+    assert rebuilt is not sampler
+    assert rebuilt.cards[-1] == hardest
+
+
+def test_adaptive_draws_aim_at_the_target_and_skip_recent_cards(catalog, stats, monkeypatch):
+    game = GameEngine("Ann")
+    game.catalog = catalog
+    target = 0.5
+    monkeypatch.setattr(GameEngine, "pick_difficulty",
+                        lambda self: (Difficulty.EASY, math.log(target / (1 - target))))
+    dealt = []
+    draw_card = GameEngine.draw_card
+
+    def deal(self, difficulty):
+        dealt.append(len(drawn))
+        return draw_card(self, difficulty)
+
+    monkeypatch.setattr(GameEngine, "draw_card", deal)
+    sampler = stats.sampler(catalog, Difficulty.EASY)
+    rates = dict(zip(sampler.cards, sampler.rates))
+    random.seed(7)
+    drawn = []
+    for n in range(300):
+        card_id = game.draw_adaptive().id
+        if n not in dealt:
+            assert card_id not in drawn[-game_engine.RECENT_CARDS:]
+        drawn.append(card_id)
+    assert game.recent == drawn[-game_engine.RECENT_CARDS:]
+    # About ten cards are in the band, so the sampler mostly finds one not drawn lately
+    assert len(dealt) < 60
+    sampled = [card_id for n, card_id in enumerate(drawn) if n not in dealt]
+    assert abs(sum(rates[card_id] for card_id in sampled) / len(sampled) - target) < 0.05
+
+
+def test_adaptive_draws_from_a_small_deck_fall_back_to_the_pile(make_catalog, monkeypatch):
+    monkeypatch.setattr(card_stats, "_stats", CardStats())
+    game = GameEngine("Ann")
+    game.catalog = make_catalog([card(i, "easy") for i in range(4)] + [card(4, "intermediate"), card(5, "hard")])
+    monkeypatch.setattr(GameEngine, "pick_difficulty", lambda self: (Difficulty.EASY, 0.0))
+    dealt = []
+    draw_card = GameEngine.draw_card
+
+    def deal(self, difficulty):
+        dealt.append(len(drawn))
+        return draw_card(self, difficulty)
+
+    monkeypatch.setattr(GameEngine, "draw_card", deal)
+    drawn = []
+    for _ in range(20):
+        drawn.append(game.draw_adaptive().id)
+    # Once all four cards are recent the sampler cannot find another, so the pile deals
+    first = next(n for n in range(len(drawn)) if len(set(drawn[:n])) == 4)
+    assert set(range(first, len(drawn))) <= set(dealt)
\ No newline at end of file
@@ -0,0 +1,65 @@
+import collections
+import math
+
+import pytest
+
+import game_api
+from cards import Difficulty
+from conftest import card
+from game_engine import Deck, GameEngine
+
+
+def test_deck_deals_every_card_once_per_pass():
+    deck = Deck(list(range(100, 137)), seed=7)
+    first = [deck.draw() for _ in range(37)]
+    assert sorted(first) == list(range(100, 137))
+    second = [deck.draw() for _ in range(37)]
+    assert sorted(second) == list(range(100, 137))
+
+
+@pytest.mark.parametrize("size", [1, 4, 16, 17])
+def test_small_and_large_decks_deal_each_card_once(size):
+    deck = Deck(list(range(size)), seed=11)
+    assert sorted(deck.draw() for _ in range(size)) == list(range(size))
+    assert deck.drawn() == [deck._card_at(position) for position in range(size)]
+
+
+@pytest.mark.parametrize("size, shown, per_order", [(4, 4, 1000), (12, 2, 300)])
+def test_shuffles_are_close_to_uniform(size, shown, per_order):
+    # Every order of the first ``shown`` cards should come up about equally often
+    orders = math.perm(size, shown)
+    counts = collections.Counter(
+        tuple(Deck(range(size), seed=seed).peek(shown)) for seed in range(per_order * orders)
+    )
+    assert len(counts) == orders
+    assert 0.75 * per_order < min(counts.values()) and max(counts.values()) < 1.25 * per_order
+
+
+def test_deck_state_is_seed_and_cursor():
+    deck = Deck(list(range(50)), seed=3)
+    drawn = [deck.draw() for _ in range(10)]
+    resumed = Deck(list(range(50)), seed=3, cursor=10)
+    assert deck.drawn() == drawn
+    assert [deck.draw() for _ in range(5)] == [resumed.draw() for _ in range(5)]
+
+
+def test_empty_deck_raises_instead_of_hanging():
+    deck = Deck([])
+    with pytest.raises(IndexError):
+        deck.draw()
+    assert deck.peek(3) == []
+
+
+def test_draw_card_with_no_cards_for_difficulty_is_400(make_catalog):
+    # Packs cannot compile this any more (see card_packs._check_counts); fake it
+    catalog = make_catalog([card(0, "easy"), card(1, "intermediate"), card(2, "hard")])
+    catalog.by_difficulty = {**catalog.by_difficulty, Difficulty.HARD: []}
+    game = GameEngine("Ann")
+    game.catalog = catalog
+    game_id = game_api.active_games.put("no-hard-cards", game)
+    body, status = game_api.draw_card(game_id, "hard")
+    assert status == 400
+    body, status = game_api.play_turn(game_id, {"answer_index": 0, "next_difficulty": "hard"})
+    assert status == 400
+    body, status = game_api.draw_card(game_id, "easy")
+    assert status == 200
\ No newline at end of file
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+import game_api
+from game_engine import RankingSystem
+from session_store import MemoryGameStore
+
+
+@pytest.fixture
+def game_id(monkeypatch):
+    monkeypatch.setattr(game_api, "active_games", MemoryGameStore())
+    body, status = game_api.start_game({"player_name": "Ann", "reserve": 2})
+    assert status == 200
+    return json.loads(body)["game_id"]
+
+
+@pytest.mark.parametrize("card_id", ["abc", 1.5, True, -1, game_api.MAX_CARD_ID, 1 << 32, [1], {"id": 1}])
+def test_play_turn_rejects_bad_card_ids(game_id, card_id):
+    assert game_api.play_turn(game_id, {"answer_index": 0, "card_id": card_id})[1] == 400
+
+
+def test_play_turn_with_a_reserved_card(game_id):
+    body, _ = game_api.start_game({"player_name": "Bob", "reserve": 2})
+    start = json.loads(body)
+    card_id = start["reserved"]["easy"][0]["card_id"]
+    game_id = start["game_id"]
+    assert game_api.play_turn(game_id, {"answer_index": 0, "card_id": card_id})[1] == 200
+    # Played now, so it is no longer next in its deck
+    assert game_api.play_turn(game_id, {"answer_index": 0, "card_id": card_id})[1] == 409
+    assert game_api.play_turn(game_id, {"answer_index": 0, "card_id": 10 ** 6})[1] == 409
+
+
+@pytest.mark.parametrize("answer_index", [-1, 4])
+def test_an_out_of_range_answer_does_not_use_up_the_reserved_card(game_id, answer_index):
+    body, _ = game_api.start_game({"player_name": "Bob", "reserve": 2})
+    start = json.loads(body)
+    game_id = start["game_id"]
+    card_id = start["reserved"]["easy"][0]["card_id"]
+    data = {"card_id": card_id, "next_difficulty": "hard"}
+    assert game_api.play_turn(game_id, {**data, "answer_index": answer_index})[1] == 400
+    body, status = game_api.play_turn(game_id, {**data, "answer_index": 0})
+    assert status == 200 and json.loads(body)["cards_played"] == 1
+
+
+@pytest.mark.parametrize("answer_index", ["abc", 1.5, True, [1]])
+def test_answers_must_be_integers(game_id, answer_index):
+    game_api.draw_card(game_id, "easy")
+    assert game_api.submit_answer(game_id, {"answer_index": answer_index})[1] == 400
+    assert game_api.play_turn(game_id, {"answer_index": answer_index})[1] == 400
+
+
+@pytest.mark.parametrize("data", [[1], "text", 5])
+def test_bodies_must_be_objects(game_id, data):
+    assert game_api.start_game(data)[1] == 400
+    assert game_api.submit_answer(game_id, data)[1] == 400
+    assert game_api.play_turn(game_id, data)[1] == 400
+
+
+def test_player_name_must_be_a_string(game_id):
+    assert game_api.start_game({"player_name": ["Ann"]})[1] == 400
+    assert game_api.start_game({"player_name": ""})[1] == 400
+
+@pytest.fixture
+def ranking(monkeypatch):
+    ranking = RankingSystem()
+    monkeypatch.setattr(game_api, "ranking_system", ranking)
+    monkeypatch.setattr(game_api, "_leaderboard_cache", {})
+    return ranking
+
+
+def test_leaderboard_etag_and_cache_control(ranking, monkeypatch):
+    monkeypatch.setattr(game_api, "LEADERBOARD_MAX_AGE", 17)
+    ranking.add_player_score("Ann", 50, 80.0, 10, "easy")
+    body, status, headers = game_api.get_leaderboard()
+    assert status == 200 and json.loads(body)["leaderboard"][0]["name"] == "Ann"
+    assert headers["Cache-Control"] == "public, max-age=17"
+    etag = headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', f'"other",W/{etag}', "*"):
+        body, status, headers = game_api.get_leaderboard(if_none_match=if_none_match)
+        assert (body, status, headers["ETag"]) == (b"", 304, etag)
+    assert game_api.get_leaderboard(if_none_match='"other", W/"more"')[1] == 200
+
+
+def test_a_new_top_score_changes_the_leaderboard_etag(ranking):
+    ranking.add_player_score("Ann", 50, 80.0, 10, "easy")
+    etag = game_api.get_leaderboard()[2]["ETag"]
+    ranking.add_player_score("Bob", 90, 80.0, 10, "easy")
+    body, status, headers = game_api.get_leaderboard(if_none_match=etag)
+    assert status == 200 and headers["ETag"] != etag
+    assert json.loads(body)["leaderboard"][0]["name"] == "Bob"
+    # Every worker tags the same board the same way
+    game_api._leaderboard_cache.clear()
+    assert game_api.get_leaderboard()[2]["ETag"] == headers["ETag"]
\ No newline at end of file
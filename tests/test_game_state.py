@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+import card_packs
+import game_api
+from card_packs import CatalogUnavailable
+from cards import Difficulty
+from conftest import card
+from game_engine import STATE_VERSION, GameEngine
+from session_store import SQLiteGameStore
+
+FULL = [card(0, "easy"), card(1, "intermediate"), card(2, "hard"), card(3, "easy")]
+
+
+def load(tmp_path, records, name):
+    packs = tmp_path / name
+    packs.mkdir()
+    with open(packs / "core.jsonl", "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    return card_packs.load_catalog(str(packs), str(tmp_path / "cache"))
+
+
+def test_state_round_trip():
+    game = GameEngine("Zoë")
+    game.draw_card(Difficulty.EASY)
+    game.answer_question(0)
+    game.draw_card(Difficulty.HARD)
+    copy = GameEngine.from_bytes(game.to_bytes())
+    assert copy.get_game_stats() == game.get_game_stats()
+    assert copy.current_card.id == game.current_card.id
+    assert copy.recent == game.recent
+    assert copy.catalog is game.catalog
+    for difficulty in (Difficulty.EASY, Difficulty.HARD):  # the decks it has started
+        assert copy.reserve(difficulty, 3) == game.reserve(difficulty, 3)
+
+
+def test_other_state_versions_are_rejected():
+    data = bytearray(GameEngine("Ann").to_bytes())
+    data[0] = STATE_VERSION - 1
+    with pytest.raises(ValueError):
+        GameEngine.from_bytes(bytes(data))
+
+
+def test_stored_game_keeps_its_catalog_across_a_reload(tmp_path):
+    old = load(tmp_path, FULL, "old")
+    game = GameEngine("Ann")
+    game.catalog = old
+    game.draw_card(Difficulty.EASY)
+    upcoming = game.reserve(Difficulty.EASY, 1)
+    new = load(tmp_path, FULL + [card(n, "easy") for n in range(10, 20)], "new")
+    assert new.version != old.version
+
+    copy = GameEngine.from_bytes(game.to_bytes())
+    assert copy.catalog is old
+    assert copy.current_card == game.current_card
+    assert copy.reserve(Difficulty.EASY, 1) == upcoming
+
+
+def test_catalog_is_reopened_from_the_cache_dir(tmp_path, monkeypatch):
+    old = load(tmp_path, FULL, "old")
+    monkeypatch.setattr(card_packs._reloader, "cache_dir", str(tmp_path / "cache"))
+    card_packs._catalogs.pop(old.version)
+    assert card_packs.catalog_for(old.version).version == old.version
+
+
+def test_game_whose_catalog_is_gone_gets_410(tmp_path, make_catalog, monkeypatch):
+    orphan = make_catalog(FULL)
+    orphan.version = 0x1234  # never loaded here and no cache file of that name
+    game = GameEngine("Ann")
+    game.catalog = orphan
+    with pytest.raises(CatalogUnavailable):
+        GameEngine.from_bytes(game.to_bytes())
+
+    store = SQLiteGameStore(str(tmp_path / "games.db"))
+    monkeypatch.setattr(game_api, "active_games", store)
+    game_id = store.put("orphan", game)
+    assert game_api.get_stats(game_id)[1] == 410
+    assert game_api.get_stats("missing")[1] == 404
+    assert os.path.exists(tmp_path / "games.db")
\ No newline at end of file
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+import time
+
+from metrics import Counter, Histogram, Registry
+
+
+def test_workers_are_merged(tmp_path):
+    registry = Registry(str(tmp_path))
+    requests = Counter(registry, "requests_total", "Requests.", ["status"])
+    latency = Histogram(registry, "latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    requests.inc("200", amount=3)
+    latency.observe(0.05)
+    # Another live worker's last flush; this test process stands in for it
+    other = {"requests_total": [[["200"], 2]], "latency_seconds": [[[], [0, 1, 0, 0.5]]]}
+    with open(tmp_path / f"metrics-{os.getppid()}.json", "w") as f:
+        json.dump(other, f)
+
+    text = registry.render().decode()
+    assert 'requests_total{status="200"} 5' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_scrapes_survive_a_broken_metrics_dir(tmp_path):
+    directory = tmp_path / "metrics"
+    registry = Registry(str(directory))
+    requests = Counter(registry, "requests_total", "Requests.")
+    requests.inc()
+    shutil.rmtree(directory)
+    assert "requests_total 1" in registry.render().decode()
+    directory.mkdir()  # for the flush at exit
+
+
+def test_the_flusher_survives_a_failed_flush(tmp_path, monkeypatch):
+    registry = Registry(str(tmp_path), flush_interval=0.01)
+    Counter(registry, "requests_total", "Requests.").inc()
+    real_flush = registry.flush
+    calls = []
+
+    def flush():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError(28, "No space left on device")
+        real_flush()
+
+    monkeypatch.setattr(registry, "flush", flush)
+    registry.ensure_flushing()
+    path = tmp_path / f"metrics-{os.getpid()}.json"
+    deadline = time.time() + 5
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(calls) >= 2 and path.exists()
\ No newline at end of file
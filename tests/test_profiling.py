@@ -0,0 +1,25 @@
+import os
+import time
+
+import profiling
+
+
+def test_a_bad_profile_dir_does_not_hold_the_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(blocker / "profiles"))
+    for start in (profiling.start_sampling, profiling.start_memory_trace):
+        assert start("secret", {"seconds": "0.01"})[1] == 500
+    assert not profiling._window_lock.locked()
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+    body, status = profiling.start_sampling("secret", {"seconds": "0.05"})
+    assert status == 202
+    assert profiling.start_memory_trace("secret", {"seconds": "0.01"})[1] == 409
+    deadline = time.time() + 5
+    while profiling._window_lock.locked() and time.time() < deadline:
+        time.sleep(0.01)
+    assert os.path.exists(body["file"])
+    assert profiling.start_sampling("wrong", {})[1] == 403
\ No newline at end of file
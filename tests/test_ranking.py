@@ -0,0 +1,127 @@
+import math
+import random
+import time
+
+import pytest
+
+import game_engine
+from game_engine import RankingSystem
+from score_log import ScoreLog
+
+
+def key(name, score, age=0.0, mix="easy"):
+    """An index key for a score submitted ``age`` seconds ago."""
+    return (-score, -50.0, -10, time.time() - age, name, mix)
+
+
+def names(board):
+    return [entry["name"] for entry in board]
+
+
+def test_windows_drop_old_scores():
+    ranking = RankingSystem()
+    ranking.add_scores([key("today", 10, 60), key("lastweek", 30, 3 * 86400),
+                        key("ancient", 50, 30 * 86400)])
+    assert names(ranking.get_leaderboard()) == ["ancient", "lastweek", "today"]
+    assert names(ranking.get_leaderboard(window="week")) == ["lastweek", "today"]
+    assert names(ranking.get_leaderboard(window="day")) == ["today"]
+    with pytest.raises(KeyError):
+        ranking.get_leaderboard(window="month")
+
+
+def test_windows_expire_while_live(monkeypatch):
+    ranking = RankingSystem()
+    ranking.add_player_score("ann", 10, 50.0, 10, "easy")
+    version = ranking.top_version("day")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 86400)
+    assert ranking.get_leaderboard(window="day") == []
+    assert ranking.top_version("day") != version
+    assert names(ranking.get_leaderboard(window="week")) == ["ann"]
+
+
+def test_mix_boards_and_ranks():
+    ranking = RankingSystem()
+    ranking.add_scores([key("a", 30, mix="hard"), key("b", 20, mix="easy"), key("c", 20, mix="hard")])
+    assert names(ranking.get_leaderboard(mix="hard")) == ["a", "c"]
+    assert ranking.rank_for_score(20) == (2, 66.7)
+    assert ranking.rank_for_score(40) == (1, 33.4)
+    assert ranking.get_player_rank("A") == 1
+
+
+def test_score_counts_match_a_brute_force_count():
+    rng = random.Random(5)
+    counts = game_engine._ScoreCounts(size=8)
+    scores = []
+    for batch in range(5):
+        # Each batch reaches higher, so the tree grows past its initial size several times
+        new = [rng.randrange(10 ** (batch + 1)) for _ in range(200)] + [game_engine._FENWICK_LIMIT + batch]
+        for score in new[:100]:
+            counts.add(score)
+        counts.add_keys([(-score,) for score in new[100:]])
+        scores += new
+        copy = counts.copy()
+        for score in [0, 1, 7, 8, 1023, 1024, game_engine._FENWICK_LIMIT, *rng.sample(scores, 50)]:
+            above = sum(other > score for other in scores)
+            assert counts.count_above(score) == copy.count_above(score) == above
+    assert counts.total == len(scores)
+    assert len(counts.tree) - 1 > 8
+
+
+def test_rank_for_score_matches_a_brute_force_rank():
+    rng = random.Random(9)
+    ranking = RankingSystem()
+    scores = [rng.choice([rng.randrange(3000), 100, 100, 2500]) for _ in range(2000)]
+    ranking.add_scores([key(f"p{n}", score) for n, score in enumerate(scores)])
+    for score in [0, 99, 100, 101, 2500, 2999, 5000, *rng.sample(scores, 100)]:
+        rank = 1 + sum(other > score for other in scores)
+        assert ranking.rank_for_score(score) == (rank, math.ceil(1000 * rank / max(len(scores), rank)) / 10)
+    assert ranking.rank_for_score(max(scores))[0] == 1
+
+
+def test_log_backed_import_merges_outside_the_lock(tmp_path):
+    log_dir = str(tmp_path / "log")
+    ranking = RankingSystem(ScoreLog(log_dir))
+    other = RankingSystem(ScoreLog(log_dir))
+    other.add_player_score("other", 5, 50.0, 10, "easy")
+    other.log.flush()
+    build = ranking._add_to_boards
+    built_aside = []
+
+    def add_to_boards(boards, keys):
+        if boards is not ranking._boards:
+            built_aside.append(len(keys))
+            assert not ranking._lock.locked()
+            # A request scores and reads while the import builds
+            ranking.add_player_score("during", 7, 50.0, 10, "easy")
+            assert names(ranking.get_leaderboard()) == ["during"]
+        build(boards, keys)
+
+    ranking._add_to_boards = add_to_boards
+    ranking.add_scores([key(f"imported{n}", n) for n in range(100, 2100)])
+    ranking.log.flush()
+    assert built_aside == [2001]  # the import and the other worker's score
+
+    board = ranking.get_leaderboard(top_n=5000)
+    assert len(board) == 2002
+    assert names(board).count("during") == 1 and "other" in names(board)
+    assert ranking._unseen == {}
+    assert len(other.get_leaderboard(top_n=5000)) == 2002
+
+    restarted = RankingSystem(ScoreLog(log_dir))
+    assert len(restarted.get_leaderboard(top_n=5000)) == 2002
+
+
+def test_other_workers_import_is_merged_beside_the_live_boards(tmp_path, monkeypatch):
+    monkeypatch.setattr(game_engine, "_BULK_READ_BYTES", 1000)
+    log_dir = str(tmp_path / "log")
+    reader = RankingSystem(ScoreLog(log_dir))
+    RankingSystem(ScoreLog(log_dir)).add_scores([key(f"imported{n}", n) for n in range(100)])
+
+    # The first read hands the backlog to a thread and answers from the current boards
+    assert reader.get_leaderboard() == []
+    deadline = time.time() + 5
+    while reader._catching_up and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(reader.get_leaderboard(top_n=1000)) == 100
+    assert reader.get_player_rank("imported99") == 1
\ No newline at end of file
@@ -0,0 +1,118 @@
+import importlib
+import json
+import sys
+
+import pytest
+
+import game_api
+import responses
+
+KINDS = {name: getattr(responses, name) for name in ("INT", "STR", "BOOL", "PERCENT", "RAW", "JSON")}
+KIND_NAMES = {kind: name for name, kind in KINDS.items()}
+
+STRINGS = [
+    "",
+    'say "hi"',
+    "back\\slash",
+    "line\nbreak\ttab\r\x00\x01\x1f\x7f",
+    "café ☃ 漢字 😀",
+    "</script>  ",
+    "100%% %s %d",
+]
+# Encoded with one decimal: 87.55 is 87.549999... as a double, so "87.5%"
+PERCENTS = [0.0, 100.0, 87.55, 33.333333, 0.05, 99.96]
+
+
+@pytest.fixture(params=[
+    pytest.param("orjson", marks=pytest.mark.skipif(responses.orjson is None, reason="orjson not installed")),
+    "json",
+])
+def backend(request, monkeypatch):
+    """``responses`` loaded with orjson, or reloaded as if it were not installed."""
+    if request.param == "json":
+        with monkeypatch.context() as patch:
+            patch.setitem(sys.modules, "orjson", None)
+            importlib.reload(responses)
+        assert responses.orjson is None
+    yield responses
+    if request.param == "json":
+        importlib.reload(responses)
+
+
+def rebuild(schema, module):
+    """``schema`` with its field kinds taken from ``module`` as loaded now."""
+    return module.Schema(*((key, getattr(module, KIND_NAMES[kind])) for key, kind in schema.fields))
+
+
+def sample(kind, n):
+    """A value of field kind ``kind`` and what it should decode to."""
+    if kind == "INT":
+        value = (-3, 0, 2 ** 40 + 7)[n % 3]
+        return value, value
+    if kind == "STR":
+        value = STRINGS[n % len(STRINGS)]
+        return value, value
+    if kind == "BOOL":
+        return n % 2 == 0, n % 2 == 0
+    if kind == "PERCENT":
+        value = PERCENTS[n % len(PERCENTS)]
+        return value, f"{value:.1f}%"
+    if kind == "RAW":
+        value = {"id": n, "question": STRINGS[n % len(STRINGS)]}
+        return json.dumps(value).encode(), value
+    value = {"n": n, "tags": ["a", STRINGS[n % len(STRINGS)]], "none": None, "ratio": 0.25}
+    return value, value
+
+
+@pytest.mark.parametrize("name", ["STATS", "START", "ANSWER", "TURN", "END"])
+@pytest.mark.parametrize("n", range(3))
+def test_game_schemas_decode_to_their_values(backend, name, n):
+    original = getattr(game_api, name)
+    schema = rebuild(original, backend)
+    values, expected = [], {}
+    for index, (key, kind) in enumerate(original.fields):
+        value, decoded = sample(KIND_NAMES[kind], n + index)
+        values.append(value)
+        expected[key] = decoded
+    assert json.loads(schema.encode(*values)) == expected
+
+
+@pytest.mark.parametrize("n", range(len(STRINGS)))
+def test_every_field_kind_decodes_to_its_value(backend, n):
+    schema = backend.Schema(*((f'{name.lower()} "{n}"\\é', getattr(backend, name)) for name in KINDS))
+    values, expected = [], {}
+    for index, name in enumerate(KINDS):
+        value, decoded = sample(name, n + index)
+        values.append(value)
+        expected[f'{name.lower()} "{n}"\\é'] = decoded
+    encoded = schema.encode(*values)
+    assert json.loads(encoded) == expected
+    # The stdlib path escapes everything outside ASCII
+    if backend.orjson is None:
+        assert encoded.isascii()
+
+
+@pytest.mark.parametrize("value", PERCENTS)
+def test_percent_matches_format(backend, value):
+    schema = backend.Schema(("accuracy", backend.PERCENT))
+    assert json.loads(schema.encode(value)) == {"accuracy": f"{value:.1f}%"}
+
+
+def test_strings_that_are_not_str(backend):
+    schema = backend.Schema(("mix", backend.STR), ("player_name", backend.STR))
+    assert json.loads(schema.encode(None, 7)) == {"mix": None, "player_name": 7}
+
+
+def test_extend_keeps_the_fields_in_order(backend):
+    base = backend.Schema(("is_correct", backend.BOOL), ("explanation", backend.STR))
+    schema = base.extend(("total_score", backend.INT), ("game_id", backend.STR))
+    encoded = schema.encode(False, STRINGS[3], 12, "g-1")
+    assert encoded.startswith(b'{"is_correct":false,"explanation":')
+    assert json.loads(encoded) == {"is_correct": False, "explanation": STRINGS[3], "total_score": 12, "game_id": "g-1"}
+
+
+def test_dumps_is_compact_and_takes_int_keys(backend):
+    body = {"error": STRINGS[4], "counts": {1: 2, 3: [STRINGS[3]]}}
+    encoded = backend.dumps(body)
+    assert b", " not in encoded and b": " not in encoded
+    assert json.loads(encoded) == {"error": STRINGS[4], "counts": {"1": 2, "3": [STRINGS[3]]}}
\ No newline at end of file
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+import rooms
+
+
+@pytest.fixture
+def play():
+    """Run ``scenario(room_id, host_token)`` on an event loop, as the ASGI app calls handlers."""
+    def run(scenario):
+        async def main():
+            created, status = rooms.create_room({})
+            assert status == 200
+            try:
+                return scenario(created["room_id"], created["host_token"])
+            finally:
+                rooms.close_room(created["room_id"], {"host_token": created["host_token"]})
+        return asyncio.run(main())
+    return run
+
+
+def test_a_round(play):
+    def scenario(room_id, host):
+        token = rooms.join_room(room_id, {"player_name": "Ann"})[0]["player_token"]
+        assert rooms.join_room(room_id, {"player_name": "ann"})[1] == 409
+        assert rooms.answer_card(room_id, {"player_token": token, "answer_index": 0})[1] == 409
+        assert rooms.deal_card(room_id, {"host_token": "guess"})[1] == 403
+        assert rooms.deal_card(room_id, {"host_token": host, "difficulty": "hard"})[1] == 200
+        result, status = rooms.answer_card(room_id, {"player_token": token, "answer_index": 0})
+        assert status == 200 and result["rank"] == 1 and result["players"] == 1
+        assert rooms.answer_card(room_id, {"player_token": token, "answer_index": 1})[1] == 409
+    play(scenario)
+
+
+@pytest.mark.parametrize("data", [[1], "text", 5])
+def test_bodies_must_be_objects(play, data):
+    def scenario(room_id, host):
+        for handler in (rooms.join_room, rooms.deal_card, rooms.answer_card, rooms.close_room):
+            assert handler(room_id, data)[1] == 400
+    play(scenario)
+
+
+@pytest.mark.parametrize("token", [["a"], {"a": 1}, 5, None])
+def test_bad_player_tokens_are_unknown_players(play, token):
+    def scenario(room_id, host):
+        rooms.join_room(room_id, {"player_name": "Ann"})
+        rooms.deal_card(room_id, {"host_token": host})
+        assert rooms.answer_card(room_id, {"player_token": token, "answer_index": 0})[1] == 403
+    play(scenario)
+
+
+@pytest.mark.parametrize("index", [True, False, -1, 4, 1.0, "0"])
+def test_bad_answer_indexes(play, index):
+    def scenario(room_id, host):
+        token = rooms.join_room(room_id, {"player_name": "Ann"})[0]["player_token"]
+        rooms.deal_card(room_id, {"host_token": host})
+        assert rooms.answer_card(room_id, {"player_token": token, "answer_index": index})[1] == 400
+        # A rejected answer does not use up the player's turn
+        assert rooms.answer_card(room_id, {"player_token": token, "answer_index": 0})[1] == 200
+    play(scenario)
+
+
+@pytest.mark.parametrize("name", ["", "  ", ["Ann"], 5, "x" * (rooms.MAX_NAME_LENGTH + 1)])
+def test_bad_player_names(play, name):
+    def scenario(room_id, host):
+        assert rooms.join_room(room_id, {"player_name": name})[1] == 400
+    play(scenario)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import gc
+import io
+
+import pytest
+
+import score_import
+from game_engine import RankingSystem
+
+
+def csv_body(*rows, header="name,score,accuracy,cards_played,submitted_at"):
+    return io.BytesIO((header + "\n" + "".join(row + "\n" for row in rows)).encode())
+
+
+def test_reading_leaves_the_collector_alone():
+    assert gc.isenabled()
+    score_import.read_scores(csv_body("ann,10,50,5,"), "csv")
+    assert gc.isenabled()
+    with pytest.raises(score_import.ScoreImportError):
+        with score_import.paused_gc():
+            assert not gc.isenabled()
+            score_import.read_scores(io.BytesIO(b"\xff\xfe"), "csv")
+    assert gc.isenabled()
+
+
+def test_max_rows_rejects_the_whole_upload():
+    ranking = RankingSystem()
+    rows = [f"p{n},{n},50,5," for n in range(30)]
+    with pytest.raises(score_import.ScoreImportError):
+        score_import.import_scores(ranking, csv_body(*rows), "csv", batch_size=10, max_rows=25)
+    assert len(ranking) == 0
+    report = score_import.import_scores(ranking, csv_body(*rows), "csv", batch_size=10, max_rows=30)
+    assert report["imported"] == 30
+
+@pytest.mark.parametrize("value, expected", [
+    ("1700000000", 1700000000.0),
+    ("1700000000.5", 1700000000.5),
+    ("2023-11-14T22:13:20Z", 1700000000.0),
+    ("2023-11-14T22:13:20z", 1700000000.0),
+    ("2023-11-14T22:13:20+00:00", 1700000000.0),
+    ("2023-11-14T23:13:20+01:00", 1700000000.0),
+    ("2023-11-14T22:13:20", 1700000000.0),  # naive times are UTC
+    ("", 42.0),
+    (None, 42.0),
+])
+def test_timestamps(value, expected):
+    assert score_import._timestamp(value, 42.0) == expected
+
+
+def test_z_timestamp_without_fromisoformat_support(monkeypatch):
+    # Python 3.10's fromisoformat rejects the "Z" suffix
+    class strict_datetime(score_import.datetime):
+        @classmethod
+        def fromisoformat(cls, value):
+            if value.endswith(("Z", "z")):
+                raise ValueError(f"Invalid isoformat string: {value!r}")
+            return super().fromisoformat(value)
+
+    monkeypatch.setattr(score_import, "datetime", strict_datetime)
+    assert score_import._timestamp("2023-11-14T22:13:20Z", 0.0) == 1700000000.0
+
+
+def test_csv_rows_are_validated_and_reported():
+    keys, report = score_import.read_scores(csv_body(
+        "ann,10,85.5%,5,2023-11-14T22:13:20Z",
+        " bob ,20,50,7,",
+        "carl,-1,50,7,",
+        "dan,5,101,7,",
+        ",5,50,7,",
+        "eve,5,50,7,yesterday",
+        "fay,x,50,7,",
+    ), "csv")
+    assert report["rows"] == 7 and report["accepted"] == 2 and report["rejected"] == 5
+    assert [error["row"] for error in report["errors"]] == [3, 4, 5, 6, 7]
+    assert keys[0] == (-10, -85.5, -5, 1700000000.0, "ann", "")
+    assert keys[1][4] == "bob"
+
+
+def test_csv_header_must_have_required_fields():
+    with pytest.raises(score_import.ScoreImportError):
+        score_import.read_scores(csv_body("ann,10", header="name,score"), "csv")
+
+
+def test_jsonl_rows():
+    body = io.BytesIO(b"\n".join([
+        b'{"name": "ann", "score": 10, "accuracy": 50, "cards_played": 5, "mix": "hard"}',
+        b'{"name": "bob", "score": "10", "accuracy": 50, "cards_played": 5}',
+        b'not json',
+        b'[1, 2]',
+        b'{"name": "cy", "score": 10, "accuracy": 50}',
+        b'{"name": "di", "score": 10, "accuracy": 50, "cards_played": 5, "mix": "odd"}',
+        b'',
+    ]))
+    keys, report = score_import.read_scores(body, "jsonl")
+    assert [key[4] for key in keys] == ["ann"] and keys[0][5] == "hard"
+    assert [error["error"] for error in report["errors"]] == [
+        "invalid score", "invalid JSON", "record must be a JSON object",
+        "missing field cards_played", "invalid mix",
+    ]
+
+
+def test_strict_and_dry_run():
+    ranking = RankingSystem()
+    report = score_import.import_scores(ranking, csv_body("ann,10,50,5,", "bob,x,50,5,"), "csv",
+                                        strict=True)
+    assert report["imported"] == 0 and len(ranking) == 0
+    report = score_import.import_scores(ranking, csv_body("ann,10,50,5,"), "csv", dry_run=True)
+    assert report["accepted"] == 1 and report["imported"] == 0 and len(ranking) == 0
+    with pytest.raises(score_import.ScoreImportError):
+        score_import.read_scores(csv_body("ann,10,50,5,"), "xml")
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import time
+
+import pytest
+
+import score_log
+from score_log import ScoreLog
+
+
+def scripted_writes(monkeypatch, log, *steps):
+    """Run the next writes to ``log`` by ``steps``: a byte count is a short write, None a failure."""
+    real_write = os.write
+    steps = list(steps)
+
+    def write(fd, data):
+        # Other tests' background threads write too
+        if not steps or os.readlink(f"/proc/self/fd/{fd}") != log.log_path:
+            return real_write(fd, data)
+        step = steps.pop(0)
+        if step is None:
+            raise OSError(28, "No space left on device")
+        return real_write(fd, data[:step])
+
+    monkeypatch.setattr(score_log.os, "write", write)
+
+
+def wait_for(condition):
+    deadline = time.time() + 5
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_a_failed_flush_keeps_the_records_queued(tmp_path, monkeypatch):
+    log = ScoreLog(str(tmp_path))
+    log._queue = [b'{"n":1}\n', b'{"n":2}\n']
+    scripted_writes(monkeypatch, log, 10, None)  # all of the first line and part of the second
+    with pytest.raises(OSError):
+        log.flush()
+    log.flush()
+    assert log.read_from(0)[0] == [{"n": 1}, {"n": 2}]
+
+
+def test_the_writer_survives_a_failed_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(score_log, "_RETRY_SECONDS", 0.01)
+    log = ScoreLog(str(tmp_path), flush_interval=0.01)
+    scripted_writes(monkeypatch, log, 3, None, None)
+    log.append({"n": 1})
+    assert wait_for(lambda: log.read_from(0)[0] == [{"n": 1}])
+    log.append({"n": 2})
+    assert wait_for(lambda: log.read_from(0)[0] == [{"n": 1}, {"n": 2}])
+    assert log._queue == []
\ No newline at end of file
@@ -0,0 +1,149 @@
+import glob
+import os
+import time
+
+import session_log
+from cards import Difficulty
+from game_engine import GameEngine
+from session_log import SessionLog, read_records
+from session_store import MemoryGameStore
+
+
+def worker(directory, **options):
+    """A store with a session log, attached as a starting worker would."""
+    store = MemoryGameStore(log=SessionLog(str(directory), **options))
+    store.log.attach(store)
+    return store
+
+
+def exit_worker(store):
+    """Make a worker look exited: everything on disk, its committer idle and its lock released."""
+    log = store.log
+    log.flush()
+    # The committer takes this only once a checkpoint after the last commit is done
+    with log._cond:
+        log._pending.append(b"")
+        log._appended += 1
+        log._cond.notify()
+    log.flush()
+    log._lock_file.close()
+
+
+def test_records_round_trip_and_stop_at_a_torn_one(tmp_path):
+    path = str(tmp_path / "log.wal")
+    big = bytes(range(256)) * 300  # more than 64 KB
+    with open(path, "wb") as f:
+        f.write(session_log._record(session_log._PUT, "a", big))
+        f.write(session_log._record(session_log._DELETE, "b"))
+        f.write(session_log._record(session_log._PUT, "c", b"state")[:-1])
+    assert read_records(path) == [(session_log._PUT, "a", big), (session_log._DELETE, "b", b"")]
+    assert read_records(str(tmp_path / "gone.wal")) == []
+
+
+def test_sessions_of_an_exited_worker_are_recovered(tmp_path):
+    old = worker(tmp_path)
+    game = GameEngine("Ann")
+    game.draw_card(Difficulty.EASY)
+    old.put("kept", game)
+    old.put("ended", GameEngine("Bob"))
+    old.delete("ended")
+    exit_worker(old)
+
+    new = worker(tmp_path)
+    assert new.log.recovered == 1
+    assert new.get("ended") is None
+    recovered = new.get("kept")
+    assert recovered.current_card.id == game.current_card.id
+    # The old worker's files are gone and the session is in the new worker's log
+    assert not glob.glob(str(tmp_path / f"sessions-{old.log._owner}*"))
+    exit_worker(new)
+    assert worker(tmp_path).get("kept") is not None
+
+
+def test_recovery_reads_the_latest_checkpoint(tmp_path):
+    old = worker(tmp_path, checkpoint_bytes=200)
+    for n in range(20):
+        game = GameEngine(f"p{n}")
+        old.put(f"g{n % 5}", game)
+        old.log.flush()
+    exit_worker(old)
+    assert old.log.checkpoints > 0
+
+    new = worker(tmp_path)
+    assert new.log.recovered == 5
+    assert new.get("g4").player_name == "p19"
+
+
+def test_a_worker_is_not_adopted_while_alive(tmp_path):
+    live = worker(tmp_path)
+    live.put("mine", GameEngine("Ann"))
+    live.log.flush()
+    other = worker(tmp_path)
+    assert other.log.recovered == 0 and other.get("mine") is None
+    assert os.path.exists(live.log._path(live.log._owner, ".lock"))
+
+
+def test_an_orphan_adopted_by_another_worker_is_skipped(tmp_path, monkeypatch):
+    old = worker(tmp_path)
+    old.put("game", GameEngine("Ann"))
+    exit_worker(old)
+    lock_path = old.log._path(old.log._owner, ".lock")
+    files = glob.glob(str(tmp_path / "sessions-*"))
+    real_glob = glob.glob
+
+    def racing_glob(pattern):
+        # Another worker adopts and deletes the orphan just after this one lists it
+        found = real_glob(pattern)
+        if pattern.endswith("*.lock"):
+            for path in files:
+                os.remove(path)
+        return found
+
+    monkeypatch.setattr(session_log.glob, "glob", racing_glob)
+    new = worker(tmp_path)
+    assert new.log.recovered == 0
+    assert not os.path.exists(lock_path)
+
+
+def test_a_replaced_lock_file_is_not_adopted(tmp_path):
+    path = str(tmp_path / "sessions-x.lock")
+    open(path, "w").close()
+    with open(path, "rb") as f:
+        assert session_log._same_file(f, path)
+        os.remove(path)
+        assert not session_log._same_file(f, path)
+        open(path, "w").close()
+        assert not session_log._same_file(f, path)
+
+def test_checkpoints_write_the_logged_states(tmp_path):
+    old = worker(tmp_path, sync=True, checkpoint_bytes=1)
+    game = GameEngine("Ann")
+    old.put("g", game)
+    # A request changes the live game, but has not stored it yet when the checkpoint runs
+    game.draw_card(Difficulty.EASY)
+    old.put("other", GameEngine("Bob"))
+    deadline = time.time() + 5
+    while old.log.checkpoints < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    exit_worker(old)
+    assert old.log.checkpoints == 2
+    assert worker(tmp_path).get("g").current_card is None
+
+
+def test_the_committer_survives_a_failed_write(tmp_path):
+    store = worker(tmp_path, sync=True)
+    segment = store.log._segment
+
+    class Failing:
+        def write(self, data):
+            store.log._segment = segment
+            raise ValueError("I/O operation on closed file")
+
+        def fileno(self):
+            return segment.fileno()
+
+    store.log._segment = Failing()
+    store.put("lost", GameEngine("Ann"))  # returns although the write failed
+    store.put("kept", GameEngine("Bob"))
+    exit_worker(store)
+    assert worker(tmp_path).get("kept") is not None
\ No newline at end of file
@@ -0,0 +1,169 @@
+import base64
+import fnmatch
+import json
+import time
+
+import pytest
+
+import game_api
+from cards import Difficulty
+from game_engine import GameEngine, RankingSystem
+from session_store import (
+    EndedGames, MemoryGameStore, RedisGameStore, SignedTokenGameStore, SQLiteGameStore,
+    create_game_store,
+)
+
+SECRET = b"test-secret"
+
+
+class FakeRedis:
+    """The part of redis-py that RedisGameStore uses, in a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    def scan_iter(self, match):
+        return [key for key in self.data if fnmatch.fnmatch(key, match)]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis", "token"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryGameStore(ttl=60)
+    if request.param == "sqlite":
+        return SQLiteGameStore(str(tmp_path / "games.db"), ttl=60)
+    if request.param == "redis":
+        return RedisGameStore(FakeRedis(), ttl=60)
+    return SignedTokenGameStore(SECRET, ttl=60)
+
+
+def test_store_round_trip_and_delete(store):
+    game = GameEngine("Ann")
+    game.draw_card(Difficulty.EASY)
+    game_id = store.put("g1", game)
+    copy = store.get(game_id)
+    assert copy.get_game_stats() == game.get_game_stats()
+    assert copy.current_card.id == game.current_card.id
+
+    copy.answer_question(0)
+    game_id = store.put(game_id, copy)
+    assert store.get(game_id).cards_played == 1
+
+    assert store.delete(game_id) is True
+    assert store.get(game_id) is None
+    assert store.delete(game_id) is False
+
+
+def test_unknown_game_is_missing(store):
+    assert store.get("nope") is None
+    assert store.delete("nope") is False
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryGameStore(max_games=2)
+    for name in ("a", "b"):
+        store.put(name, GameEngine(name))
+    store.get("a")
+    store.put("c", GameEngine("c"))
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.evicted == 1
+
+
+def test_token_rejects_a_bad_signature():
+    store = SignedTokenGameStore(SECRET)
+    token = store.put("new", GameEngine("Ann"))
+    data = bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    data[8] ^= 1
+    assert store.get(base64.urlsafe_b64encode(bytes(data)).rstrip(b"=").decode()) is None
+    assert SignedTokenGameStore(b"other-secret").get(token) is None
+
+
+def test_token_expires_after_ttl(monkeypatch):
+    store = SignedTokenGameStore(SECRET, ttl=60)
+    token = store.put("new", GameEngine("Ann"))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert store.get(token) is None
+
+
+def test_token_keeps_its_game_id_across_updates():
+    store = SignedTokenGameStore(SECRET)
+    first = store.put("new", GameEngine("Ann"))
+    game = store.get(first)
+    game.draw_card(Difficulty.EASY)
+    second = store.put(first, game)
+    assert second != first
+    assert store._open(second)[1] == store._open(first)[1]
+    assert store._open(store.put("new", GameEngine("Bob")))[1] != store._open(first)[1]
+
+
+def test_ended_token_game_cannot_be_replayed():
+    store = SignedTokenGameStore(SECRET, ttl=60)
+    old = store.put("new", GameEngine("Ann"))
+    game = store.get(old)
+    game.draw_card(Difficulty.EASY)
+    latest = store.put(old, game)
+
+    assert store.delete(latest) is True
+    assert store.get(latest) is None
+    assert store.get(old) is None
+    assert store.delete(old) is False
+
+
+def test_ended_games_are_shared_through_a_file(tmp_path):
+    path = str(tmp_path / "ended.db")
+    one = SignedTokenGameStore(SECRET, ttl=60, ended=EndedGames(path))
+    two = SignedTokenGameStore(SECRET, ttl=60, ended=EndedGames(path))
+    token = one.put("new", GameEngine("Ann"))
+    assert two.delete(token) is True
+    assert one.get(token) is None
+    assert one.delete(token) is False
+
+
+def test_ended_games_are_forgotten_after_they_expire():
+    ended = EndedGames()
+    now = time.time()
+    assert ended.add(b"old", now - 1)
+    assert ended.add(b"new", now + 60)
+    assert not ended.add(b"new", now + 60)
+    ended._next_sweep = 0.0
+    ended.add(b"other", now + 60)
+    assert b"old" not in ended and b"new" in ended
+
+
+def test_create_game_store_urls(tmp_path):
+    assert isinstance(create_game_store("memory://"), MemoryGameStore)
+    assert isinstance(create_game_store(f"sqlite://{tmp_path}/db/games.db"), SQLiteGameStore)
+    with pytest.raises(ValueError):
+        create_game_store("token://")
+    store = create_game_store(f"token://{tmp_path}/ended/ended.db", secret="s")
+    assert store.ended.path == f"{tmp_path}/ended/ended.db"
+    assert create_game_store("token://", secret="s").ended.path is None
+    with pytest.raises(ValueError):
+        create_game_store("ftp://host")
+
+
+@pytest.mark.parametrize("game_store", [MemoryGameStore(), SignedTokenGameStore(SECRET, ttl=60)],
+                         ids=["memory", "token"])
+def test_end_game_scores_a_game_once(monkeypatch, game_store):
+    ranking = RankingSystem()
+    monkeypatch.setattr(game_api, "active_games", game_store)
+    monkeypatch.setattr(game_api, "ranking_system", ranking)
+    body, status = game_api.start_game({"player_name": "Ann"})
+    assert status == 200
+    game_id = json.loads(body)["game_id"]
+
+    assert game_api.end_game(game_id)[1] == 200
+    assert game_api.end_game(game_id)[1] == 404
+    assert game_api.draw_card(game_id, "easy")[1] == 404
+    assert len(ranking.get_leaderboard()) == 1
\ No newline at end of file
@@ -1,19 +1,44 @@
 """Flask web app for Supply Chain Strategy Card Game."""
 
-from flask import Flask, render_template, request, jsonify, session
-from game_engine import GameEngine, RankingSystem
-from cards import Difficulty
+from flask import Flask, Response, g, render_template, request, jsonify, session
+from card_packs import maybe_reload
+import game_api
+import metrics
+import profiling
+import responses
+import score_import
+import gc
 import os
-import json
+import time
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
-app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+app.secret_key = game_api.SECRET_KEY
 
-# Global ranking system (in-memory)
-ranking_system = RankingSystem()
 
-# Store active games (in-memory)
-active_games = {}
+def _respond(result):
+    """Turn a game_api ``(body, status[, headers])`` result into a Flask response."""
+    body, status, *headers = result
+    if not isinstance(body, bytes):
+        body = responses.dumps(body)
+    return Response(body, status=status, headers=headers[0] if headers else None,
+                    mimetype='application/json')
+
+
+@app.before_request
+def reload_cards():
+    """Pick up edited card packs; running games keep the catalog they started with."""
+    g.request_start = time.perf_counter()
+    maybe_reload()
+
+
+@app.after_request
+def record_request(response):
+    """Record latency and status per route."""
+    route = request.endpoint or 'unmatched'
+    metrics.request_seconds.observe(time.perf_counter() - g.request_start, route)
+    metrics.requests_total.inc(route, str(response.status_code))
+    metrics.registry.ensure_flushing()
+    return response
 
 
 @app.route('/')
@@ -25,173 +50,99 @@ def index():
 @app.route('/api/start-game', methods=['POST'])
 def start_game():
     """Start a new game for a player."""
-    data = request.get_json()
-    player_name = data.get('player_name', 'Anonymous')
-    
-    if not player_name:
-        return jsonify({'error': 'Player name required'}), 400
-    
-    # Create a unique game ID (simplified - in production use UUID)
-    game_id = f"{player_name}_{len(active_games)}"
-    
-    # Initialize game
-    game = GameEngine(player_name)
-    active_games[game_id] = game
-    
-    return jsonify({
-        'game_id': game_id,
-        'player_name': player_name,
-        'message': f'Welcome, {player_name}!'
-    })
+    return _respond(game_api.start_game(request.get_json()))
 
 
 @app.route('/api/draw-card/<game_id>/<difficulty>', methods=['POST'])
 def draw_card(game_id, difficulty):
     """Draw a card for a specific game."""
-    if game_id not in active_games:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = active_games[game_id]
-    
-    # Parse difficulty
-    difficulty_map = {
-        'easy': Difficulty.EASY,
-        'intermediate': Difficulty.INTERMEDIATE,
-        'hard': Difficulty.HARD,
-    }
-    
-    diff = difficulty_map.get(difficulty.lower())
-    if not diff:
-        return jsonify({'error': 'Invalid difficulty'}), 400
-    
-    # Draw card
-    card = game.draw_card(diff)
-    
-    return jsonify({
-        'card_id': card.title,
-        'title': card.title,
-        'description': card.description,
-        'category': card.category,
-        'difficulty': difficulty.upper(),
-        'impact': card.real_world_impact,
-        'answers': [
-            {'id': i, 'text': ans.text}
-            for i, ans in enumerate(card.answers)
-        ],
-        'cards_played': game.cards_played,
-    })
+    return _respond(game_api.draw_card(game_id, difficulty))
 
 
 @app.route('/api/answer/<game_id>', methods=['POST'])
 def submit_answer(game_id):
     """Submit an answer to the current card."""
-    if game_id not in active_games:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = active_games[game_id]
-    data = request.get_json()
-    answer_index = data.get('answer_index')
-    
-    if answer_index is None:
-        return jsonify({'error': 'Answer required'}), 400
-    
-    # Process answer
-    is_correct, points, explanation = game.answer_question(answer_index)
-    
-    # Get current stats
-    stats = game.get_game_stats()
-    
-    return jsonify({
-        'is_correct': is_correct,
-        'points_earned': points,
-        'explanation': explanation,
-        'total_score': stats['total_score'],
-        'accuracy': f"{stats['accuracy']:.1f}%",
-        'cards_won': stats['cards_won'],
-        'cards_played': stats['cards_played'],
-        'streak_bonus': stats['streak_bonus'],
-    })
+    return _respond(game_api.submit_answer(game_id, request.get_json()))
+
+
+@app.route('/api/turn/<game_id>', methods=['POST'])
+def play_turn(game_id):
+    """Answer, get stats and optionally draw or reserve cards in one request."""
+    return _respond(game_api.play_turn(game_id, request.get_json()))
 
 
 @app.route('/api/stats/<game_id>', methods=['GET'])
 def get_stats(game_id):
     """Get current game statistics."""
-    if game_id not in active_games:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = active_games[game_id]
-    stats = game.get_game_stats()
-    
-    return jsonify({
-        'player_name': stats['player_name'],
-        'total_score': stats['total_score'],
-        'cards_played': stats['cards_played'],
-        'cards_won': stats['cards_won'],
-        'accuracy': f"{stats['accuracy']:.1f}%",
-        'easy_streak': stats['easy_streak'],
-        'intermediate_streak': stats['intermediate_streak'],
-        'hard_streak': stats['hard_streak'],
-        'streak_bonus': stats['streak_bonus'],
-    })
+    return _respond(game_api.get_stats(game_id))
 
 
 @app.route('/api/end-game/<game_id>', methods=['POST'])
 def end_game(game_id):
     """End a game and record the score."""
-    if game_id not in active_games:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = active_games[game_id]
-    final_stats = game.end_game()
-    
-    # Add to leaderboard
-    ranking_system.add_player_score(
-        final_stats['player_name'],
-        final_stats['final_score'],
-        final_stats['accuracy'],
-        final_stats['cards_played']
-    )
-    
-    # Get player rank
-    rank = ranking_system.get_player_rank(final_stats['player_name'])
-    
-    # Clean up
-    del active_games[game_id]
-    
-    return jsonify({
-        'player_name': final_stats['player_name'],
-        'final_score': final_stats['final_score'],
-        'accuracy': f"{final_stats['accuracy']:.1f}%",
-        'cards_played': final_stats['cards_played'],
-        'cards_won': final_stats['cards_won'],
-        'streak_bonus_applied': final_stats['streak_bonus_applied'],
-        'rank': rank,
-    })
+    return _respond(game_api.end_game(game_id))
 
 
 @app.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard():
     """Get the leaderboard."""
-    leaderboard = ranking_system.get_leaderboard(top_n=10)
-    
-    return jsonify({
-        'leaderboard': [
-            {
-                'rank': rank,
-                'name': player['name'],
-                'score': player['score'],
-                'accuracy': f"{player['accuracy']:.1f}%",
-                'cards_played': player['cards_played'],
-            }
-            for rank, player in enumerate(leaderboard, 1)
-        ]
-    })
+    return _respond(game_api.get_leaderboard(request.args, request.headers.get('If-None-Match')))
+
+
+@app.route('/api/admin/import-scores', methods=['POST'])
+def import_scores():
+    """Bulk-import scores from a CSV or JSONL request body.
+
+    The import runs inside the request, so uploads are capped at
+    ``score_import.SYNC_MAX_ROWS`` rows to finish within the worker timeout.
+    """
+    return _respond(game_api.import_scores(
+        request.headers.get('X-Admin-Token'), request.args, request.stream,
+        max_rows=score_import.SYNC_MAX_ROWS,
+    ))
 
 
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({'status': 'ok', 'service': 'supply-chain-game'})
+    return _respond(game_api.health())
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics, merged across workers when METRICS_DIR is set."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+if profiling.ENABLED:
+    # Only hooked in when PROFILE_TOKEN is set, so there is no cost otherwise
+    @app.before_request
+    def start_request_profile():
+        """Trace this request if it carries the profiling token."""
+        if profiling.authorized(request.headers.get('X-Profile') or request.args.get('profile')):
+            g.profiler = profiling.RequestTracer()
+            g.profiler.start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        """Write the request's folded stacks and name the file in the response."""
+        tracer = g.pop('profiler', None)
+        if tracer is not None:
+            response.headers['X-Profile-File'] = tracer.stop()
+        return response
+
+    @app.route('/api/debug/profile/<kind>', methods=['POST'])
+    def start_profile(kind):
+        """Start a sampling or tracemalloc window on this worker."""
+        handler = profiling.CONTROL_ROUTES.get(request.path)
+        if handler is None:
+            return jsonify({'error': 'Not found'}), 404
+        return _respond(handler(request.headers.get('X-Profile-Token'), request.args))
+
+
+# Move everything built at import (catalog included) out of GC tracking so
+# workers forked from a preloaded master keep sharing those pages
+gc.freeze()
 
 
 if __name__ == '__main__':